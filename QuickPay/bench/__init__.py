@@ -0,0 +1,4 @@
+"""
+Benchmarks and the stub Authorize.net gateway they run against. Installed
+only by the ``bench`` settings profile, so none of it ships with ``prod``.
+"""
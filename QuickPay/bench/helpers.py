@@ -0,0 +1,54 @@
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+from django.db import connection
+
+# Re-exported for the benches
+from QuickPay.portal.profiling import percentile  # noqa: F401
+from QuickPay.portal.tests.helpers import (  # noqa: F401
+    CARD,
+    seedTransactions,
+    stubCredentials,
+)
+
+
+@contextmanager
+def benchDatabase():
+    """
+    Creates a throwaway copy of the default database for a benchmark run.
+
+    SQLite gets a temporary file rather than the shared in-memory database so
+    that worker threads can write to it concurrently.
+    """
+    directory = None
+    if connection.vendor == "sqlite":
+        # A directory of its own, so WAL's -wal and -shm files go with it
+        directory = tempfile.TemporaryDirectory(prefix="quickpay-bench-")
+        connection.settings_dict["TEST"]["NAME"] = os.path.join(
+            directory.name, "bench.sqlite3"
+        )
+    oldName = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(oldName, verbosity=0)
+        if directory:
+            directory.cleanup()
+
+
+class Stopwatch:
+    def __init__(self):
+        self.wall = 0.0
+        self.cpu = 0.0
+
+    def __enter__(self):
+        self.__wall = time.perf_counter()
+        self.__cpu = time.process_time()
+        return self
+
+    def __exit__(self, *exc):
+        self.wall += time.perf_counter() - self.__wall
+        self.cpu += time.process_time() - self.__cpu
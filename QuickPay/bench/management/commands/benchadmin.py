@@ -0,0 +1,89 @@
+import time
+
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from QuickPay.portal.admin import TransactionAdmin
+from QuickPay.bench.helpers import Stopwatch, benchDatabase, seedTransactions
+from QuickPay.portal.models import Result, Transaction
+
+
+class NaiveTransactionAdmin(admin.ModelAdmin):
+    """What registering ``Transaction`` with the obvious options gives."""
+
+    list_display = TransactionAdmin.list_display
+    list_filter = TransactionAdmin.list_filter
+    date_hierarchy = "created_at"
+    search_fields = ("transId", "refID", "invoiceID")
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds a large Transaction table and times changelist page loads "
+        "through the Transaction admin against a naive registration."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1_000_000)
+        parser.add_argument("--repeat", type=int, default=3)
+
+    def handle(self, *args, rows, repeat, **options):
+        site = admin.AdminSite(name="bench")
+        admins = {
+            "naive": NaiveTransactionAdmin(Transaction, site),
+            "TransactionAdmin": TransactionAdmin(Transaction, site),
+        }
+        with benchDatabase() as connection, override_settings(DEBUG=False):
+            with Stopwatch() as clock:
+                seedTransactions(rows)
+                with connection.cursor() as cursor:
+                    cursor.execute("ANALYZE")
+            self.stdout.write(f"seeded {rows} rows in {clock.wall:.1f} s")
+
+            sample = Transaction.objects.order_by("id")[rows // 2]
+            last = Transaction.objects.latest("created_at").created_at
+            pages = {
+                "first page": {},
+                "page 200": {"p": "200"},
+                f"year {last.year}": {"created_at__year": last.year},
+                f"month {last:%Y-%m}": {
+                    "created_at__year": last.year,
+                    "created_at__month": last.month,
+                },
+                "failed only": {"result__exact": Result.FAILED},
+                "search transId": {"q": sample.transId},
+                "search refID": {"q": sample.refID},
+            }
+            user = User.objects.create_superuser("bench", "bench@example.com", "x")
+            factory = RequestFactory()
+
+            results = {}
+            for name, modelAdmin in admins.items():
+                for page, params in pages.items():
+                    best, queries = None, 0
+                    for _ in range(repeat):
+                        request = factory.get("/admin/portal/transaction/", params)
+                        request.user = user
+                        with CaptureQueriesContext(connection) as captured:
+                            started = time.perf_counter()
+                            response = modelAdmin.changelist_view(request)
+                            response.render()
+                            elapsed = time.perf_counter() - started
+                        assert response.status_code == 200, (page, response)
+                        best = elapsed if best is None else min(best, elapsed)
+                        queries = len(captured)
+                    results[name, page] = (best, queries)
+
+        self.stdout.write(
+            f"{'page':<16} {'naive ms':>9} {'queries':>8} {'admin ms':>9} {'queries':>8}"
+        )
+        for page in pages:
+            naive, naiveQueries = results["naive", page]
+            fast, fastQueries = results["TransactionAdmin", page]
+            self.stdout.write(
+                f"{page:<16} {naive * 1000:>9.1f} {naiveQueries:>8} "
+                f"{fast * 1000:>9.1f} {fastQueries:>8}"
+            )
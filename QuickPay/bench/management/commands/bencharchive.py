@@ -0,0 +1,102 @@
+import hashlib
+import tempfile
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from QuickPay.portal import archive, export, reporting
+from QuickPay.bench.helpers import Stopwatch, benchDatabase, seedTransactions
+from QuickPay.portal.models import Result, Transaction
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds a year of transactions, archives those older than --age days, "
+        "and checks that exports and the listing return the same rows as "
+        "before while timing single-row lookups in each store."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=200_000)
+        parser.add_argument("--age", type=int, default=90)
+        parser.add_argument("--lookups", type=int, default=50)
+
+    def handle(self, *args, rows, age, lookups, **options):
+        with (
+            tempfile.TemporaryDirectory() as directory,
+            override_settings(ARCHIVE={**settings.ARCHIVE, "DIR": directory}),
+            benchDatabase() as connection,
+        ):
+            seedTransactions(rows)
+            # Errors awaiting reconciliation stay live among the archived rows
+            Transaction.objects.filter(id__in=range(1, rows, 50)).update(
+                result=Result.ERROR, error="NO_RESPONSE"
+            )
+            before = archive.cutoff(age)
+            oldest = list(
+                Transaction.objects.filter(created_at__lt=before)
+                .exclude(result=Result.ERROR)
+                .order_by("?")
+                .values_list("transId", flat=True)[:lookups]
+            )
+            newest = list(
+                Transaction.objects.filter(created_at__gte=before)
+                .order_by("?")
+                .values_list("transId", flat=True)[:lookups]
+            )
+            exported, listed = self.digests()
+            tableBytes = self.tableBytes(connection)
+
+            with Stopwatch() as clock:
+                moved = sum(count for _, count in archive.archive(before))
+            archiveBytes = sum(
+                p.stat().st_size for p in Path(directory).glob("transactions-*")
+            )
+            self.stdout.write(
+                f"archived {moved} of {rows} rows in {clock.wall:.1f} s "
+                f"({moved / clock.wall:.0f} rows/s)"
+            )
+            self.stdout.write(
+                f"transaction table + indexes {tableBytes / 2**20:.1f} MiB -> "
+                f"{self.tableBytes(connection) / 2**20:.1f} MiB; "
+                f"archive files {archiveBytes / 2**20:.1f} MiB"
+            )
+
+            if (exported, listed) != self.digests():
+                raise CommandError("Export or listing changed after archiving")
+            self.stdout.write("export and full listing walk identical before/after")
+
+            self.stdout.write(f"{'transId lookup':<16} {'ms':>7}")
+            for label, ids in (("live", newest), ("archived", oldest)):
+                started = time.perf_counter()
+                for transId in ids:
+                    found, _ = archive.page({"transId": transId}, None, 10)
+                    if [row.transId for row in found] != [transId]:
+                        raise CommandError(f"Lookup of {transId} found {found}")
+                elapsed = (time.perf_counter() - started) / len(ids)
+                self.stdout.write(f"{label:<16} {elapsed * 1000:>7.2f}")
+
+    def digests(self):
+        """SHA-256 of the full CSV export and of every id in a listing walk."""
+        exported = hashlib.sha256()
+        for chunk in export.export(
+            reporting.filterTransactions({}), archived=archive.exportValues({})
+        ):
+            exported.update(chunk)
+        listed, cursor = hashlib.sha256(), None
+        while True:
+            found, cursor = archive.page({}, cursor, 500)
+            listed.update(",".join(str(row.pk) for row in found).encode())
+            if cursor is None:
+                return exported.hexdigest(), listed.hexdigest()
+
+    def tableBytes(self, connection):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT sum(pgsize) FROM dbstat WHERE name = 'portal_transaction' "
+                "OR name LIKE 'portal_tx_%'"
+            )
+            return cursor.fetchone()[0]
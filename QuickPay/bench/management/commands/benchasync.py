@@ -0,0 +1,85 @@
+import asyncio
+import io
+import json
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+
+from QuickPay.portal import gateway
+from QuickPay.bench.helpers import CARD, Stopwatch, benchDatabase, stubCredentials
+from QuickPay.portal.tests.stubgateway import StubGateway
+
+PAYLOAD = json.dumps({**CARD, "amount": "10.00", "salesperson": "bench"})
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-tests the WSGI and ASGI payment endpoints against a stub gateway "
+        "with fixed latency and reports throughput."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument("--latency", type=float, default=0.5)
+        parser.add_argument("--workers", type=int, default=8)
+        parser.add_argument("--concurrency", type=int, default=64)
+
+    def handle(self, *args, requests, latency, workers, concurrency, **options):
+        stubCredentials()
+        with benchDatabase(), StubGateway(latency=latency) as stub:
+            with (
+                override_settings(
+                    DEBUG=False,
+                    AUTH_NET_ENDPOINT=stub.url,
+                    ALLOWED_HOSTS=["testserver"],
+                    RATE_LIMITS={**settings.RATE_LIMITS, "ENABLED": False},
+                ),
+                redirect_stdout(io.StringIO()),
+            ):
+                wsgi = self.wsgi(requests, workers)
+                asgi = asyncio.run(self.asgi(requests, concurrency))
+
+        self.stdout.write(
+            f"{requests} payments, gateway latency {latency * 1000:.0f} ms"
+        )
+        for name, (clock, results) in (
+            (f"wsgi  /process/        {workers} workers", wsgi),
+            (f"asgi  /process/async/  {concurrency} in flight", asgi),
+        ):
+            self.stdout.write(
+                f"{name:<40} {requests / clock.wall:8.1f} req/s  "
+                f"{clock.wall:6.2f} s  approved={results.count('Success')}"
+            )
+        self.stdout.write(f"gateway pool {gateway.transport().stats()}")
+
+    def wsgi(self, requests, workers):
+        def post(_):
+            return (
+                Client()
+                .post("/process/", PAYLOAD, content_type="application/json")
+                .json()
+                .get("result")
+            )
+
+        with Stopwatch() as clock, ThreadPoolExecutor(workers) as pool:
+            results = list(pool.map(post, range(requests)))
+        return clock, results
+
+    async def asgi(self, requests, concurrency):
+        client = AsyncClient()
+        limit = asyncio.Semaphore(concurrency)
+
+        async def post():
+            async with limit:
+                response = await client.post(
+                    "/process/async/", PAYLOAD, content_type="application/json"
+                )
+                return response.json().get("result")
+
+        with Stopwatch() as clock:
+            results = await asyncio.gather(*(post() for _ in range(requests)))
+        return clock, list(results)
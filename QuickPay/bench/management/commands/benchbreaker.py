@@ -0,0 +1,109 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from QuickPay.portal import circuit
+from QuickPay.bench.helpers import (
+    CARD,
+    Stopwatch,
+    benchDatabase,
+    percentile,
+    stubCredentials,
+)
+from QuickPay.portal.models import Transaction
+from QuickPay.portal.tests.stubgateway import StubGateway
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs payments against the stub gateway while it is healthy, slows "
+        "down past the adaptive timeout, then recovers, and reports how the "
+        "circuit breaker handled each phase."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--payments", type=int, default=100, help="per phase")
+        parser.add_argument("--concurrency", type=int, default=8)
+        parser.add_argument("--latency", type=float, default=0.02)
+        parser.add_argument(
+            "--outage-latency",
+            type=float,
+            default=2.0,
+            help="Gateway latency while degraded, in seconds.",
+        )
+        parser.add_argument("--min-timeout", type=float, default=0.1)
+        parser.add_argument(
+            "--window",
+            type=float,
+            default=2.0,
+            help="Breaker window in seconds, shorter than production's so the "
+            "degraded phase is not outvoted by the healthy one.",
+        )
+        parser.add_argument("--cooldown", type=float, default=1.0)
+
+    def handle(self, *args, payments, concurrency, latency, **options):
+        stubCredentials()
+        breaker = {
+            **settings.GATEWAY_BREAKER,
+            "WINDOW": options["window"],
+            "MIN_TIMEOUT": options["min_timeout"],
+            "COOLDOWN": options["cooldown"],
+        }
+        phases = []
+        with (
+            benchDatabase(),
+            StubGateway(latency=latency) as stub,
+            override_settings(AUTH_NET_ENDPOINT=stub.url, GATEWAY_BREAKER=breaker),
+        ):
+            circuit.reset()
+            for name, gatewayLatency, pause in (
+                ("healthy", latency, 0),
+                ("degraded", options["outage_latency"], 0),
+                ("recovered", latency, options["cooldown"]),
+            ):
+                stub.latency = gatewayLatency
+                time.sleep(pause)
+                phases.append((name, self.run(payments, concurrency)))
+            circuit.reset()
+
+        self.stdout.write(
+            f"{payments} payments per phase at concurrency {concurrency}; "
+            f"gateway {latency * 1000:.0f} ms, "
+            f"{options['outage_latency'] * 1000:.0f} ms while degraded"
+        )
+        self.stdout.write(
+            f"{'phase':<10} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8} "
+            f"{'state':>10} {'timeout ms':>10}  results"
+        )
+        for name, run in phases:
+            self.stdout.write(
+                f"{name:<10} {run['p50']:>8.1f} {run['p95']:>8.1f} "
+                f"{run['max']:>8.1f} {run['state']:>10} "
+                f"{run['timeout'] * 1000:>10.0f}  {run['results']}"
+            )
+
+    def run(self, payments, concurrency):
+        def pay(_):
+            with Stopwatch() as clock:
+                result = Transaction.process("A", "10.00", "bench", CARD)
+            return clock.wall * 1000, result.get("result") or result.get("error")
+
+        with ThreadPoolExecutor(concurrency) as pool:
+            samples = list(pool.map(pay, range(payments)))
+
+        latencies = [wall for wall, _ in samples]
+        results = {}
+        for _, result in samples:
+            results[result] = results.get(result, 0) + 1
+        snapshot = circuit.breaker("A").snapshot()
+        return {
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "max": max(latencies),
+            "state": snapshot["state"],
+            "timeout": snapshot["timeout"],
+            "results": results,
+        }
@@ -0,0 +1,62 @@
+import random
+import timeit
+
+from django.core.management.base import BaseCommand, CommandError
+
+from QuickPay.portal import codec
+from QuickPay.portal.tests.helpers import (
+    DECLINED,
+    codecFields,
+    sdkRequest,
+    sdkResponse,
+)
+from QuickPay.portal.tests.stubgateway import StubGateway
+
+
+class Command(BaseCommand):
+    help = (
+        "Checks the lean codec against the authorizenet SDK byte for byte and "
+        "compares their encode/decode cost."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--samples", type=int, default=500)
+        parser.add_argument("--number", type=int, default=2000)
+
+    def handle(self, *args, samples, number, **options):
+        rng = random.Random(7)
+        cases = [codecFields(rng) for _ in range(samples)]
+        for fields in cases:
+            if sdkRequest(fields) != codec.encodeTransactionRequest(**fields):
+                raise CommandError(f"request bytes differ for {fields!r}")
+
+        approved = StubGateway().respond(codec.encodeTransactionRequest(**cases[0]))
+        for body in (approved, DECLINED):
+            if sdkResponse(body) != codec.decodeTransactionResponse(body):
+                raise CommandError(f"decoded responses differ for {body!r}")
+        self.stdout.write(f"{samples} requests byte-identical, responses match")
+
+        fields = cases[0]
+        for label, sdk, lean in (
+            (
+                "encode request",
+                lambda: sdkRequest(fields),
+                lambda: codec.encodeTransactionRequest(**fields),
+            ),
+            (
+                "decode approval",
+                lambda: sdkResponse(approved),
+                lambda: codec.decodeTransactionResponse(approved),
+            ),
+            (
+                "decode decline",
+                lambda: sdkResponse(DECLINED),
+                lambda: codec.decodeTransactionResponse(DECLINED),
+            ),
+        ):
+            sdkTime = timeit.timeit(sdk, number=number) / number * 1e6
+            leanTime = timeit.timeit(lean, number=number) / number * 1e6
+            self.stdout.write(
+                f"{label:<16} sdk {sdkTime:9.1f} us   lean {leanTime:8.1f} us   "
+                f"x{sdkTime / leanTime:.1f}"
+            )
@@ -0,0 +1,110 @@
+import random
+import timeit
+import uuid
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models import Count, DecimalField, Sum
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from QuickPay.bench.helpers import Stopwatch, benchDatabase
+
+LEGACY = ("portal", "0007_outboxevent")
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds transactions in the old all-text layout, then measures table "
+        "size and a SUM(amount) report before and after the typed-column "
+        "migrations (0008-0010), and how long the conversion takes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=100_000)
+        parser.add_argument("--number", type=int, default=5)
+
+    def handle(self, *args, rows, number, **options):
+        with benchDatabase():
+            call_command("migrate", *LEGACY, verbosity=0)
+            Legacy = self.model(LEGACY)
+            self.seed(Legacy, rows)
+            before = self.measure(
+                Legacy.objects.filter(result="Success"),
+                Cast("amount", DecimalField(max_digits=12, decimal_places=2)),
+                number,
+            )
+            with Stopwatch() as clock:
+                call_command("migrate", "portal", verbosity=0)
+            Typed = self.model(("portal", "0010_transaction_typed_columns_swap"))
+            after = self.measure(Typed.objects.filter(result=1), "amount", number)
+            assert before["report"] == after["report"], "report changed"
+
+        self.stdout.write(f"{rows} rows, conversion took {clock.wall:.2f} s")
+        self.stdout.write(f"{'':<8} {'size KiB':>10} {'report ms':>10}")
+        for name, run in (("text", before), ("typed", after)):
+            self.stdout.write(
+                f"{name:<8} {run['size'] / 1024:>10.0f} {run['seconds'] * 1000:>10.2f}"
+            )
+
+    @staticmethod
+    def model(migration):
+        state = MigrationExecutor(connection).loader.project_state(migration)
+        return state.apps.get_model("portal", "Transaction")
+
+    @staticmethod
+    def seed(model, count, batchSize=5000):
+        rng = random.Random(1)
+        start = timezone.now() - timedelta(days=365)
+        accountTypes = ["Visa", "MasterCard", "AmericanExpress", "Discover"]
+        for offset in range(0, count, batchSize):
+            batch = []
+            for i in range(offset, min(offset + batchSize, count)):
+                approved = rng.random() < 0.9
+                batch.append(
+                    model(
+                        processor="A",
+                        created_at=start + timedelta(seconds=i * 30),
+                        result="Success" if approved else "Failed",
+                        invoiceID=str(uuid.UUID(int=rng.getrandbits(128)))[:16],
+                        refID=f"{rng.getrandbits(80):020x}",
+                        transId=str(60000000000 + i),
+                        amount=f"{rng.randrange(100, 100000) / 100:.2f}",
+                        salesperson=f"sales{rng.randrange(50):02d}",
+                        submitted=True,
+                        resultStatus="Ok" if approved else "Error",
+                        responseCode="1" if approved else "2",
+                        accountType=rng.choice(accountTypes),
+                    )
+                )
+            model.objects.bulk_create(batch)
+
+    @staticmethod
+    def measure(queryset, amount, number):
+        report = queryset.values("salesperson").annotate(
+            total=Sum(amount), payments=Count("id")
+        )
+
+        def run():
+            return {
+                row["salesperson"]: (row["total"], row["payments"])
+                for row in report.all()
+            }
+
+        seconds = min(timeit.repeat(run, number=1, repeat=number))
+        size = 0
+        if connection.vendor == "sqlite":
+            with connection.cursor() as cursor:
+                cursor.execute("VACUUM")
+                cursor.execute("PRAGMA page_count")
+                pages = cursor.fetchone()[0]
+                cursor.execute("PRAGMA page_size")
+                size = pages * cursor.fetchone()[0]
+        elif connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_total_relation_size('portal_transaction')")
+                size = cursor.fetchone()[0]
+        return {"seconds": seconds, "size": size, "report": run()}
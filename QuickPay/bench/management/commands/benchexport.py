@@ -0,0 +1,71 @@
+import gzip
+import tracemalloc
+
+from django.core.management.base import BaseCommand, CommandError
+
+from QuickPay.portal import export
+from QuickPay.bench.helpers import Stopwatch, benchDatabase, seedTransactions
+from QuickPay.portal.models import Transaction
+
+
+class Command(BaseCommand):
+    help = (
+        "Exports growing seeded tables and checks that peak Python memory stays "
+        "flat as the row count grows."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=2.0,
+            help="fail if peak memory grows by more than this factor",
+        )
+
+    def handle(self, *args, rows, tolerance, **options):
+        self.stdout.write(
+            f"{'rows':>8} {'format':>7} {'gzip':>5} {'bytes':>12} "
+            f"{'peak KiB':>9} {'seconds':>8}"
+        )
+        peaks = {}
+        with benchDatabase():
+            seeded = 0
+            for count in sorted(rows):
+                seedTransactions(count - seeded, seed=count)
+                seeded = count
+                for format in export.FORMATS:
+                    for compress in (False, True):
+                        size, peak, clock = self.run(format, compress)
+                        peaks.setdefault((format, compress), []).append(peak)
+                        self.stdout.write(
+                            f"{count:>8} {format:>7} {str(compress):>5} {size:>12} "
+                            f"{peak / 1024:>9.0f} {clock.wall:>8.2f}"
+                        )
+            if Transaction.objects.count() != max(rows):
+                raise CommandError("seeded row count mismatch")
+
+        for key, values in peaks.items():
+            if max(values) > min(values) * tolerance:
+                raise CommandError(f"peak memory grew with row count for {key}")
+        self.stdout.write("peak memory flat across row counts")
+
+    @staticmethod
+    def run(format, compress):
+        size = 0
+        tracemalloc.start()
+        with Stopwatch() as clock:
+            decompressor = gzip.zlib.decompressobj(31) if compress else None
+            lines = 0
+            for chunk in export.export(Transaction.objects.all(), format, compress):
+                size += len(chunk)
+                data = decompressor.decompress(chunk) if decompressor else chunk
+                lines += data.count(b"\n")
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        expected = Transaction.objects.count() + (format == "csv")
+        if lines != expected:
+            raise CommandError(
+                f"{format} export wrote {lines} lines, expected {expected}"
+            )
+        return size, peak, clock
@@ -0,0 +1,136 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+
+from QuickPay.bench.helpers import (
+    CARD,
+    Stopwatch,
+    benchDatabase,
+    percentile,
+    stubCredentials,
+)
+from QuickPay.portal.tests.stubgateway import StubGateway, parseMix
+
+PAYLOAD = json.dumps({**CARD, "amount": "10.00", "salesperson": "bench"})
+
+
+class Command(BaseCommand):
+    help = (
+        "Drives /process/ against the stub gateway at fixed concurrency levels "
+        "and reports latency percentiles, throughput and DB writes per payment. "
+        "Exits non-zero when a --max-p95 or --min-throughput budget is missed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument("--concurrency", default="1,8,32")
+        parser.add_argument("--latency", type=float, default=0.05)
+        parser.add_argument("--jitter", type=float, default=0.0)
+        parser.add_argument("--mix", default="declined=0.1,invalid=0.02")
+        parser.add_argument("--codec", choices=["sdk", "lean"], default="sdk")
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument("--max-p95", type=float, help="milliseconds")
+        parser.add_argument("--min-throughput", type=float, help="payments/s")
+        parser.add_argument("--json", help="also write the results to this file")
+
+    def handle(self, *args, **options):
+        try:
+            levels = [int(level) for level in options["concurrency"].split(",")]
+            mix = parseMix(options["mix"])
+        except ValueError as e:
+            raise CommandError(e)
+
+        stubCredentials()
+        stub = StubGateway(
+            latency=options["latency"],
+            jitter=options["jitter"],
+            mix=mix,
+            seed=options["seed"],
+        )
+        with (
+            benchDatabase(),
+            stub,
+            override_settings(
+                DEBUG=False,
+                ALLOWED_HOSTS=["testserver"],
+                AUTH_NET_ENDPOINT=stub.url,
+                AUTH_NET_CODEC=options["codec"],
+                RATE_LIMITS={**settings.RATE_LIMITS, "ENABLED": False},
+            ),
+        ):
+            Client().post("/process/", PAYLOAD, content_type="application/json")
+            runs = [self.run(options["requests"], level) for level in levels]
+
+        self.stdout.write(
+            f"{options['requests']} payments per level, codec {options['codec']}, "
+            f"gateway {options['latency'] * 1000:.0f} ms "
+            f"(+{options['jitter'] * 1000:.0f} ms jitter), mix {mix or 'approved'}"
+        )
+        self.stdout.write(
+            f"{'conc':>5} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+            f"{'writes':>7}  results"
+        )
+        for run in runs:
+            self.stdout.write(
+                f"{run['concurrency']:>5} {run['throughput']:>8.1f} "
+                f"{run['p50']:>8.1f} {run['p95']:>8.1f} {run['p99']:>8.1f} "
+                f"{run['writes']:>7.2f}  {run['results']}"
+            )
+        if options["json"]:
+            with open(options["json"], "w") as f:
+                json.dump(runs, f, indent=2)
+
+        failures = [
+            f"concurrency {run['concurrency']}: {problem}"
+            for run in runs
+            for problem in self.budget(run, options)
+        ]
+        if failures:
+            raise CommandError("Budget exceeded:\n  " + "\n  ".join(failures))
+
+    def run(self, requests, concurrency):
+        def post(_):
+            writes = 0
+
+            def count(execute, sql, params, many, context):
+                nonlocal writes
+                writes += sql.startswith(("INSERT", "UPDATE"))
+                return execute(sql, params, many, context)
+
+            with connection.execute_wrapper(count), Stopwatch() as clock:
+                response = Client().post(
+                    "/process/", PAYLOAD, content_type="application/json"
+                )
+            body = response.json()
+            return clock.wall, writes, body.get("result") or body.get("error")
+
+        with Stopwatch() as clock, ThreadPoolExecutor(concurrency) as pool:
+            samples = list(pool.map(post, range(requests)))
+
+        latencies = [wall * 1000 for wall, _, _ in samples]
+        results = {}
+        for _, _, result in samples:
+            results[result] = results.get(result, 0) + 1
+        return {
+            "concurrency": concurrency,
+            "throughput": requests / clock.wall,
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "writes": sum(writes for _, writes, _ in samples) / requests,
+            "results": results,
+        }
+
+    def budget(self, run, options):
+        if options["max_p95"] is not None and run["p95"] > options["max_p95"]:
+            yield f"p95 {run['p95']:.1f} ms > {options['max_p95']} ms"
+        if (
+            options["min_throughput"] is not None
+            and run["throughput"] < options["min_throughput"]
+        ):
+            yield f"{run['throughput']:.1f} req/s < {options['min_throughput']} req/s"
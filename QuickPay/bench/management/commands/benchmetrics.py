@@ -0,0 +1,92 @@
+import multiprocessing
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from QuickPay.portal import metrics
+
+
+class LockedCounter(metrics.Counter):
+    """The obvious alternative: one dict behind one lock."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.table = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.table[key] = self.table.get(key, 0) + amount
+
+
+def _childIncrements(directory, count):
+    with override_settings(METRICS={"DIR": directory, "FLUSH": 60.0}):
+        for _ in range(count):
+            metrics.PAYMENTS.inc(processor="bench", result="Success")
+        metrics.flush()
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures the cost of recording a metric across threads, and checks "
+        "that /metrics adds up values written by several processes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--ops", type=int, default=200_000)
+        parser.add_argument("--threads", default="1,8")
+        parser.add_argument("--processes", type=int, default=4)
+
+    def handle(self, *args, ops, threads, processes, **options):
+        histogram = metrics.Histogram("bench", "", ("stage",), register=False)
+        counter = metrics.Counter("bench", "", ("result",), register=False)
+        locked = LockedCounter("bench", "", ("result",), register=False)
+        operations = {
+            "Counter.inc": lambda: counter.inc(result="Success"),
+            "locked dict inc": lambda: locked.inc(result="Success"),
+            "Histogram.observe": lambda: histogram.observe(0.042, stage="gateway"),
+        }
+        self.stdout.write(f"{'operation':<20} {'threads':>7} {'ns/op':>8}")
+        for name, operation in operations.items():
+            for level in (int(level) for level in threads.split(",")):
+                elapsed = self.run(operation, ops, level)
+                self.stdout.write(f"{name:<20} {level:>7} {elapsed / ops * 1e9:>8.0f}")
+
+        perProcess = 1000
+        with tempfile.TemporaryDirectory() as directory:
+            context = multiprocessing.get_context("fork")
+            children = [
+                context.Process(target=_childIncrements, args=(directory, perProcess))
+                for _ in range(processes)
+            ]
+            for child in children:
+                child.start()
+            for child in children:
+                child.join()
+            with override_settings(METRICS={"DIR": directory, "FLUSH": 60.0}):
+                text = metrics.exposition()
+        total = processes * perProcess
+        series = 'processor="bench",result="Success",responseCode="",error=""'
+        if f"{{{series}}} {total}" not in text:
+            raise CommandError(f"Multi-process totals are wrong:\n{text}")
+        self.stdout.write(
+            f"{processes} processes x {perProcess} increments: "
+            f"/metrics reports {total}"
+        )
+
+    def run(self, operation, ops, threads):
+        perThread = ops // threads
+
+        def work(_):
+            for _ in range(perThread):
+                operation()
+
+        with ThreadPoolExecutor(threads) as pool:
+            started = time.perf_counter()
+            list(pool.map(work, range(threads)))
+            return time.perf_counter() - started
@@ -0,0 +1,47 @@
+import logging
+
+from django.core.management.base import BaseCommand
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from QuickPay.portal import gateway
+from QuickPay.bench.helpers import CARD, Stopwatch, benchDatabase, stubCredentials
+from QuickPay.portal.models import Transaction
+from QuickPay.portal.tests.stubgateway import StubGateway
+
+
+class Command(BaseCommand):
+    help = "Measures DB round-trips and CPU time per payment against a stub gateway."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--payments", type=int, default=200)
+        parser.add_argument("--codec", choices=["sdk", "lean"], default="sdk")
+        parser.add_argument(
+            "--log-level",
+            choices=["DEBUG", "INFO", "WARNING"],
+            help="Override the QuickPay logger level for the run.",
+        )
+
+    def handle(self, *args, payments, codec, log_level, **options):
+        if log_level:
+            logging.getLogger("QuickPay").setLevel(log_level)
+        queries = writes = 0
+        clock = Stopwatch()
+        stubCredentials()
+        with benchDatabase() as connection, StubGateway() as stub:
+            with override_settings(AUTH_NET_ENDPOINT=stub.url, AUTH_NET_CODEC=codec):
+                Transaction.process("A", "1.00", "warmup", CARD)
+                for i in range(payments):
+                    with CaptureQueriesContext(connection) as captured, clock:
+                        Transaction.process("A", "10.00", f"bench{i % 10}", CARD)
+                    queries += len(captured)
+                    writes += sum(
+                        q["sql"].startswith(("INSERT", "UPDATE"))
+                        for q in captured.captured_queries
+                    )
+
+        self.stdout.write(f"payments            {payments}")
+        self.stdout.write(f"queries / payment   {queries / payments:.2f}")
+        self.stdout.write(f"writes / payment    {writes / payments:.2f}")
+        self.stdout.write(f"cpu ms / payment    {clock.cpu / payments * 1000:.3f}")
+        self.stdout.write(f"wall ms / payment   {clock.wall / payments * 1000:.3f}")
+        self.stdout.write(f"gateway pool        {gateway.transport().stats()}")
@@ -0,0 +1,158 @@
+import re
+import tempfile
+from functools import partial
+
+from django.contrib.staticfiles import views as staticViews
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.shortcuts import render
+from django.test import RequestFactory
+from django.test.utils import override_settings
+
+from QuickPay.portal import assets
+from QuickPay.bench.helpers import Stopwatch
+
+ASSET = re.compile(r'(?:href|src)="/static/([^"]+)"')
+BROWSER = {"HTTP_ACCEPT_ENCODING": "gzip, deflate, br"}
+
+
+def body(response) -> bytes:
+    if response.streaming:
+        return b"".join(response.streaming_content)
+    return response.content
+
+
+class Visit:
+    """One page view: the HTML request plus whatever asset requests follow."""
+
+    def __init__(self):
+        self.requests = 0
+        self.html = 0
+        self.assets = 0
+        self.clock = Stopwatch()
+
+    def fetch(self, view, request, *args):
+        with self.clock:
+            response = view(request, *args)
+            data = body(response)
+        self.requests += 1
+        return response, data
+
+    def modeledMs(self, rtt: float, bandwidth: float) -> float:
+        """
+        HTML, then every asset in parallel over the same link, each leg one
+        round trip plus its bytes on the wire. Connection setup is ignored.
+        """
+        total = rtt + self.html * 8 / bandwidth
+        if self.requests > 1:
+            total += rtt + self.assets * 8 / bandwidth
+        return total * 1000
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares bytes transferred, server time and modeled load time for "
+        "the portal page before and after the render cache and asset build."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--visits", type=int, default=200)
+        parser.add_argument("--rtt", type=float, default=0.150, help="Seconds.")
+        parser.add_argument(
+            "--bandwidth", type=float, default=1.6e6, help="Bits per second."
+        )
+
+    def handle(self, *args, visits, rtt, bandwidth, **options):
+        factory = RequestFactory()
+        results = {}
+        plain = {
+            "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+            "staticfiles": {
+                "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"
+            },
+        }
+        with override_settings(DEBUG=False, STORAGES=plain):
+            results["before"] = self.measure(visits, factory, self.before)
+
+        with (
+            tempfile.TemporaryDirectory() as root,
+            override_settings(DEBUG=False, STATIC_ROOT=root),
+        ):
+            call_command("collectstatic", interactive=False, verbosity=0)
+            assets._pages.clear()
+            results["after"] = self.measure(visits, factory, self.after)
+            assets._pages.clear()
+
+        self.stdout.write(
+            f"{'':<8} {'visit':<5} {'requests':>8} {'html B':>8} {'assets B':>9} "
+            f"{'server ms':>9} {'modeled ms':>10}"
+        )
+        for label, (cold, warm) in results.items():
+            for kind, visit in (("cold", cold), ("warm", warm)):
+                self.stdout.write(
+                    f"{label:<8} {kind:<5} {visit.requests:>8} {visit.html:>8} "
+                    f"{visit.assets:>9} {visit.clock.wall / visits * 1000:>9.3f} "
+                    f"{visit.modeledMs(rtt, bandwidth):>10.0f}"
+                )
+        self.stdout.write(
+            f"modeled: {bandwidth / 1e6:g} Mbit/s, {rtt * 1000:g} ms RTT; "
+            "excludes connection setup, parsing and the CDN script"
+        )
+
+    def measure(self, visits, factory, visit):
+        """Averages ``visits`` cold and warm visits; byte counts are per visit."""
+        cold, warm = Visit(), Visit()
+        validators = visit(cold, factory, {})
+        for _ in range(visits - 1):
+            visit(cold, factory, {})
+        for _ in range(visits):
+            visit(warm, factory, validators)
+        for result in (cold, warm):
+            result.requests //= visits
+            result.html //= visits
+            result.assets //= visits
+        return cold, warm
+
+    def before(self, visit, factory, validators):
+        """
+        The old view rendered the template per request and the assets went
+        out uncompressed, revalidated by Last-Modified on return visits.
+        """
+        response, html = visit.fetch(render, factory.get("/", **BROWSER), "index.html")
+        visit.html += len(html)
+        seen = {}
+        for path in ASSET.findall(html.decode()):
+            headers = dict(BROWSER)
+            if path in validators:
+                headers["HTTP_IF_MODIFIED_SINCE"] = validators[path]
+            response, data = visit.fetch(
+                partial(staticViews.serve, insecure=True),
+                factory.get(f"/static/{path}", **headers),
+                path,
+            )
+            visit.assets += len(data)
+            seen[path] = response.get("Last-Modified", validators.get(path))
+        return seen
+
+    def after(self, visit, factory, validators):
+        """
+        The cached page revalidates by ETag; hashed assets are immutable, so
+        a browser holding the page's validator already has them.
+        """
+        headers = dict(BROWSER)
+        if "page" in validators:
+            headers["HTTP_IF_NONE_MATCH"] = validators["page"]
+        response, html = visit.fetch(
+            lambda request: assets.page("index.html").respond(request),
+            factory.get("/", **headers),
+        )
+        visit.html += len(html)
+        if response.status_code == 304:
+            return validators
+        page = assets.page("index.html").body.decode()
+        for path in ASSET.findall(page):
+            response, data = visit.fetch(
+                assets.serve, factory.get(f"/static/{path}", **BROWSER), path
+            )
+            visit.assets += len(data)
+        return {"page": assets.page("index.html").etag}
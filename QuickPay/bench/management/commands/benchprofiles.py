@@ -0,0 +1,118 @@
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import Client
+
+from QuickPay.portal import assets
+from QuickPay.bench.helpers import benchDatabase
+
+ENDPOINTS = {
+    "page": ("/", {}),
+    "page 304": ("/", "etag"),
+    "dashboard": ("/dashboard/", {}),
+    "admin login": ("/admin/login/", {}),
+}
+PROFILE_ENV = {
+    "dev": {},
+    "bench": {},
+    # Placeholder secret: prod refuses to start without one
+    "prod": {"DJANGO_SECRET_KEY": "bench-" + "x" * 50, "DJANGO_ALLOWED_HOSTS": "*"},
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares startup time and per-request overhead of the settings "
+        "profiles, each in a fresh process."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--profiles", default="dev,prod,bench")
+        parser.add_argument("--requests", type=int, default=500)
+        parser.add_argument("--starts", type=int, default=5)
+        parser.add_argument(
+            "--child",
+            action="store_true",
+            help="Internal: measure this process's profile and print JSON.",
+        )
+
+    def handle(self, *args, profiles, requests, starts, child, **options):
+        if child:
+            self.stdout.write(json.dumps(self.child(requests)))
+            return
+
+        results = {}
+        for profile in profiles.split(","):
+            env = {
+                **os.environ,
+                **PROFILE_ENV.get(profile, {}),
+                "QUICKPAY_PROFILE": profile,
+                "QUICKPAY_LOG_LEVEL": "WARNING",
+            }
+            startups = []
+            for _ in range(starts):
+                started = time.perf_counter()
+                self.run(env, 0)
+                startups.append(time.perf_counter() - started)
+            results[profile] = self.run(env, requests)
+            results[profile]["startup"] = statistics.median(startups)
+
+        names = list(ENDPOINTS)
+        self.stdout.write(
+            f"{'profile':<8} {'startup ms':>10} "
+            + " ".join(f"{name + ' µs':>14}" for name in names)
+            + f" {'rss growth KiB':>15}"
+        )
+        for profile, result in results.items():
+            self.stdout.write(
+                f"{profile:<8} {result['startup'] * 1000:>10.0f} "
+                + " ".join(f"{result['endpoints'][name]:>14.0f}" for name in names)
+                + f" {result['rssGrowth']:>15}"
+            )
+
+    def run(self, env, requests):
+        output = subprocess.run(
+            [
+                sys.executable,
+                str(settings.BASE_DIR / "manage.py"),
+                "benchprofiles",
+                "--child",
+                f"--requests={requests}",
+            ],
+            env=env,
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout
+        return json.loads(output.strip().splitlines()[-1])
+
+    def child(self, requests):
+        """
+        Loads the URLconf and middleware, then times ``requests`` round trips
+        per endpoint through the full handler stack.
+        """
+        client = Client()
+        if not requests:
+            client.get("/", HTTP_IF_NONE_MATCH="*")
+            return {}
+        timings = {}
+        with benchDatabase():
+            client.get("/")
+            rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            for name, (path, headers) in ENDPOINTS.items():
+                if headers == "etag":
+                    headers = {"HTTP_IF_NONE_MATCH": assets.page("index.html").etag}
+                client.get(path, **headers)
+                started = time.perf_counter()
+                for _ in range(requests):
+                    client.get(path, **headers)
+                timings[name] = (time.perf_counter() - started) / requests * 1e6
+            growth = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss
+        return {"profile": settings.PROFILE, "endpoints": timings, "rssGrowth": growth}
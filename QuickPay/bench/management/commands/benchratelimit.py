@@ -0,0 +1,137 @@
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from QuickPay.bench.helpers import CARD, benchDatabase, stubCredentials
+from QuickPay.portal.ratelimit import SharedTokenBuckets, TokenBucket
+from QuickPay.portal.tests.stubgateway import StubGateway
+
+PAYLOAD = json.dumps({**CARD, "amount": "10.00", "salesperson": "bench"})
+
+
+def _childTakes(path, burst, attempts, granted):
+    buckets = SharedTokenBuckets(path)
+    taken = sum(not buckets.take("hot", 0.001, burst) for _ in range(attempts))
+    with granted.get_lock():
+        granted.value += taken
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures the rate limiter's cost per check, checks that worker "
+        "processes share one bucket, and times a throttled /process/ request "
+        "against an admitted one."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--ops", type=int, default=50_000)
+        parser.add_argument("--threads", default="1,8")
+        parser.add_argument("--processes", type=int, default=4)
+        parser.add_argument("--requests", type=int, default=200)
+
+    def handle(self, *args, ops, threads, processes, requests, **options):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "ratelimit.sqlite3")
+            shared = SharedTokenBuckets(path)
+            local = TokenBucket(1e9, 1e9)
+            operations = {
+                "TokenBucket.take": lambda i: local.take(),
+                "shared, one key": lambda i: shared.take("hot", 1e9, 1e9),
+                "shared, 10k keys": lambda i: shared.take(f"k{i % 10000}", 1e9, 1e9),
+            }
+            self.stdout.write(f"{'operation':<20} {'threads':>7} {'us/op':>8}")
+            for name, operation in operations.items():
+                for level in (int(level) for level in threads.split(",")):
+                    elapsed = self.run(operation, ops, level)
+                    self.stdout.write(
+                        f"{name:<20} {level:>7} {elapsed / ops * 1e6:>8.2f}"
+                    )
+
+            burst, attempts = 100, 500
+            shared.clear()
+            granted = multiprocessing.get_context("fork").Value("i", 0)
+            children = [
+                multiprocessing.get_context("fork").Process(
+                    target=_childTakes, args=(path, burst, attempts, granted)
+                )
+                for _ in range(processes)
+            ]
+            for child in children:
+                child.start()
+            for child in children:
+                child.join()
+            if granted.value != burst:
+                raise CommandError(
+                    f"{processes} processes took {granted.value} tokens "
+                    f"from a bucket of {burst}"
+                )
+            self.stdout.write(
+                f"{processes} processes x {attempts} takes on a bucket of {burst}: "
+                f"{granted.value} granted"
+            )
+
+            self.endToEnd(path, requests)
+
+    def endToEnd(self, path, requests):
+        stubCredentials()
+        limits = {
+            **settings.RATE_LIMITS,
+            "DB": path,
+            "LIMITS": {"client": {"RATE": 0.001, "BURST": requests}},
+        }
+        with (
+            benchDatabase() as connection,
+            StubGateway() as stub,
+            override_settings(
+                DEBUG=False,
+                ALLOWED_HOSTS=["testserver"],
+                AUTH_NET_ENDPOINT=stub.url,
+                RATE_LIMITS=limits,
+            ),
+        ):
+            client = Client()
+            rows = []
+            for label in ("admitted", "throttled"):
+                statuses = set()
+                with CaptureQueriesContext(connection) as captured:
+                    started = time.perf_counter()
+                    for _ in range(requests):
+                        response = client.post(
+                            "/process/", PAYLOAD, content_type="application/json"
+                        )
+                        statuses.add(response.status_code)
+                    elapsed = (time.perf_counter() - started) / requests
+                rows.append((label, elapsed, len(captured) / requests, statuses))
+                if label == "throttled":
+                    retryAfter = response["Retry-After"]
+
+        self.stdout.write("")
+        self.stdout.write(
+            f"{'/process/':<10} {'us/request':>11} {'queries':>8}  status"
+        )
+        for label, elapsed, queries, statuses in rows:
+            self.stdout.write(
+                f"{label:<10} {elapsed * 1e6:>11.1f} {queries:>8.1f}  "
+                f"{', '.join(map(str, sorted(statuses)))}"
+            )
+        self.stdout.write(f"Retry-After on a throttled request: {retryAfter} s")
+
+    def run(self, operation, ops, threads):
+        perThread = ops // threads
+
+        def work(offset):
+            for i in range(offset * perThread, (offset + 1) * perThread):
+                operation(i)
+
+        with ThreadPoolExecutor(threads) as pool:
+            started = time.perf_counter()
+            list(pool.map(work, range(threads)))
+            return time.perf_counter() - started
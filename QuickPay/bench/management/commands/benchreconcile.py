@@ -0,0 +1,173 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from QuickPay.portal import reconcile, rollups
+from QuickPay.bench.helpers import (
+    CARD,
+    Stopwatch,
+    benchDatabase,
+    seedTransactions,
+    stubCredentials,
+)
+from QuickPay.portal.models import Result, SalesRollup, Transaction
+from QuickPay.portal.tests.stubgateway import StubGateway
+
+MIX = {"declined": 0.1, "http500": 0.05, "drop": 0.1}
+
+
+def rollupDrift() -> int:
+    """
+    Rollup rows a rebuild changes. Compared as stored rather than through
+    ``rebuild``'s own count, whose SQLite sums come back as floats.
+    """
+
+    def snapshot():
+        return {
+            (row[0], row[1]): row[2:]
+            for row in SalesRollup.objects.values_list(
+                "salesperson", "day", "approved", "approvedAmount", "failed"
+            )
+        }
+
+    before = snapshot()
+    rollups.rebuild()
+    after = snapshot()
+    return sum(before.get(key) != after.get(key) for key in before.keys() | after)
+
+
+class Command(BaseCommand):
+    help = (
+        "Processes payments against a stub gateway that drops some answers, "
+        "settles them and checks that reconciliation repairs the NO_RESPONSE "
+        "rows; then times reconciling a large seeded ledger at concurrency 1 "
+        "and --concurrency."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--payments", type=int, default=400)
+        parser.add_argument("--rows", type=int, default=100_000)
+        parser.add_argument("--lost", type=float, default=0.02)
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--latency", type=float, default=0.02)
+        parser.add_argument("--concurrency", type=int, default=8)
+
+    def handle(self, *args, **options):
+        stubCredentials()
+        with benchDatabase():
+            self.endToEnd(options["payments"])
+        with benchDatabase():
+            self.seeded(options)
+
+    def endToEnd(self, payments):
+        with (
+            StubGateway(mix=MIX, seed=1) as stub,
+            override_settings(AUTH_NET_ENDPOINT=stub.url),
+        ):
+            for _ in range(payments):
+                Transaction.process("A", "25.00", "bench", CARD)
+            lost = Transaction.objects.filter(error="NO_RESPONSE")
+            lostIds = set(lost.values_list("id", flat=True))
+            charged = {entry["invoiceNumber"]: entry for entry in stub.ledger}
+            stub.settle(batchSize=100)
+            stats = reconcile.reconcile("A")
+
+        self.stdout.write(f"stub outcomes: {stub.served}")
+        self.stdout.write(f"reconciled: {stats}")
+        wrong = 0
+        for tx in Transaction.objects.all():
+            entry = charged.get(tx.invoiceNumber)
+            expected = entry and reconcile.STATUSES[entry["status"]][0]
+            if entry and (tx.result, tx.transId) != (expected, entry["transId"]):
+                wrong += 1
+        repaired = Transaction.objects.filter(
+            id__in=lostIds, result=Result.SUCCESS
+        ).count()
+        drifted = rollupDrift()
+        self.stdout.write(
+            f"{len(lostIds)} NO_RESPONSE rows, {repaired} now approved; "
+            f"{wrong} rows disagree with the ledger; {drifted} rollup rows drifted"
+        )
+        if wrong or drifted or repaired != len(lostIds):
+            raise CommandError("Reconciliation left rows out of step")
+
+    def seeded(self, options):
+        rows, batchSize = options["rows"], options["batch_size"]
+        seedTransactions(rows, days=1)
+        with (
+            StubGateway(latency=options["latency"]) as stub,
+            override_settings(AUTH_NET_ENDPOINT=stub.url),
+        ):
+            for tx in Transaction.objects.order_by("id").iterator(chunk_size=5000):
+                stub.record(
+                    tx.transId,
+                    tx.invoiceNumber,
+                    tx.amount,
+                    (
+                        "settledSuccessfully"
+                        if tx.result == Result.SUCCESS
+                        else "declined"
+                    ),
+                    tx.created_at,
+                    tx.accountNumber,
+                )
+            stub.settle(batchSize)
+            step = max(1, round(1 / options["lost"])) if options["lost"] else 0
+            lost = (
+                Transaction.objects.filter(result=Result.SUCCESS)
+                .order_by("id")
+                .values_list("id", flat=True)[::step]
+                if step
+                else []
+            )
+            Transaction.objects.filter(id__in=lost).update(
+                result=Result.ERROR,
+                responseCode=None,
+                transId=None,
+                resultStatus=None,
+                error="NO_RESPONSE",
+                errorText="No response from payment gateway",
+            )
+            rollups.rebuild()
+
+            results = []
+            for concurrency, dryRun in (
+                (1, True),
+                (options["concurrency"], True),
+                (options["concurrency"], False),
+                (options["concurrency"], False),
+            ):
+                config = {**settings.RECONCILE, "CONCURRENCY": concurrency}
+                with override_settings(RECONCILE=config), Stopwatch() as clock:
+                    stats = reconcile.reconcile("A", dryRun=dryRun)
+                results.append((concurrency, dryRun, clock, stats))
+
+        pages = sum(-(-len(b["transactions"]) // 1000) for b in stub.batches.values())
+        self.stdout.write("")
+        self.stdout.write(
+            f"{rows} settled in {len(stub.batches)} batches ({pages} pages), "
+            f"{len(lost)} stored as NO_RESPONSE, {options['latency'] * 1000:.0f} ms "
+            "per reporting call"
+        )
+        self.stdout.write(
+            f"{'concurrency':>11} {'mode':>8} {'wall s':>7} {'cpu s':>6} "
+            f"{'matched':>8} {'corrected':>9}"
+        )
+        for concurrency, dryRun, clock, stats in results:
+            self.stdout.write(
+                f"{concurrency:>11} {'dry run' if dryRun else 'write':>8} "
+                f"{clock.wall:>7.2f} {clock.cpu:>6.2f} {stats['matched']:>8} "
+                f"{stats['corrected']:>9}"
+            )
+        drifted = rollupDrift()
+        remaining = Transaction.objects.filter(error="NO_RESPONSE").count()
+        self.stdout.write(
+            f"{remaining} NO_RESPONSE rows left, {drifted} rollup rows drifted"
+        )
+        if (
+            remaining
+            or drifted
+            or results[2][3]["corrected"] != len(lost)
+            or results[3][3]["corrected"]
+        ):
+            raise CommandError("Reconciliation left rows out of step")
@@ -0,0 +1,76 @@
+import timeit
+
+from django.core.management.base import BaseCommand
+
+from QuickPay.portal import reporting
+from QuickPay.bench.helpers import benchDatabase, seedTransactions
+from QuickPay.portal.models import Transaction
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds a large transaction table and times the reporting queries with "
+        "and without the reporting indexes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=200_000)
+        parser.add_argument("--number", type=int, default=20)
+
+    def handle(self, *args, rows, number, **options):
+        with benchDatabase() as connection:
+            seedTransactions(rows)
+            middle = Transaction.objects.order_by("id")[rows // 2]
+            cursor = reporting.encodeCursor(middle)
+            cases = {
+                "salesperson, first page": ({"salesperson": "sales07"}, None),
+                "result, first page": ({"result": "Failed"}, None),
+                "transId lookup": ({"transId": middle.transId}, None),
+                "invoiceID lookup": ({"invoiceID": middle.invoiceID}, None),
+                "date range, first page": (
+                    {
+                        "since": middle.created_at.date().isoformat(),
+                        "until": middle.created_at.date().isoformat(),
+                    },
+                    None,
+                ),
+                "all, keyset page at 50%": ({}, cursor),
+                "salesperson, keyset at 50%": ({"salesperson": "sales07"}, cursor),
+            }
+
+            indexed = self.measure(cases, number)
+            offset = timeit.timeit(
+                lambda: list(
+                    Transaction.objects.only(*reporting.LIST_FIELDS).order_by(
+                        "-created_at", "-id"
+                    )[rows // 2 : rows // 2 + 50]
+                ),
+                number=number,
+            )
+            with connection.schema_editor() as editor:
+                for index in Transaction._meta.indexes:
+                    editor.remove_index(Transaction, index)
+            scanned = self.measure(cases, number)
+
+        self.stdout.write(f"{rows} rows, mean of {number} runs, ms per query")
+        self.stdout.write(f"{'':<30}{'indexed':>10}{'no index':>10}")
+        for name in cases:
+            self.stdout.write(
+                f"{name:<30}{indexed[name] * 1000:>10.2f}{scanned[name] * 1000:>10.2f}"
+            )
+        self.stdout.write(
+            f"{'all, OFFSET page at 50%':<30}{offset / number * 1000:>10.2f}"
+        )
+
+    @staticmethod
+    def measure(cases, number):
+        return {
+            name: timeit.timeit(
+                lambda: reporting.page(
+                    reporting.filterTransactions(params), cursor, 50
+                ),
+                number=number,
+            )
+            / number
+            for name, (params, cursor) in cases.items()
+        }
@@ -0,0 +1,81 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from QuickPay.portal import validation
+from QuickPay.bench.helpers import CARD, benchDatabase, stubCredentials
+from QuickPay.portal.models import Transaction
+from QuickPay.portal.tests.stubgateway import StubGateway
+
+CASES = {
+    "valid": ("10.00", CARD),
+    "bad luhn": ("10.00", {**CARD, "number": "4111111111111112"}),
+    "expired": ("10.00", {**CARD, "expiration": "2020-01"}),
+    "amex cvv": ("10.00", {**CARD, "number": "378282246310005", "cvv": "123"}),
+    "bad amount": ("10.001", CARD),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Times the pre-gateway validation per case, and a rejected payment "
+        "against the same bad card sent to the stub gateway unvalidated."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=20000)
+        parser.add_argument("--payments", type=int, default=50)
+
+    def handle(self, *args, iterations, payments, **options):
+        self.stdout.write(f"{'case':<12} {'validate µs':>12} {'validateMany µs':>16}")
+        for name, (amount, card) in CASES.items():
+            call = ("A", amount, "bench", card)
+            started = time.perf_counter()
+            for _ in range(iterations):
+                try:
+                    validation.validate(*call)
+                except validation.PaymentRejected:
+                    pass
+            single = (time.perf_counter() - started) / iterations
+            started = time.perf_counter()
+            validation.validateMany([call] * iterations)
+            batched = (time.perf_counter() - started) / iterations
+            self.stdout.write(
+                f"{name:<12} {single * 1e6:>12.2f} {batched * 1e6:>16.2f}"
+            )
+
+        bad = {**CARD, "number": "4111111111111112"}
+        stubCredentials()
+        with (
+            benchDatabase() as connection,
+            StubGateway() as stub,
+            override_settings(AUTH_NET_ENDPOINT=stub.url),
+        ):
+            Transaction.process("A", "1.00", "warmup", CARD)
+            rows = []
+            for label, run in (
+                ("rejected up front", lambda: Transaction.process("A", "10", "b", bad)),
+                (
+                    "sent to gateway",
+                    lambda: Transaction.strategy("A", "10", "b", bad).process(),
+                ),
+            ):
+                with CaptureQueriesContext(connection) as captured:
+                    started = time.perf_counter()
+                    for _ in range(payments):
+                        run()
+                    elapsed = (time.perf_counter() - started) / payments
+                rows.append((label, elapsed, len(captured) / payments, stub.requests))
+
+        self.stdout.write("")
+        self.stdout.write(
+            f"{'bad card':<18} {'µs / payment':>13} {'queries':>8} {'gateway calls':>14}"
+        )
+        calls = 0
+        for label, elapsed, queries, requests in rows:
+            self.stdout.write(
+                f"{label:<18} {elapsed * 1e6:>13.1f} {queries:>8.1f} "
+                f"{(requests - calls) / payments:>14.1f}"
+            )
+            calls = requests
@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from QuickPay.portal.tests.stubgateway import StubGateway, parseMix
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs the stub Authorize.net gateway in the foreground; point "
+        "AUTH_NET_ENDPOINT at the printed URL."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8089)
+        parser.add_argument("--latency", type=float, default=0.0)
+        parser.add_argument("--jitter", type=float, default=0.0)
+        parser.add_argument(
+            "--mix",
+            default="",
+            help="Outcome rates, e.g. declined=0.1,invalid=0.02,http500=0.01",
+        )
+        parser.add_argument("--seed", type=int)
+
+    def handle(self, *args, host, port, latency, jitter, mix, seed, **options):
+        try:
+            stub = StubGateway(host, port, latency, jitter, parseMix(mix), seed)
+        except (OSError, ValueError) as e:
+            raise CommandError(e)
+        with stub:
+            self.stdout.write(f"Stub gateway listening on {stub.url}")
+            try:
+                while True:
+                    time.sleep(3600)
+            except KeyboardInterrupt:
+                pass
+        self.stdout.write(f"served {stub.requests}: {stub.served}")
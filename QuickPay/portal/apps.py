@@ -1,6 +1,14 @@
 from django.apps import AppConfig
+from django.core import checks
 
 
 class PortalConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "QuickPay.portal"
+
+    def ready(self):
+        from .processors import checkCredentials, registry
+
+        # Strategies registered themselves when the models module was imported
+        registry.load()
+        checks.register(checkCredentials)
@@ -0,0 +1,401 @@
+"""
+Cold storage for old transactions (``ARCHIVE`` in settings).
+
+``archivetransactions`` moves final rows (approved or declined) older than
+a cutoff out of the ``Transaction`` table into one gzip file of NDJSON per
+month. Rows still in error stay live until reconciliation settles them.
+Each batch is appended as its own gzip member: a line naming the columns,
+then one JSON array per row in ``(created_at, id)`` order. ``ArchivePartition``
+lists every month's members with their time bounds; members never overlap,
+so a row archived late is merged with the members it falls between and
+written again.
+
+Next to each month's file, ``transactions-<month>.index`` maps the digest of
+every archived ``transId`` and ``invoiceID`` to the row's id and member
+offset, in fixed-width entries sorted by digest. A lookup binary-searches
+one small file per month and decompresses a single member.
+
+Archived and live rows interleave in time, so ``page`` and ``exportValues``
+are merged with the live rows on ``(created_at, id)``.
+"""
+
+import gzip
+import hashlib
+import heapq
+import json
+import os
+import struct
+import zlib
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta
+from itertools import islice
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import export, reporting
+from .models import ArchivePartition, Result, Transaction
+
+READ_SIZE = 64 * 1024
+
+# Only outcomes that cannot change any more are archived
+FINAL = (Result.SUCCESS, Result.FAILED)
+
+# Index entry: identifier digest, member offset, row id
+ENTRY = struct.Struct(">12sQQ")
+INDEXED = ("transId", "invoiceID")
+
+
+class ArchiveBusy(RuntimeError):
+    pass
+
+
+def directory() -> Path:
+    return Path(settings.ARCHIVE["DIR"])
+
+
+def path(month: str) -> Path:
+    return directory() / f"transactions-{month}.ndjson.gz"
+
+
+def indexPath(month: str) -> Path:
+    return directory() / f"transactions-{month}.index"
+
+
+def cutoff(ageDays: int, now: datetime | None = None) -> datetime:
+    """Local midnight ``ageDays`` ago, so a day is never split across stores."""
+    day = timezone.localdate(now) - timedelta(days=ageDays)
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def horizon() -> datetime | None:
+    """``created_at`` of the newest archived row."""
+    return ArchivePartition.objects.aggregate(last=Max("last"))["last"]
+
+
+@contextmanager
+def _lock():
+    """Holds the archive lock, or raises ``ArchiveBusy``."""
+    lockPath = directory() / ".lock"
+    try:
+        import fcntl
+    except ImportError:
+        # No flock: the lock file existing is the lock. A run killed without
+        # cleaning up leaves it behind, to be deleted by hand.
+        try:
+            fd = os.open(lockPath, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            raise ArchiveBusy(f"Another archive run is in progress ({lockPath})")
+        try:
+            yield
+        finally:
+            os.close(fd)
+            os.unlink(lockPath)
+        return
+    with open(lockPath, "w") as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise ArchiveBusy("Another archive run is in progress")
+        yield
+
+
+def archive(before: datetime, batchSize: int | None = None):
+    """
+    Moves every final transaction created before ``before`` into the
+    archive, ``batchSize`` rows per transaction, yielding ``(month, rows)``
+    for each batch written. Raises ``ArchiveBusy`` if another run holds the
+    lock.
+    """
+    batchSize = batchSize or settings.ARCHIVE["BATCH_SIZE"]
+    fields = export.exportFields()
+    directory().mkdir(parents=True, exist_ok=True)
+    with _lock():
+        while True:
+            rows = list(
+                Transaction.objects.filter(created_at__lt=before, result__in=FINAL)
+                .order_by("created_at", "id")
+                .values_list(*fields)[:batchSize]
+            )
+            if not rows:
+                return
+            months = {}
+            for row in rows:
+                createdAt = row[fields.index("created_at")]
+                month = timezone.localtime(createdAt).strftime("%Y-%m")
+                months.setdefault(month, []).append(dict(zip(fields, row)))
+            for month, records in months.items():
+                _store(month, fields, records, batchSize)
+                yield month, len(records)
+
+
+def _encode(value):
+    # Full precision: DjangoJSONEncoder drops microseconds, which order rows
+    return value.isoformat() if isinstance(value, datetime) else str(value)
+
+
+def _digest(name: str, value) -> bytes:
+    return hashlib.blake2b(f"{name}={value}".encode(), digest_size=12).digest()
+
+
+def _append(month: str, fields: list[str], records: list[dict]) -> dict:
+    """Writes ``records`` as a new member of the month's file and lists it."""
+    lines = [json.dumps(fields)]
+    lines += [
+        json.dumps([record[name] for name in fields], default=_encode)
+        for record in records
+    ]
+    data = gzip.compress(("\n".join(lines) + "\n").encode(), mtime=0)
+    with open(path(month), "ab") as f:
+        offset = f.seek(0, os.SEEK_END)
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    return {
+        "offset": offset,
+        "rows": len(records),
+        "first": records[0]["created_at"].isoformat(),
+        "last": records[-1]["created_at"].isoformat(),
+        "records": records,  # for the index; dropped before listing
+    }
+
+
+def _writeIndex(month: str, entries, keep: set[int]):
+    """
+    Rewrites the month's index with ``entries`` (``(digest, offset, id)``)
+    added to the existing ones whose member offset is in ``keep``.
+    """
+    existing = []
+    if indexPath(month).exists():
+        data = indexPath(month).read_bytes()
+        existing = [entry for entry in ENTRY.iter_unpack(data) if entry[1] in keep]
+    partial = indexPath(month).with_suffix(".tmp")
+    with open(partial, "wb") as f:
+        f.write(b"".join(ENTRY.pack(*entry) for entry in sorted(existing + entries)))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(partial, indexPath(month))
+
+
+def _store(month: str, fields: list[str], records: list[dict], batchSize: int):
+    """
+    Appends ``records`` to the month's file and index, then in one
+    transaction lists the member and deletes the rows. A crash in between
+    leaves an unlisted member and the rows still live, to be archived again;
+    index entries pointing at unlisted members are ignored.
+
+    Records older than the month's newest member (rows that became final
+    late) are merged with the members they overlap, which are written again
+    and unlisted; their bytes stay in the file unused.
+    """
+    ids = [record["id"] for record in records]
+    partition = ArchivePartition.objects.filter(month=month).first()
+    listed = partition.members if partition else []
+    first, last = records[0]["created_at"], records[-1]["created_at"]
+    overlapping = [
+        member
+        for member in listed
+        if parse_datetime(member["last"]) >= first
+        and parse_datetime(member["first"]) <= last
+    ]
+    if overlapping:
+        defaults = {
+            field.attname: field.get_default()
+            for field in Transaction._meta.concrete_fields
+        }
+        for member in overlapping:
+            records = records + [
+                {**defaults, **record} for record in readMember(month, member["offset"])
+            ]
+        records.sort(key=lambda record: (record["created_at"], record["id"]))
+    members = [
+        _append(month, fields, records[start : start + batchSize])
+        for start in range(0, len(records), batchSize)
+    ]
+    _writeIndex(
+        month,
+        [
+            (_digest(name, record[name]), member["offset"], record["id"])
+            for member in members
+            for record in member.pop("records")
+            for name in INDEXED
+            if record[name]
+        ],
+        keep={member["offset"] for member in listed},
+    )
+
+    replaced = {member["offset"] for member in overlapping}
+    with transaction.atomic():
+        partition, _ = ArchivePartition.objects.select_for_update().get_or_create(
+            month=month, defaults={"first": first, "last": last}
+        )
+        partition.members = sorted(
+            [member for member in partition.members if member["offset"] not in replaced]
+            + members,
+            key=lambda member: parse_datetime(member["first"]),
+        )
+        partition.rows = sum(member["rows"] for member in partition.members)
+        partition.bytes = path(month).stat().st_size
+        partition.first = min(partition.first, first)
+        partition.last = max(partition.last, last)
+        partition.save()
+        Transaction.objects.filter(id__in=ids).delete()
+
+
+def readMember(month: str, offset: int, ids=None) -> list[dict]:
+    """
+    The rows of the gzip member at ``offset`` (only those in ``ids``, if
+    given), as attname -> value dicts.
+    """
+    decompressor = zlib.decompressobj(31)
+    chunks = []
+    with open(path(month), "rb") as f:
+        f.seek(offset)
+        while not decompressor.eof:
+            data = f.read(READ_SIZE)
+            if not data:
+                raise ValueError(f"Truncated archive member {month}:{offset}")
+            chunks.append(decompressor.decompress(data))
+    lines = b"".join(chunks).splitlines()
+    names = json.loads(lines[0])
+    fields = {field.attname: field for field in Transaction._meta.concrete_fields}
+    converters = [
+        (name, fields[name].to_python) for name in names if name in fields
+    ]  # a column dropped since is skipped
+    lines = lines[1:]
+    if ids is not None:
+        # Rows start with their id, so unwanted ones are never parsed
+        prefixes = tuple(b"[%d," % pk for pk in ids)
+        lines = [line for line in lines if line.startswith(prefixes)]
+    records = []
+    for row in json.loads(b"[" + b",".join(lines) + b"]"):
+        values = dict(zip(names, row))
+        records.append({name: convert(values[name]) for name, convert in converters})
+    return records
+
+
+def _records(params, newestFirst=False, before=None):
+    """
+    Archived rows matching the reporting filters in ``params``, oldest first
+    (or newest first), optionally only those before a ``(created_at, id)``
+    key. Members outside the requested range are never read.
+    """
+    lookups, since, until = reporting.parseFilters(params)
+    partitions = ArchivePartition.objects.using(settings.REPORTING_DATABASE)
+    if since:
+        partitions = partitions.filter(last__gte=since)
+    if until:
+        partitions = partitions.filter(first__lte=until)
+    if before:
+        partitions = partitions.filter(first__lte=before[0])
+
+    wanted = None
+    identifiers = [name for name in INDEXED if name in lookups]
+    if identifiers:
+        # One identifier narrows it to a row or two; the rest are checked below
+        digest = _digest(identifiers[0], lookups[identifiers[0]])
+        wanted = {}
+        for month in partitions.values_list("month", flat=True):
+            for offset, pk in _lookup(month, digest):
+                wanted.setdefault((month, offset), set()).add(pk)
+        partitions = partitions.filter(month__in={month for month, _ in wanted})
+
+    for partition in partitions.order_by("-month" if newestFirst else "month"):
+        members = partition.members[::-1] if newestFirst else partition.members
+        for member in members:
+            ids = None
+            if wanted is not None:
+                ids = wanted.get((partition.month, member["offset"]))
+                if ids is None:
+                    continue
+            first = parse_datetime(member["first"])
+            last = parse_datetime(member["last"])
+            if (since and last < since) or (until and first > until):
+                continue
+            if before and first > before[0]:
+                continue
+            records = readMember(partition.month, member["offset"], ids)
+            for record in reversed(records) if newestFirst else records:
+                createdAt = record["created_at"]
+                if (since and createdAt < since) or (until and createdAt > until):
+                    continue
+                if before and (createdAt, record["id"]) >= before:
+                    continue
+                if all(record[name] == value for name, value in lookups.items()):
+                    yield record
+
+
+def _lookup(month: str, digest: bytes) -> list[tuple[int, int]]:
+    """``(offset, id)`` of the month's index entries for ``digest``."""
+    try:
+        f = open(indexPath(month), "rb")
+    except FileNotFoundError:
+        return []
+    with f:
+        low, high = 0, f.seek(0, os.SEEK_END) // ENTRY.size
+        while low < high:  # first entry with a digest >= ``digest``
+            middle = (low + high) // 2
+            f.seek(middle * ENTRY.size)
+            if f.read(ENTRY.size)[:12] < digest:
+                low = middle + 1
+            else:
+                high = middle
+        f.seek(low * ENTRY.size)
+        found = []
+        while (data := f.read(ENTRY.size)) and data[:12] == digest:
+            found.append(ENTRY.unpack(data)[1:])
+        return found
+
+
+def rows(params, newestFirst=False, before=None):
+    """``_records`` as unsaved ``Transaction`` instances."""
+    fields = Transaction._meta.concrete_fields
+    for record in _records(params, newestFirst, before):
+        values = [
+            record[field.attname] if field.attname in record else field.get_default()
+            for field in fields
+        ]
+        yield Transaction.from_db(None, [field.attname for field in fields], values)
+
+
+def find(transId=None, invoiceID=None) -> Transaction | None:
+    """An archived transaction by gateway transaction ID or invoice number."""
+    params = {"transId": transId, "invoiceID": invoiceID}
+    return next(rows({name: value for name, value in params.items() if value}), None)
+
+
+def page(params, cursor: str | None, limit: int):
+    """
+    ``reporting.page`` over live and archived rows, merged newest first. The
+    archive is only read once the page reaches back to its newest row.
+    """
+    found, nextCursor = reporting.page(
+        reporting.filterTransactions(params), cursor, limit
+    )
+    newest = horizon()
+    if newest is None or (nextCursor is not None and found[-1].created_at > newest):
+        return found, nextCursor
+    before = reporting.decodeCursor(cursor) if cursor else None
+    archived = islice(rows(params, newestFirst=True, before=before), limit + 1)
+    merged = list(
+        islice(
+            heapq.merge(
+                found, archived, key=lambda row: (row.created_at, row.pk), reverse=True
+            ),
+            limit + 1,
+        )
+    )
+    if len(merged) > limit or nextCursor is not None:
+        nextCursor = reporting.encodeCursor(merged[limit - 1])
+    return merged[:limit], nextCursor
+
+
+def exportValues(params):
+    """Archived rows for ``export.exportRows(..., archived=)``, oldest first."""
+    fields = export.exportFields()
+    for record in _records(params):
+        yield [record.get(name) for name in fields]
@@ -0,0 +1,242 @@
+"""
+Static asset build and delivery for the payment portal.
+
+``collectstatic`` (or ``buildstatic``) runs every asset through
+``BuildStorage``: CSS and JS are minified, then content-hashed by the manifest
+storage, and each hashed file gets ``.gz`` (and, when the ``brotli`` package
+is installed, ``.br``) siblings. ``serve`` hands those out with far-future
+cache headers when Django serves static files itself (DEBUG off).
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import re
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+from django.http import FileResponse, Http404, HttpResponse
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+try:
+    import brotli
+except ImportError:  # optional; gzip is always built
+    brotli = None
+
+COMPRESSIBLE = (".css", ".js", ".svg", ".html", ".json", ".txt", ".map")
+IMMUTABLE = "public, max-age=31536000, immutable"
+APP_DIR = Path(__file__).resolve().parent
+HASHED = re.compile(r"\.[0-9a-f]{12}\.[^/.]+$")  # name.<md5[:12]>.ext
+
+
+def minifyCSS(text: str) -> str:
+    text = re.sub(r"/\*.*?\*/", "", text, flags=re.S)
+    text = re.sub(r"\s+", " ", text)
+    text = re.sub(r"\s*([{};,>])\s*", r"\1", text)
+    text = re.sub(r":\s+", ":", text)
+    return text.replace(";}", "}").strip()
+
+
+def minifyJS(text: str) -> str:
+    """
+    Conservative line-based pass: drops indentation, blank lines and
+    whole-line ``//`` comments, but keeps every line break (so automatic
+    semicolon insertion still sees them) and leaves template literals as
+    they are.
+    """
+    lines = []
+    inTemplate = False
+    for line in text.splitlines():
+        if inTemplate:
+            lines.append(line)
+        else:
+            stripped = line.strip()
+            if stripped and not stripped.startswith("//"):
+                lines.append(stripped)
+        inTemplate ^= len(re.findall(r"(?<!\\)`", line)) % 2 == 1
+    return "\n".join(lines) + "\n"
+
+
+MINIFIERS = {".css": minifyCSS, ".js": minifyJS}
+
+
+def isOwnAsset(source) -> bool:
+    """Only the portal's own assets are minified; vendored ones ship as-is."""
+    location = getattr(source, "location", None)
+    return location is not None and Path(location).resolve().is_relative_to(APP_DIR)
+
+
+def compress(data: bytes) -> dict[str, bytes]:
+    """Pre-compressed variants of ``data`` worth serving, by extension."""
+    variants = {".gz": gzip.compress(data, 9, mtime=0)}
+    if brotli is not None:
+        variants[".br"] = brotli.compress(data, quality=11)
+    return {ext: body for ext, body in variants.items() if len(body) < len(data)}
+
+
+class BuildStorage(ManifestStaticFilesStorage):
+    def post_process(self, paths, dry_run=False, **options):
+        if dry_run:
+            return
+        for name, (source, path) in list(paths.items()):
+            minify = MINIFIERS.get(Path(name).suffix)
+            if minify is None or not isOwnAsset(source):
+                continue
+            with self.open(name) as f:
+                minified = minify(f.read().decode()).encode()
+            self.delete(name)
+            self._save(name, ContentFile(minified))
+            # Hash the minified copy rather than the source
+            paths[name] = (self, name)
+
+        for name, hashedName, processed in super().post_process(
+            paths, dry_run, **options
+        ):
+            if hashedName and not isinstance(processed, Exception):
+                self.compress(hashedName)
+            yield name, hashedName, processed
+
+    def compress(self, name: str):
+        if not name.endswith(COMPRESSIBLE):
+            return
+        with self.open(name) as f:
+            data = f.read()
+        for ext, body in compress(data).items():
+            if self.exists(name + ext):
+                self.delete(name + ext)
+            self._save(name + ext, ContentFile(body))
+
+
+_ENCODINGS = ((".br", "br"), (".gz", "gzip"))
+
+
+def _qualities(request) -> dict[str, float]:
+    """Accept-Encoding as coding -> q-value (``*`` included when given)."""
+    qualities = {}
+    for item in request.headers.get("Accept-Encoding", "").split(","):
+        coding, *params = (part.strip() for part in item.split(";"))
+        if not coding:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0  # malformed: don't risk an encoding it can't read
+        qualities[coding.lower()] = q
+    return qualities
+
+
+def _accepts(request, coding: str) -> float:
+    """The client's q-value for ``coding``; 0 when it is not acceptable."""
+    qualities = _qualities(request)
+    return qualities.get(coding, qualities.get("*", 0.0))
+
+
+def serve(request, path):
+    """
+    Serves a collected static file, preferring a pre-compressed variant the
+    client accepts. Hashed names are cached for a year; anything else must
+    be revalidated.
+    """
+    try:
+        fullPath = Path(safe_join(settings.STATIC_ROOT, path))
+    except ValueError:
+        raise Http404(path)
+    if not fullPath.is_file():
+        raise Http404(path)
+
+    stat = fullPath.stat()
+    # Weak: the same validator covers the identity and compressed bodies
+    etag = f'W/"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    response = get_conditional_response(
+        request, etag=etag, last_modified=int(stat.st_mtime)
+    )
+    if response is None:
+        contentType = mimetypes.guess_type(fullPath.name)[0]
+        served = fullPath
+        encoding = None
+        # The client's preference first; ours (smallest first) breaks ties
+        for ext, coding in sorted(
+            _ENCODINGS, key=lambda item: -_accepts(request, item[1])
+        ):
+            variant = fullPath.with_name(fullPath.name + ext)
+            if _accepts(request, coding) > 0 and variant.is_file():
+                served, encoding = variant, coding
+                break
+        response = FileResponse(
+            served.open("rb"), content_type=contentType or "application/octet-stream"
+        )
+        if encoding:
+            response["Content-Encoding"] = encoding
+        response["Last-Modified"] = http_date(stat.st_mtime)
+    response["ETag"] = etag
+    response["Vary"] = "Accept-Encoding"
+    hashed = HASHED.search(path)
+    response["Cache-Control"] = IMMUTABLE if hashed else "public, max-age=0"
+    return response
+
+
+@dataclass(frozen=True)
+class Page:
+    body: bytes
+    gzipped: bytes
+    etag: str
+    modified: float
+
+    def respond(self, request) -> HttpResponse:
+        response = get_conditional_response(
+            request, etag=self.etag, last_modified=int(self.modified)
+        )
+        if response is None:
+            if _accepts(request, "gzip") > 0:
+                response = HttpResponse(self.gzipped)
+                response["Content-Encoding"] = "gzip"
+            else:
+                response = HttpResponse(self.body)
+            response["Content-Type"] = "text/html; charset=utf-8"
+            response["Last-Modified"] = http_date(self.modified)
+        response["ETag"] = self.etag
+        response["Vary"] = "Accept-Encoding"
+        # Revalidate on every visit: the page names this build's hashed assets
+        response["Cache-Control"] = "no-cache"
+        return response
+
+
+_pages: dict[str, Page] = {}
+_lock = threading.Lock()
+
+
+def page(template: str) -> Page:
+    """
+    ``template`` rendered once per process (every time under DEBUG, so
+    edits show up) along with its gzip body and validators. Only for
+    templates that render the same for every request.
+    """
+    if settings.DEBUG:
+        return _render(template)
+    if template not in _pages:
+        rendered = _render(template)
+        with _lock:
+            _pages.setdefault(template, rendered)
+    return _pages[template]
+
+
+def _render(template: str) -> Page:
+    body = render_to_string(template).encode()
+    return Page(
+        body=body,
+        gzipped=gzip.compress(body, 9, mtime=0),
+        etag=f'W/"{hashlib.sha256(body).hexdigest()[:20]}"',
+        modified=timezone.now().timestamp(),
+    )
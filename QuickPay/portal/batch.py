@@ -0,0 +1,130 @@
+import codecs
+import csv
+import io
+import json
+import logging
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.db import connection
+
+from . import validation
+from .models import Transaction
+from .ratelimit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+_buckets: dict[str, TokenBucket] = {}
+_lock = threading.Lock()
+
+
+def bucket(processor: str) -> TokenBucket | None:
+    """Process-wide bucket enforcing ``BATCH_RATE_LIMITS`` for a processor."""
+    rate = settings.BATCH_RATE_LIMITS.get(processor)
+    if not rate:
+        return None
+    with _lock:
+        if processor not in _buckets:
+            _buckets[processor] = TokenBucket(rate)
+        return _buckets[processor]
+
+
+def readJSON(stream) -> list[dict]:
+    charges = json.load(stream)
+    if not isinstance(charges, list):
+        raise ValueError("Expected a JSON array of charges")
+    for index, charge in enumerate(charges):
+        if not isinstance(charge, dict):
+            raise ValueError(f"Charge {index} is not a JSON object")
+    return charges
+
+
+def readCSV(stream):
+    """Yields one payload per CSV row; the header names the payload keys."""
+    if not isinstance(stream, io.TextIOBase):
+        stream = codecs.iterdecode(stream, "utf-8")
+    yield from csv.DictReader(stream)
+
+
+def processBatch(charges, concurrency: int | None = None):
+    """
+    Runs payloads through the strategy layer and yields ``(index, result)``
+    pairs in completion order.
+
+    Payloads are validated together first, and rejected ones are answered
+    without a row or a gateway call. Rows are bulk-inserted before
+    submission. At most ``concurrency`` gateway calls are in flight (capped
+    by ``BATCH_MAX_CONCURRENCY``), each waiting on its processor's rate
+    limit. Every result is written back from the calling thread with a
+    single UPDATE as its call completes, even if the caller stops reading.
+    """
+    concurrency = min(
+        concurrency or settings.BATCH_CONCURRENCY, settings.BATCH_MAX_CONCURRENCY
+    )
+    strategies = {}
+    checked = validation.validateMany(
+        Transaction.paymentArgs(payload) for payload in charges
+    )
+    for index, args in enumerate(checked):
+        if isinstance(args, validation.PaymentRejected):
+            yield index, args.result()
+            continue
+        try:
+            strategy = Transaction.strategy(*args)
+            strategy.prepare()
+        except Exception as e:
+            yield index, {"error": "PROCESSING_ERROR", "errorText": str(e)}
+            continue
+        strategy.tx.submitted = True
+        strategies[index] = (args[0], strategy)
+
+    txs = [strategy.tx for _, strategy in strategies.values()]
+    if connection.features.can_return_rows_from_bulk_insert:
+        Transaction.objects.bulk_create(txs, batch_size=500)
+    else:
+        for tx in txs:
+            tx.save()
+
+    def submit(processor, strategy):
+        if limit := bucket(processor):
+            limit.acquire()
+        return strategy.submit()
+
+    def finish(future, index):
+        strategy = strategies[index][1]
+        try:
+            response = future.result()
+        except Exception:
+            logger.exception("Gateway request failed", extra={"index": index})
+            response = None
+        results = strategy.record(response)
+        strategy.commit(response)
+        return results
+
+    pool = ThreadPoolExecutor(concurrency, thread_name_prefix="batch")
+    pending = {
+        pool.submit(submit, processor, strategy): index
+        for index, (processor, strategy) in strategies.items()
+    }
+    try:
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = pending.pop(future)
+                yield index, finish(future, index)
+    finally:
+        # The consumer went away (a streaming client disconnecting closes the
+        # generator): calls not yet started are dropped and their rows marked
+        # unsubmitted, and calls in flight are still recorded and committed.
+        pool.shutdown(wait=True, cancel_futures=True)
+        for future, index in pending.items():
+            try:
+                if future.cancelled():
+                    tx = strategies[index][1].tx
+                    tx.submitted = False
+                    tx.save(update_fields=["submitted"])
+                else:
+                    finish(future, index)
+            except Exception:
+                logger.exception("Could not record charge", extra={"index": index})
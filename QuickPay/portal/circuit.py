@@ -0,0 +1,188 @@
+import logging
+import math
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Per-processor circuit breaker with an adaptive read timeout. Thread-safe.
+
+    Calls are recorded over a rolling ``window`` of seconds. Once it holds
+    ``minCalls`` calls and at least ``errorRate`` of them failed, the circuit
+    opens and ``allow`` refuses calls for ``cooldown`` seconds. It then goes
+    half-open: up to ``probes`` calls are let through, and the circuit closes
+    when they all succeed or reopens on the first failure.
+
+    The read timeout tracks the gateway: ``timeoutFactor`` times the p99
+    latency of recent successful calls, kept within ``minTimeout`` and
+    ``maxTimeout``. With fewer than ``minCalls`` samples the last such value
+    stands (``maxTimeout`` at first), so probes after an outage are not given
+    the full timeout.
+
+    ``clock`` (``time.monotonic``) is only swapped out by tests.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window: float = 30.0,
+        minCalls: int = 20,
+        errorRate: float = 0.5,
+        cooldown: float = 15.0,
+        probes: int = 3,
+        timeoutFactor: float = 3.0,
+        minTimeout: float = 2.0,
+        maxTimeout: float = 30.0,
+        clock=time.monotonic,
+    ):
+        self.name = name
+        self.window = window
+        self.minCalls = minCalls
+        self.errorRate = errorRate
+        self.cooldown = cooldown
+        self.probes = probes
+        self.timeoutFactor = timeoutFactor
+        self.minTimeout = minTimeout
+        self.maxTimeout = maxTimeout
+        self.state = CLOSED
+        self.rejected = 0
+        self.opened = 0
+        self.__calls: deque[tuple[float, float, bool]] = deque()
+        self.__openedAt = 0.0
+        self.__probing = 0
+        self.__probed = 0
+        self.__timeout = maxTimeout
+        self.__clock = clock
+        self.__lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether a call may go to the gateway now; refusals are counted."""
+        with self.__lock:
+            if self.state == OPEN:
+                if self.__clock() - self.__openedAt < self.cooldown:
+                    self.rejected += 1
+                    return False
+                self.__transition(HALF_OPEN)
+                self.__probing = self.__probed = 0
+            if self.state == HALF_OPEN:
+                if self.__probing >= self.probes:
+                    self.rejected += 1
+                    return False
+                self.__probing += 1
+            return True
+
+    def record(self, latency: float, ok: bool):
+        """Records the outcome of a call that ``allow`` let through."""
+        with self.__lock:
+            now = self.__clock()
+            self.__calls.append((now, latency, ok))
+            self.__expire(now)
+            if self.state == HALF_OPEN:
+                if not ok:
+                    self.__open(now)
+                    return
+                self.__probed += 1
+                if self.__probed >= self.probes:
+                    # Judge the recovered gateway on fresh calls only
+                    self.__calls.clear()
+                    self.__transition(CLOSED)
+                return
+            if self.state == CLOSED and not ok:
+                failures = sum(not ok for _, _, ok in self.__calls)
+                if len(
+                    self.__calls
+                ) >= self.minCalls and failures >= self.errorRate * len(self.__calls):
+                    self.__open(now)
+
+    def timeout(self) -> float:
+        """Read timeout for the next call."""
+        with self.__lock:
+            self.__expire(self.__clock())
+            latencies = sorted(latency for _, latency, ok in self.__calls if ok)
+            if len(latencies) >= self.minCalls:
+                p99 = latencies[math.ceil(len(latencies) * 0.99) - 1]
+                self.__timeout = min(
+                    self.maxTimeout, max(self.minTimeout, p99 * self.timeoutFactor)
+                )
+            return self.__timeout
+
+    def snapshot(self) -> dict:
+        with self.__lock:
+            self.__expire(self.__clock())
+            calls = len(self.__calls)
+            failures = sum(not ok for _, _, ok in self.__calls)
+            latencies = [latency for _, latency, ok in self.__calls if ok]
+            state, rejected, opened = self.state, self.rejected, self.opened
+        return {
+            "processor": self.name,
+            "state": state,
+            "calls": calls,
+            "errorRate": failures / calls if calls else 0.0,
+            "meanLatency": sum(latencies) / len(latencies) if latencies else None,
+            "timeout": self.timeout(),
+            "rejected": rejected,
+            "opened": opened,
+        }
+
+    def __expire(self, now: float):
+        while self.__calls and now - self.__calls[0][0] > self.window:
+            self.__calls.popleft()
+
+    def __open(self, now: float):
+        self.__openedAt = now
+        self.opened += 1
+        self.__transition(OPEN)
+
+    def __transition(self, state: str):
+        logger.warning(
+            "Circuit %s for processor %s",
+            state,
+            self.name,
+            extra={"processor": self.name, "from": self.state, "to": state},
+        )
+        self.state = state
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+_lock = threading.Lock()
+
+
+def breaker(processor: str) -> CircuitBreaker:
+    """Process-wide breaker for a processor, configured by ``GATEWAY_BREAKER``."""
+    with _lock:
+        if processor not in _breakers:
+            config = settings.GATEWAY_BREAKER
+            _breakers[processor] = CircuitBreaker(
+                processor,
+                window=config["WINDOW"],
+                minCalls=config["MIN_CALLS"],
+                errorRate=config["ERROR_RATE"],
+                cooldown=config["COOLDOWN"],
+                probes=config["PROBES"],
+                timeoutFactor=config["TIMEOUT_FACTOR"],
+                minTimeout=config["MIN_TIMEOUT"],
+                maxTimeout=settings.GATEWAY_TRANSPORT["READ_TIMEOUT"],
+            )
+        return _breakers[processor]
+
+
+def snapshots() -> list[dict]:
+    with _lock:
+        breakers = list(_breakers.values())
+    return [b.snapshot() for b in breakers]
+
+
+def reset():
+    """Forgets every breaker (benchmarks and settings changes)."""
+    with _lock:
+        _breakers.clear()
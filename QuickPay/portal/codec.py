@@ -0,0 +1,284 @@
+"""
+Lean codec for the Authorize.net ``createTransactionRequest``/response pair.
+
+Writes the request XML directly and parses the response in one streaming
+pass into a flat ``AuthNetResponse``, skipping the pyxb object graph the SDK
+builds in both directions. For every request the schema accepts, the bytes
+produced are identical to ``createTransactionController.buildrequest()``.
+"""
+
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from decimal import Decimal
+from io import BytesIO
+
+from authorizenet.constants import constants as authConstants
+from lxml import etree
+
+NAMESPACE = "AnetApi/xml/v1/schema/AnetApiSchema.xsd"
+
+TRANSACTION_FIELDS = (
+    "responseCode",
+    "authCode",
+    "avsResultCode",
+    "cvvResultCode",
+    "cavvResultCode",
+    "transId",
+    "refTransID",
+    "transHash",
+    "testRequest",
+    "accountNumber",
+    "accountType",
+    "transHashSha2",
+    "networkTransId",
+)
+
+
+@dataclass(slots=True)
+class AuthNetResponse:
+    refId: str | None = None
+    resultCode: str | None = None  # messages.resultCode
+    messages: list[tuple[str | None, str | None]] = field(default_factory=list)
+    hasTransactionResponse: bool = False
+    responseCode: str | None = None
+    authCode: str | None = None
+    avsResultCode: str | None = None
+    cvvResultCode: str | None = None
+    cavvResultCode: str | None = None
+    transId: str | None = None
+    refTransID: str | None = None
+    transHash: str | None = None
+    testRequest: str | None = None
+    accountNumber: str | None = None
+    accountType: str | None = None
+    transHashSha2: str | None = None
+    networkTransId: str | None = None
+    # transactionResponse.messages.message -> (code, description)
+    transactionMessages: list[tuple[str | None, str | None]] = field(
+        default_factory=list
+    )
+    # transactionResponse.errors.error -> (errorCode, errorText)
+    errors: list[tuple[str | None, str | None]] = field(default_factory=list)
+
+
+def _escape(value) -> str:
+    # Mirrors xml.dom.minidom, which pyxb serializes through.
+    return (
+        str(value)
+        .replace("&", "&amp;")
+        .replace("<", "&lt;")
+        .replace('"', "&quot;")
+        .replace(">", "&gt;")
+    )
+
+
+def _element(name: str, value) -> str:
+    if value is None:
+        return ""
+    text = _escape(value)
+    return f"<{name}>{text}</{name}>" if text else f"<{name}/>"
+
+
+def formatDecimal(value) -> str:
+    """Canonical ``xs:decimal`` literal, as pyxb writes it (``10.00`` -> ``10.0``)."""
+    if isinstance(value, float):
+        value = str(value)
+    text = format(Decimal(value).normalize(), "f")
+    return text if "." in text else text + ".0"
+
+
+def _merchantAuthentication(name: str | None, transactionKey: str | None) -> str:
+    auth = _element("name", name) + _element("transactionKey", transactionKey)
+    if not auth:
+        return "<merchantAuthentication/>"
+    return f"<merchantAuthentication>{auth}</merchantAuthentication>"
+
+
+def encodeTransactionRequest(
+    refId: str | None,
+    name: str | None,
+    transactionKey: str | None,
+    amount,
+    cardNumber: str,
+    expirationDate: str,
+    cardCode: str,
+    invoiceNumber: str,
+    description: str,
+) -> bytes:
+    return (
+        '<?xml version="1.0" encoding="utf-8"?>'
+        f'<createTransactionRequest xmlns="{NAMESPACE}">'
+        + _merchantAuthentication(name, transactionKey)
+        + _element("clientId", authConstants.clientId)
+        + _element("refId", refId)
+        + "<transactionRequest>"
+        "<transactionType>authCaptureTransaction</transactionType>"
+        f"<amount>{formatDecimal(amount)}</amount>"
+        "<currencyCode>USD</currencyCode>"
+        "<payment><creditCard>"
+        + _element("cardNumber", cardNumber)
+        + _element("expirationDate", expirationDate)
+        + _element("cardCode", cardCode)
+        + "</creditCard></payment><order>"
+        + _element("invoiceNumber", invoiceNumber)
+        + _element("description", description)
+        + "</order></transactionRequest></createTransactionRequest>"
+    ).encode(authConstants.xml_encoding)
+
+
+def decodeTransactionResponse(body: bytes) -> AuthNetResponse:
+    """
+    Parses a ``createTransactionResponse`` (or ``ErrorResponse``) document.
+
+    Elements are matched on their path below the root and cleared as soon as
+    they close.
+    """
+    response = AuthNetResponse()
+    path: list[str] = []
+    message: dict[str, str | None] = {}
+    for event, element in etree.iterparse(
+        BytesIO(body.lstrip(b"\xef\xbb\xbf")), events=("start", "end")
+    ):
+        tag = etree.QName(element).localname
+        if event == "start":
+            path.append(tag)
+            continue
+
+        parents = tuple(path[1:-1])
+        path.pop()
+        if parents == ():
+            if tag == "refId":
+                response.refId = element.text
+            elif tag == "transactionResponse":
+                response.hasTransactionResponse = True
+        elif parents == ("messages",):
+            if tag == "resultCode":
+                response.resultCode = element.text
+            elif tag == "message":
+                response.messages.append((message.get("code"), message.get("text")))
+                message = {}
+        elif parents == ("transactionResponse",):
+            if tag in TRANSACTION_FIELDS:
+                setattr(response, tag, element.text)
+        elif parents == ("transactionResponse", "messages") and tag == "message":
+            response.transactionMessages.append(
+                (message.get("code"), message.get("description"))
+            )
+            message = {}
+        elif parents == ("transactionResponse", "errors") and tag == "error":
+            response.errors.append((message.get("errorCode"), message.get("errorText")))
+            message = {}
+        elif len(parents) >= 2 and parents[-1] in ("message", "error"):
+            message[tag] = element.text
+        element.clear()
+    return response
+
+
+def _dateTime(moment: datetime) -> str:
+    return moment.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def encodeSettledBatchListRequest(
+    name: str | None,
+    transactionKey: str | None,
+    firstSettlementDate: datetime,
+    lastSettlementDate: datetime,
+) -> bytes:
+    """The gateway accepts at most 31 days between the two dates."""
+    return (
+        '<?xml version="1.0" encoding="utf-8"?>'
+        f'<getSettledBatchListRequest xmlns="{NAMESPACE}">'
+        + _merchantAuthentication(name, transactionKey)
+        + "<includeStatistics>false</includeStatistics>"
+        + _element("firstSettlementDate", _dateTime(firstSettlementDate))
+        + _element("lastSettlementDate", _dateTime(lastSettlementDate))
+        + "</getSettledBatchListRequest>"
+    ).encode(authConstants.xml_encoding)
+
+
+def encodeTransactionListRequest(
+    name: str | None,
+    transactionKey: str | None,
+    batchId: str,
+    limit: int,
+    page: int,
+) -> bytes:
+    """One page (numbered from 1) of a settled batch, oldest first."""
+    return (
+        '<?xml version="1.0" encoding="utf-8"?>'
+        f'<getTransactionListRequest xmlns="{NAMESPACE}">'
+        + _merchantAuthentication(name, transactionKey)
+        + _element("batchId", batchId)
+        + "<sorting><orderBy>submitTimeUTC</orderBy>"
+        "<orderDescending>false</orderDescending></sorting>"
+        f"<paging><limit>{limit}</limit><offset>{page}</offset></paging>"
+        "</getTransactionListRequest>"
+    ).encode(authConstants.xml_encoding)
+
+
+@dataclass(slots=True)
+class ListResponse:
+    resultCode: str | None = None
+    messages: list[tuple[str | None, str | None]] = field(default_factory=list)
+    items: list[dict[str, str | None]] = field(default_factory=list)
+    total: int | None = None  # totalNumInResults, when the call pages
+
+
+def decodeList(body: bytes, container: str, item: str) -> ListResponse:
+    """
+    Parses a reporting response whose records are ``<container><item>``
+    elements, each into a dict of its direct children's text. A page is at
+    most 1000 records, so the document is parsed whole.
+    """
+    root = etree.fromstring(body.lstrip(b"\xef\xbb\xbf"))
+    namespace = "{%s}" % NAMESPACE
+    skip = len(namespace)
+    response = ListResponse()
+    messages = root.find(namespace + "messages")
+    if messages is not None:
+        response.resultCode = messages.findtext(namespace + "resultCode")
+        response.messages = [
+            (message.findtext(namespace + "code"), message.findtext(namespace + "text"))
+            for message in messages.iterchildren(namespace + "message")
+        ]
+    records = root.find(namespace + container)
+    if records is not None:
+        # Slicing the namespace off is far cheaper than QName per element
+        response.items = [
+            {child.tag[skip:]: child.text for child in record}
+            for record in records.iterchildren(namespace + item)
+        ]
+    total = root.findtext(namespace + "totalNumInResults")
+    response.total = int(total) if total else None
+    return response
+
+
+def fromObjectify(response) -> AuthNetResponse:
+    """Flattens the SDK's objectified response into an ``AuthNetResponse``."""
+
+    def text(node, name):
+        # getattr(node, "text") is the node's own text, not its <text> child
+        for child in node.iterchildren():
+            if etree.QName(child).localname == name:
+                return child.text
+        return None
+
+    flat = AuthNetResponse(refId=text(response, "refId"))
+    if hasattr(response, "messages"):
+        flat.resultCode = text(response.messages, "resultCode")
+        for msg in getattr(response.messages, "message", ()):
+            flat.messages.append((text(msg, "code"), text(msg, "text")))
+    if hasattr(response, "transactionResponse"):
+        txResp = response.transactionResponse
+        flat.hasTransactionResponse = True
+        for name in TRANSACTION_FIELDS:
+            setattr(flat, name, text(txResp, name))
+        if hasattr(txResp, "messages"):
+            for msg in getattr(txResp.messages, "message", ()):
+                flat.transactionMessages.append(
+                    (text(msg, "code"), text(msg, "description"))
+                )
+        if hasattr(txResp, "errors"):
+            for err in getattr(txResp.errors, "error", ()):
+                flat.errors.append((text(err, "errorCode"), text(err, "errorText")))
+    return flat
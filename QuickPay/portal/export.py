@@ -0,0 +1,90 @@
+import csv
+import heapq
+import json
+import zlib
+
+from .models import Transaction
+from .reporting import DISPLAY
+
+FORMATS = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+
+class _Line:
+    """Write target that hands back what ``csv.writer`` just wrote."""
+
+    def write(self, value):
+        return value
+
+
+def exportFields() -> list[str]:
+    return [field.attname for field in Transaction._meta.concrete_fields]
+
+
+def exportRows(queryset, chunkSize: int = 2000, archived=()):
+    """
+    Streams ``queryset`` as value lists in ``(created_at, id)`` order, pulling
+    ``chunkSize`` rows from the database cursor at a time, merged with the
+    ``archived`` value lists (``archive.exportValues``, in the same order).
+    Coded columns are written as their labels, as in the listing.
+    """
+    fields = exportFields()
+    createdAt, id = fields.index("created_at"), fields.index("id")
+    rows = heapq.merge(
+        archived,
+        queryset.order_by("created_at", "id")
+        .values_list(*fields)
+        .iterator(chunk_size=chunkSize),
+        key=lambda row: (row[createdAt], row[id]),
+    )
+    displays = [
+        (index, DISPLAY[name]) for index, name in enumerate(fields) if name in DISPLAY
+    ]
+    for row in rows:
+        row = list(row)
+        for index, display in displays:
+            row[index] = display(row[index])
+        yield row
+
+
+def csvChunks(rows):
+    writer = csv.writer(_Line())
+    yield writer.writerow(exportFields())
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def ndjsonChunks(rows):
+    fields = exportFields()
+    for row in rows:
+        yield json.dumps(dict(zip(fields, row)), default=str) + "\n"
+
+
+def encode(chunks, compress: bool = False, flushEvery: int = 64 * 1024):
+    """
+    Encodes text chunks to UTF-8, optionally through a streaming gzip
+    compressor that emits output roughly every ``flushEvery`` input bytes.
+    """
+    if not compress:
+        for chunk in chunks:
+            yield chunk.encode()
+        return
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # 31: gzip container
+    pending = 0
+    for chunk in chunks:
+        data = chunk.encode()
+        pending += len(data)
+        out = compressor.compress(data)
+        if pending >= flushEvery:
+            out += compressor.flush(zlib.Z_SYNC_FLUSH)
+            pending = 0
+        if out:
+            yield out
+    yield compressor.flush()
+
+
+def export(
+    queryset, format: str = "csv", compress: bool = False, chunkSize=2000, archived=()
+):
+    rows = exportRows(queryset, chunkSize, archived)
+    chunks = csvChunks(rows) if format == "csv" else ndjsonChunks(rows)
+    return encode(chunks, compress)
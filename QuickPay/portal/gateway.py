@@ -0,0 +1,182 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from . import metrics
+
+_executor: ThreadPoolExecutor | None = None
+_transport: "Transport | None" = None
+_lock = threading.Lock()
+
+
+class IdleEviction:
+    """
+    urllib3 pool mixin that closes a pooled connection idle for longer than
+    ``idleTimeout`` seconds as it is checked out, so the request reconnects
+    instead of racing the processor to a socket it is about to drop. Only
+    that connection is touched; the others stay open for their threads.
+
+    Each checkout is counted by outcome (``CHECKOUTS``) in ``checkouts`` and
+    in ``metrics.GATEWAY_CONNECTIONS``.
+    """
+
+    CHECKOUTS = ("reused", "opened", "evicted")
+
+    def __init__(self, *args, idleTimeout: float, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.idleTimeout = idleTimeout
+        self.checkouts = metrics.Counter("checkouts", "", ("outcome",), register=False)
+
+    def _get_conn(self, timeout=None):
+        conn = super()._get_conn(timeout)
+        idleSince = getattr(conn, "idleSince", None)
+        if idleSince is None:
+            outcome = "opened"  # never returned to the pool: a new connection
+        elif time.monotonic() - idleSince > self.idleTimeout:
+            conn.close()  # reopened by the request that checked it out
+            outcome = "evicted"
+        else:
+            outcome = "reused"
+        self.checkouts.inc(outcome=outcome)
+        metrics.GATEWAY_CONNECTIONS.inc(host=self.host, outcome=outcome)
+        return conn
+
+    def _put_conn(self, conn):
+        if conn is not None:
+            conn.idleSince = time.monotonic()
+        super()._put_conn(conn)
+
+
+class IdleHTTPConnectionPool(IdleEviction, HTTPConnectionPool):
+    pass
+
+
+class IdleHTTPSConnectionPool(IdleEviction, HTTPSConnectionPool):
+    pass
+
+
+class IdleEvictingAdapter(HTTPAdapter):
+    def __init__(self, idleTimeout: float, **kwargs):
+        self.idleTimeout = idleTimeout
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": partial(IdleHTTPConnectionPool, idleTimeout=self.idleTimeout),
+            "https": partial(IdleHTTPSConnectionPool, idleTimeout=self.idleTimeout),
+        }
+
+
+class Transport:
+    """
+    Keep-alive HTTP transport shared by every processor strategy.
+
+    Connections are pooled per host and reused across payments, so only the
+    first request to a processor (or the first on a connection left idle
+    past ``idleTimeout``) pays for TCP and TLS setup. ``poolSize`` bounds the
+    open connections per host; callers beyond it wait for a connection to be
+    returned. A connection that fails is discarded by the pool on its own.
+    """
+
+    def __init__(
+        self,
+        poolSize: int = 32,
+        connectTimeout: float = 5.0,
+        readTimeout: float = 30.0,
+        idleTimeout: float = 55.0,
+    ):
+        self.poolSize = poolSize
+        self.timeout = (connectTimeout, readTimeout)
+        self.idleTimeout = idleTimeout
+        self.__adapter = IdleEvictingAdapter(
+            idleTimeout,
+            pool_connections=4,
+            pool_maxsize=poolSize,
+            pool_block=True,
+            max_retries=0,
+        )
+        self.__session = requests.Session()
+        self.__session.mount("http://", self.__adapter)
+        self.__session.mount("https://", self.__adapter)
+
+    def post(
+        self,
+        url: str,
+        data: bytes,
+        headers: dict[str, str] | None = None,
+        readTimeout: float | None = None,
+    ):
+        """``readTimeout`` overrides the configured read timeout for this call."""
+        timeout = (
+            self.timeout if readTimeout is None else (self.timeout[0], readTimeout)
+        )
+        return self.__session.post(url, data=data, headers=headers, timeout=timeout)
+
+    def stats(self) -> dict[str, int]:
+        checkouts = dict.fromkeys(IdleEviction.CHECKOUTS, 0)
+        pools = self.__pools()
+        for pool in pools:
+            for (outcome,), count in pool.checkouts.values().items():
+                checkouts[outcome] += count
+        return {
+            "requests": sum(checkouts.values()),
+            "hits": checkouts["reused"],
+            "misses": checkouts["opened"] + checkouts["evicted"],
+            "pools": len(pools),
+            "evictions": checkouts["evicted"],
+        }
+
+    def __pools(self):
+        pools = self.__adapter.poolmanager.pools
+        found = []
+        for key in pools.keys():
+            try:
+                found.append(pools[key])
+            except KeyError:
+                pass
+        return found
+
+
+def transport() -> Transport:
+    global _transport
+    if _transport is None:
+        with _lock:
+            if _transport is None:
+                config = settings.GATEWAY_TRANSPORT
+                _transport = Transport(
+                    poolSize=config["POOL_SIZE"],
+                    connectTimeout=config["CONNECT_TIMEOUT"],
+                    readTimeout=config["READ_TIMEOUT"],
+                    idleTimeout=config["IDLE_TIMEOUT"],
+                )
+    return _transport
+
+
+def executor() -> ThreadPoolExecutor:
+    """
+    Process-wide pool for blocking gateway calls made from async views.
+
+    Its size (``GATEWAY_MAX_WORKERS``) caps the number of payments in flight
+    to the processors; further calls queue until a worker frees up.
+    """
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.GATEWAY_MAX_WORKERS,
+                    thread_name_prefix="gateway",
+                )
+    return _executor
+
+
+async def run(func, *args):
+    return await asyncio.get_running_loop().run_in_executor(executor(), func, *args)
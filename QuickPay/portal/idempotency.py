@@ -0,0 +1,164 @@
+import asyncio
+import functools
+import hashlib
+import time
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import IntegrityError
+from django.http import HttpResponse, JsonResponse
+from django.utils import timezone
+
+from .models import IdempotencyKey
+
+HEADER = "Idempotency-Key"
+
+
+class Replay:
+    def __init__(self, status: int, body: str):
+        self.status = status
+        self.body = body
+
+    def response(self):
+        response = HttpResponse(
+            self.body, status=self.status, content_type="application/json"
+        )
+        response["Idempotent-Replayed"] = "true"
+        return response
+
+
+def _cache():
+    return caches[settings.IDEMPOTENCY["CACHE"]]
+
+
+def _cacheKey(key: str) -> str:
+    return f"idempotency:{hashlib.sha256(key.encode()).hexdigest()}"
+
+
+def begin(key: str, body: bytes):
+    """
+    Claims ``key`` for this request.
+
+    Returns None when the caller owns the key and must process the request,
+    a ``Replay`` of the stored response for a completed duplicate, or an
+    error ``JsonResponse``. The unique index on ``IdempotencyKey.key`` is the
+    lock, so this holds across worker processes; duplicates that arrive
+    while the first request is still running poll until it completes.
+    """
+    config = settings.IDEMPOTENCY
+    fingerprint = hashlib.sha256(body).hexdigest()
+    deadline = time.monotonic() + config["WAIT"]
+    while True:
+        cached = _cache().get(_cacheKey(key))
+        if cached is not None:
+            if cached["fingerprint"] != fingerprint:
+                return _mismatch()
+            return Replay(cached["status"], cached["body"])
+
+        try:
+            IdempotencyKey.objects.create(key=key, fingerprint=fingerprint)
+            return None
+        except IntegrityError:
+            pass
+
+        record = IdempotencyKey.objects.filter(key=key).first()
+        if record is None:
+            continue  # released by a failed owner; try to claim it again
+        if record.created_at < timezone.now() - timedelta(seconds=config["TTL"]):
+            IdempotencyKey.objects.filter(pk=record.pk).delete()
+            continue
+        if record.fingerprint != fingerprint:
+            return _mismatch()
+        if record.completed:
+            _remember(key, record.fingerprint, record.status, record.body)
+            return Replay(record.status, record.body)
+        if time.monotonic() >= deadline:
+            response = JsonResponse(
+                {"error": "A request with this Idempotency-Key is in progress"},
+                status=409,
+            )
+            response["Retry-After"] = "1"
+            return response
+        time.sleep(config["POLL"])
+
+
+def complete(key: str, body: bytes, response):
+    """
+    Stores the owner's response, or releases the key if the request failed
+    or its payment never reached the gateway (``response.submitted`` is
+    False), so a retry is processed afresh rather than replayed.
+    """
+    if response.status_code >= 500 or not getattr(response, "submitted", True):
+        IdempotencyKey.objects.filter(key=key).delete()
+        return
+    content = response.content.decode()
+    IdempotencyKey.objects.filter(key=key).update(
+        completed=True, status=response.status_code, body=content
+    )
+    _remember(key, hashlib.sha256(body).hexdigest(), response.status_code, content)
+
+
+def _remember(key, fingerprint, status, body):
+    _cache().set(
+        _cacheKey(key),
+        {"fingerprint": fingerprint, "status": status, "body": body},
+        settings.IDEMPOTENCY["TTL"],
+    )
+
+
+def _mismatch():
+    return JsonResponse(
+        {"error": "Idempotency-Key was already used with a different payload"},
+        status=422,
+    )
+
+
+def _outcome(request):
+    key = request.headers.get(HEADER)
+    if not key or request.method != "POST":
+        return None, None
+    if len(key) > IdempotencyKey._meta.get_field("key").max_length:
+        return key, JsonResponse({"error": f"{HEADER} is too long"}, status=400)
+    claimed = begin(key, request.body)
+    return key, claimed.response() if isinstance(claimed, Replay) else claimed
+
+
+def idempotent(view):
+    """
+    Deduplicates POSTs that carry an ``Idempotency-Key`` header: the first
+    request runs the view, retries get its stored response.
+    """
+    if asyncio.iscoroutinefunction(view):
+
+        @functools.wraps(view)
+        async def asyncWrapper(request, *args, **kwargs):
+            # polls while a duplicate is in flight; keep it off the shared ORM thread
+            key, early = await sync_to_async(_outcome, thread_sensitive=False)(request)
+            if key is None or early is not None:
+                return early or await view(request, *args, **kwargs)
+            try:
+                response = await view(request, *args, **kwargs)
+            except BaseException:
+                await IdempotencyKey.objects.filter(key=key).adelete()
+                raise
+            await sync_to_async(complete)(key, request.body, response)
+            return response
+
+        return asyncWrapper
+
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key, early = _outcome(request)
+        if key is None or early is not None:
+            return early or view(request, *args, **kwargs)
+        try:
+            response = view(request, *args, **kwargs)
+        except BaseException:
+            IdempotencyKey.objects.filter(key=key).delete()
+            raise
+        complete(key, request.body, response)
+        return response
+
+    return wrapper
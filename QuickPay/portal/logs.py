@@ -0,0 +1,120 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import weakref
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, WatchedFileHandler
+
+from . import metrics
+
+_handlers: "weakref.WeakSet[AsyncHandler]" = weakref.WeakSet()
+
+# Attributes every LogRecord has; anything else came in through ``extra``.
+RESERVED = frozenset(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, message and extras."""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in RESERVED and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class AsyncHandler(QueueHandler):
+    """
+    Non-blocking handler: request threads only enqueue records, and a
+    background listener formats and writes them to ``stream`` or, when
+    given, ``filename``.
+
+    ``setFormatter`` applies to the underlying handler, so formatting
+    happens on the listener thread rather than in the request.
+
+    The listener starts with the first record. A forked worker gets a fresh
+    queue and starts its own listener, since threads do not survive a fork.
+    Records that find the queue full are dropped and counted in
+    ``metrics.LOG_RECORDS_DROPPED``.
+    """
+
+    def __init__(self, stream=None, filename=None, maxsize: int = 10000):
+        super().__init__(queue.Queue(maxsize))
+        self.target = (
+            WatchedFileHandler(filename)
+            if filename
+            else logging.StreamHandler(stream or sys.stderr)
+        )
+        self.target.setFormatter(JsonLinesFormatter())
+        self.dropped = 0
+        self.listener = None
+        self.__startLock = threading.Lock()
+        _handlers.add(self)
+        atexit.register(self.close)
+
+    def setFormatter(self, fmt):
+        self.target.setFormatter(fmt)
+
+    def prepare(self, record):
+        # Resolve args and tracebacks now, while they are still valid, but
+        # leave serialization to the listener thread.
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        if self.listener is None:
+            self.__start()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            metrics.LOG_RECORDS_DROPPED.inc()
+
+    def __start(self):
+        with self.__startLock:
+            if self.listener is None:
+                self.listener = QueueListener(
+                    self.queue, self.target, respect_handler_level=False
+                )
+                self.listener.start()
+
+    def _afterFork(self):
+        # The parent's listener thread and any lock it held stay behind
+        self.queue = queue.Queue(self.queue.maxsize)
+        self.listener = None
+        self.dropped = 0
+        self.__startLock = threading.Lock()
+
+    def close(self):
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+        self.target.close()
+        super().close()
+
+
+def _afterFork():
+    for handler in list(_handlers):
+        handler._afterFork()
+
+
+if hasattr(os, "register_at_fork"):  # POSIX only
+    os.register_at_fork(after_in_child=_afterFork)
@@ -0,0 +1,48 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from QuickPay.portal import archive
+from QuickPay.portal.models import Transaction
+
+
+class Command(BaseCommand):
+    help = (
+        "Moves approved and declined transactions older than --age days out "
+        "of the transaction table into compressed monthly archive files."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--age", type=int, default=settings.ARCHIVE["AGE_DAYS"])
+        parser.add_argument("--batch-size", type=int)
+        parser.add_argument(
+            "--dry-run", action="store_true", help="Only count what would move."
+        )
+
+    def handle(self, *args, age, batch_size, dry_run, **options):
+        before = archive.cutoff(age)
+        if dry_run:
+            count = Transaction.objects.filter(
+                created_at__lt=before, result__in=archive.FINAL
+            ).count()
+            self.stdout.write(f"{count} transactions created before {before}")
+            return
+
+        months = {}
+        started = time.perf_counter()
+        try:
+            for month, rows in archive.archive(before, batch_size):
+                months[month] = months.get(month, 0) + rows
+                if self.verbosity > 1:
+                    self.stdout.write(f"{month}: {months[month]} rows")
+        except archive.ArchiveBusy as e:
+            raise CommandError(str(e))
+        elapsed = time.perf_counter() - started
+        total = sum(months.values())
+        for month, rows in months.items():
+            self.stdout.write(f"{month}: {rows} rows archived")
+        self.stdout.write(
+            f"{total} transactions created before {before} archived in "
+            f"{elapsed:.1f} s ({total / elapsed if elapsed else 0:.0f} rows/s)"
+        )
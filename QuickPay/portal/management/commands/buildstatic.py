@@ -0,0 +1,41 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+from QuickPay.portal.assets import APP_DIR, MINIFIERS, BuildStorage
+
+
+class Command(BaseCommand):
+    help = (
+        "Builds STATIC_ROOT: minified, content-hashed and pre-compressed "
+        "assets, and reports their sizes."
+    )
+
+    def handle(self, *args, **options):
+        call_command("collectstatic", interactive=False, clear=True, verbosity=0)
+        storage = BuildStorage()
+        self.stdout.write(
+            f"{'asset':<40} {'source':>8} {'minified':>9} {'gzip':>7} {'brotli':>7}"
+        )
+        for name, hashedName in sorted(storage.hashed_files.items()):
+            source = Path(finders.find(name))
+            if Path(name).suffix not in MINIFIERS or not source.is_relative_to(APP_DIR):
+                continue
+            root = Path(settings.STATIC_ROOT)
+            sizes = [
+                source.stat().st_size,
+                (root / hashedName).stat().st_size,
+            ]
+            for ext in (".gz", ".br"):
+                variant = root / (hashedName + ext)
+                sizes.append(variant.stat().st_size if variant.exists() else None)
+            self.stdout.write(
+                f"{hashedName:<40} "
+                + " ".join(
+                    f"{'-' if size is None else size:>{width}}"
+                    for size, width in zip(sizes, (8, 9, 7, 7))
+                )
+            )
@@ -0,0 +1,35 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from QuickPay.portal import archive, export, reporting
+
+
+class Command(BaseCommand):
+    help = "Streams transactions to a CSV or NDJSON file (default stdout)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=sorted(export.FORMATS), default="csv")
+        parser.add_argument("--since", help="date or datetime, inclusive")
+        parser.add_argument("--until", help="date or datetime, inclusive")
+        parser.add_argument("--salesperson")
+        parser.add_argument("--gzip", action="store_true")
+        parser.add_argument("--chunk-size", type=int, default=2000)
+        parser.add_argument("--output", "-o", default="-")
+
+    def handle(self, *args, format, gzip, chunk_size, output, **options):
+        try:
+            queryset = reporting.filterTransactions(options)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        target = sys.stdout.buffer if output == "-" else open(output, "wb")
+        try:
+            chunks = export.export(
+                queryset, format, gzip, chunk_size, archive.exportValues(options)
+            )
+            for chunk in chunks:
+                target.write(chunk)
+        finally:
+            if target is not sys.stdout.buffer:
+                target.close()
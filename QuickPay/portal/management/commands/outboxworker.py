@@ -0,0 +1,50 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from QuickPay.portal import outbox
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs queued post-payment side effects (receipts, audit records, "
+        "analytics events) with retries and backoff."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=4)
+        parser.add_argument("--batch", type=int)
+        parser.add_argument("--poll", type=float, default=1.0)
+        parser.add_argument(
+            "--once", action="store_true", help="Exit when nothing is due."
+        )
+
+    def handle(self, *args, workers, batch, poll, once, **options):
+        done = failed = 0
+        with ThreadPoolExecutor(workers) as pool:
+            try:
+                while True:
+                    events = outbox.claim(batch)
+                    if not events:
+                        if once:
+                            break
+                        time.sleep(poll)
+                        continue
+                    for ok in pool.map(self.dispatch, events):
+                        done += ok
+                        failed += not ok
+            except KeyboardInterrupt:
+                pass
+        self.stdout.write(f"outbox: {done} done, {failed} failed or retrying")
+
+    @staticmethod
+    def dispatch(event):
+        # Same connection hygiene as a request: honour CONN_MAX_AGE and drop
+        # broken connections between events
+        close_old_connections()
+        try:
+            return outbox.dispatch(event)
+        finally:
+            close_old_connections()
@@ -0,0 +1,39 @@
+import json
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from QuickPay.portal import batch
+
+
+class Command(BaseCommand):
+    help = (
+        "Charges a batch of payments from a JSON array or CSV file ('-' for "
+        "stdin) and prints one NDJSON result per charge as it completes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--format", choices=["json", "csv"])
+        parser.add_argument("--concurrency", type=int)
+
+    def handle(self, *args, path, format, concurrency, **options):
+        if concurrency is not None and concurrency < 1:
+            raise CommandError("--concurrency must be at least 1")
+        format = format or ("csv" if path.endswith(".csv") else "json")
+        stream = sys.stdin if path == "-" else open(path, newline="")
+        try:
+            with stream:
+                charges = (
+                    list(batch.readCSV(stream))
+                    if format == "csv"
+                    else batch.readJSON(stream)
+                )
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Could not read batch: {e}")
+
+        failed = 0
+        for index, result in batch.processBatch(charges, concurrency):
+            failed += result.get("result") != "Success"
+            self.stdout.write(json.dumps({"index": index, **result}))
+        self.stderr.write(f"{len(charges) - failed}/{len(charges)} charges approved")
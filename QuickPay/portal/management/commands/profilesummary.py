@@ -0,0 +1,90 @@
+import json
+from collections import Counter, defaultdict
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from QuickPay.portal.profiling import percentile
+
+
+class Command(BaseCommand):
+    help = (
+        "Summarizes the profiling samples in PROFILING['DIR']: the hottest "
+        "functions across all of them and where SQL time went."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dir", help="Defaults to PROFILING['DIR'].")
+        parser.add_argument("--top", type=int, default=20)
+        parser.add_argument("--sort", choices=["self", "total"], default="self")
+        parser.add_argument(
+            "--mode", choices=["cprofile", "stack"], help="Only samples of one kind."
+        )
+
+    def handle(self, *args, dir, top, sort, mode, **options):
+        directory = Path(dir or settings.PROFILING["DIR"])
+        samples = []
+        for path in sorted(directory.glob("*.json")):
+            try:
+                sample = json.loads(path.read_text())
+            except (OSError, ValueError) as e:
+                self.stderr.write(f"Skipping {path.name}: {e}")
+                continue
+            if mode is None or sample["mode"] == mode:
+                samples.append(sample)
+        if not samples:
+            raise CommandError(f"No profiling samples in {directory}")
+
+        elapsed = [sample["elapsed"] * 1000 for sample in samples]
+        modes = Counter(sample["mode"] for sample in samples)
+        self.stdout.write(
+            f"{len(samples)} samples ({', '.join(f'{n} {m}' for m, n in modes.items())}); "
+            f"elapsed p50 {percentile(elapsed, 50):.1f} ms, "
+            f"p95 {percentile(elapsed, 95):.1f} ms, max {max(elapsed):.1f} ms"
+        )
+        slowest = max(samples, key=lambda sample: sample["elapsed"])
+        self.stdout.write(
+            f"slowest: {slowest['elapsed'] * 1000:.1f} ms, "
+            f"refID {', '.join(slowest.get('refIDs') or ['-'])}, {slowest['started']}"
+        )
+
+        selfTime, totalTime, seenIn = Counter(), Counter(), Counter()
+        for sample in samples:
+            for function, selfSeconds, totalSeconds, _ in sample["functions"]:
+                selfTime[function] += selfSeconds
+                totalTime[function] += totalSeconds
+                seenIn[function] += 1
+        ranking = selfTime if sort == "self" else totalTime
+        self.stdout.write("")
+        self.stdout.write(
+            f"{'self ms':>10} {'total ms':>10} {'samples':>7}  function (mean per sample)"
+        )
+        for function, _ in ranking.most_common(top):
+            self.stdout.write(
+                f"{selfTime[function] / len(samples) * 1000:>10.2f} "
+                f"{totalTime[function] / len(samples) * 1000:>10.2f} "
+                f"{seenIn[function]:>7}  {function}"
+            )
+
+        statements = defaultdict(lambda: [0, 0.0])
+        sqlSeconds = 0.0
+        for sample in samples:
+            for statement in sample["sql"]:
+                verb = " ".join(statement["sql"].split()[:4])
+                statements[verb][0] += 1
+                statements[verb][1] += statement["seconds"]
+                sqlSeconds += statement["seconds"]
+        totalSeconds = sum(sample["elapsed"] for sample in samples)
+        self.stdout.write("")
+        self.stdout.write(
+            f"SQL: {sqlSeconds * 1000 / len(samples):.2f} ms per sample, "
+            f"{sqlSeconds / totalSeconds:.1%} of elapsed"
+        )
+        self.stdout.write(f"{'count':>7} {'total ms':>10} {'mean ms':>8}  statement")
+        ranked = sorted(statements.items(), key=lambda item: item[1][1], reverse=True)
+        for verb, (count, seconds) in ranked[:top]:
+            self.stdout.write(
+                f"{count:>7} {seconds * 1000:>10.2f} {seconds / count * 1000:>8.3f}  "
+                f"{verb}"
+            )
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from QuickPay.portal import rollups
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuilds the per-salesperson daily sales rollup from the transaction "
+        "table and reports how many rows had drifted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--since", help="first day to rebuild (YYYY-MM-DD)")
+
+    def handle(self, *args, since, **options):
+        day = None
+        if since:
+            try:
+                day = parse_date(since)
+            except ValueError:
+                day = None
+            if day is None:
+                raise CommandError(f"Invalid date {since!r}")
+        result = rollups.rebuild(day)
+        self.stdout.write(f"{result['rows']} rollup rows, {result['drifted']} drifted")
@@ -0,0 +1,53 @@
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from QuickPay.portal import processors, reconcile
+
+
+def _moment(text: str) -> datetime:
+    try:
+        moment = parse_datetime(text)
+        if moment is None:
+            day = parse_date(text)
+            moment = day and datetime.combine(day, datetime.min.time())
+    except ValueError:
+        moment = None
+    if moment is None:
+        raise CommandError(f"Invalid date {text!r}")
+    return moment if timezone.is_aware(moment) else timezone.make_aware(moment)
+
+
+class Command(BaseCommand):
+    help = (
+        "Matches the batches the gateway settled to local transactions and "
+        "corrects rows whose outcome differs, such as charged payments stored "
+        "as NO_RESPONSE."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--since", help="settled from (YYYY-MM-DD[ HH:MM])")
+        parser.add_argument("--until", help="settled until (default: now)")
+        parser.add_argument("--processor", default="A")
+        parser.add_argument(
+            "--dry-run", action="store_true", help="Only count what would change."
+        )
+
+    def handle(self, *args, since, until, processor, dry_run, **options):
+        since = since and _moment(since)
+        until = until and _moment(until)
+        started = time.perf_counter()
+        try:
+            stats = reconcile.reconcile(processor, since, until, dryRun=dry_run)
+        except (processors.ProcessorUnavailable, reconcile.ReportingUnavailable) as e:
+            raise CommandError(str(e))
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"{stats['batches']} batches, {stats['transactions']} settled "
+            f"transactions: {stats['matched']} matched, {stats['unmatched']} "
+            f"unmatched, {stats['ignored']} ignored; {stats['corrected']} rows "
+            f"{'would be ' if dry_run else ''}corrected in {elapsed:.1f} s"
+        )
@@ -0,0 +1,373 @@
+"""
+Payment-path metrics in the Prometheus text exposition format.
+
+Collectors keep one value table per thread, so recording takes no lock
+(a lock is taken once per thread, to register its table). Reads merge the
+tables; those of threads that have exited are folded into one retired table
+when read or when a new thread registers, so short-lived threads do not
+pile up.
+
+Under a multi-process server set ``METRICS["DIR"]``: every process then
+writes its merged values to ``<DIR>/<pid>.json`` every ``FLUSH`` seconds
+and at exit, and ``/metrics`` adds up the files of all processes. Gauges
+only count processes that are still running; counters and histograms keep
+the totals of exited ones. Clear the directory when deploying.
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+
+_metrics: list["Metric"] = []
+_flusher: threading.Thread | None = None
+_lock = threading.Lock()
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(
+        self, name: str, help: str, labels: tuple[str, ...] = (), register=True
+    ):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.reset()
+        if register:
+            _metrics.append(self)
+
+    def reset(self):
+        self.__local = threading.local()
+        self.__tables: dict[threading.Thread, dict] = {}
+        self.__retired: dict = {}  # values recorded by exited threads
+        self.__lock = threading.Lock()
+
+    def _table(self) -> dict:
+        """This thread's values by label tuple."""
+        try:
+            return self.__local.table
+        except AttributeError:
+            table = self.__local.table = {}
+            with self.__lock:
+                self.__retire()
+                self.__tables[threading.current_thread()] = table
+            _startFlusher()
+            return table
+
+    def __retire(self):
+        # Called with the lock held; nothing writes to an exited thread's table
+        for thread in [thread for thread in self.__tables if not thread.is_alive()]:
+            for key, value in self.__tables.pop(thread).items():
+                self.__retired[key] = (
+                    self._merge(self.__retired[key], value)
+                    if key in self.__retired
+                    else value
+                )
+
+    def _key(self, labels: dict) -> tuple:
+        key = []
+        for name in self.labels:
+            value = labels.get(name)
+            key.append(
+                value if type(value) is str else "" if value is None else str(value)
+            )
+        return tuple(key)
+
+    def _merge(self, total, value):
+        return total + value
+
+    def values(self) -> dict[tuple, object]:
+        with self.__lock:
+            self.__retire()
+            tables = [dict(self.__retired), *self.__tables.values()]
+        merged = {}
+        for table in tables:
+            for key, value in list(table.items()):  # copy: owner may be writing
+                merged[key] = (
+                    self._merge(merged[key], value) if key in merged else value
+                )
+        return merged
+
+    def snapshot(self) -> dict:
+        return {
+            "kind": self.kind,
+            "help": self.help,
+            "labels": self.labels,
+            "values": [[list(key), value] for key, value in self.values().items()],
+        }
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        table = self._table()
+        key = self._key(labels)
+        table[key] = table.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """A gauge moved by ``inc``/``dec``; each thread keeps its own delta."""
+
+    kind = "gauge"
+
+    def inc(self, amount: float = 1, **labels):
+        table = self._table()
+        key = self._key(labels)
+        table[key] = table.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track(self, **labels):
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=BUCKETS, register=True):
+        super().__init__(name, help, labels, register)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels):
+        table = self._table()
+        key = self._key(labels)
+        counts = table.get(key)
+        if counts is None:
+            # One count per bucket (not cumulative), then sum and count
+            counts = table[key] = [0] * len(self.buckets) + [0.0, 0]
+        index = bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            counts[index] += 1
+        counts[-2] += value
+        counts[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _merge(self, total, value):
+        return [a + b for a, b in zip(total, value)]
+
+    def snapshot(self) -> dict:
+        return {**super().snapshot(), "buckets": self.buckets}
+
+
+PAYMENTS = Counter(
+    "quickpay_payments_total",
+    "Payments by outcome.",
+    ("processor", "result", "responseCode", "error"),
+)
+REJECTED = Counter(
+    "quickpay_payments_rejected_total",
+    "Payments turned away by validation before reaching a strategy.",
+    ("processor", "error"),
+)
+THROTTLED = Counter(
+    "quickpay_requests_throttled_total",
+    "Payment requests refused with 429, by the bucket that ran dry.",
+    ("scope",),
+)
+RECONCILED = Counter(
+    "quickpay_payments_reconciled_total",
+    "Payments corrected from the gateway's settlement reports, by settled status.",
+    ("processor", "status"),
+)
+LOG_RECORDS_DROPPED = Counter(
+    "quickpay_log_records_dropped_total",
+    "Log records dropped because the asynchronous log queue was full.",
+)
+STAGE_SECONDS = Histogram(
+    "quickpay_payment_stage_seconds",
+    "Time spent in each stage of a payment: parse, build, gateway, save.",
+    ("processor", "stage"),
+)
+PAYMENTS_IN_FLIGHT = Gauge(
+    "quickpay_payments_in_flight", "Payments being processed.", ("processor",)
+)
+GATEWAY_IN_FLIGHT = Gauge(
+    "quickpay_gateway_in_flight",
+    "Gateway calls awaiting a response.",
+    ("processor",),
+)
+GATEWAY_CONNECTIONS = Counter(
+    "quickpay_gateway_connections_total",
+    "Gateway connection checkouts: reused from the pool, newly opened, or"
+    " reopened after sitting idle too long.",
+    ("host", "outcome"),
+)
+
+
+def snapshot() -> dict[str, dict]:
+    return {metric.name: metric.snapshot() for metric in _metrics}
+
+
+def _directory() -> Path | None:
+    directory = settings.METRICS["DIR"]
+    return Path(directory) if directory else None
+
+
+def flush():
+    """Writes this process's values to the metrics directory, if any."""
+    directory = _directory()
+    if directory is None:
+        return
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{os.getpid()}.json"
+    partial = path.with_suffix(".tmp")
+    partial.write_text(json.dumps(snapshot()))
+    os.replace(partial, path)
+
+
+def _flushLoop(interval: float):
+    while True:
+        time.sleep(interval)
+        flush()
+
+
+def _startFlusher():
+    global _flusher
+    if _flusher is not None or _directory() is None:
+        return
+    with _lock:
+        if _flusher is None:
+            _flusher = threading.Thread(
+                target=_flushLoop,
+                args=(settings.METRICS["FLUSH"],),
+                name="metrics-flush",
+                daemon=True,
+            )
+            _flusher.start()
+            atexit.register(flush)
+
+
+def _afterFork():
+    # A forked worker starts from zero and needs its own flusher thread
+    global _flusher, _lock
+    _flusher, _lock = None, threading.Lock()
+    for metric in _metrics:
+        metric.reset()
+
+
+if hasattr(os, "register_at_fork"):  # POSIX only
+    os.register_at_fork(after_in_child=_afterFork)
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def collect() -> dict[str, dict]:
+    """
+    Values of every metric, summed over all processes writing to the metrics
+    directory, or this process's when there is none.
+    """
+    directory = _directory()
+    if directory is None:
+        return snapshot()
+    flush()
+    merged: dict[str, dict] = {}
+    for path in directory.glob("*.json"):
+        try:
+            metrics = json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue  # replaced or removed mid-read
+        alive = int(path.stem) == os.getpid() or _alive(int(path.stem))
+        for name, metric in metrics.items():
+            if metric["kind"] == "gauge" and not alive:
+                continue
+            target = merged.setdefault(name, {**metric, "values": {}})
+            for key, value in metric["values"]:
+                key = tuple(key)
+                current = target["values"].get(key)
+                if current is None:
+                    target["values"][key] = value
+                elif metric["kind"] == "histogram":
+                    target["values"][key] = [a + b for a, b in zip(current, value)]
+                else:
+                    target["values"][key] = current + value
+    for metric in merged.values():
+        metric["values"] = list(metric["values"].items())
+    return merged
+
+
+def _labels(names, values, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)] + (
+        [extra] if extra else []
+    )
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n")
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def exposition(metrics: dict[str, dict] | None = None) -> str:
+    """``metrics`` (by default ``collect()``) in the text exposition format."""
+    metrics = collect() if metrics is None else metrics
+    lines = []
+    for name, metric in sorted(metrics.items()):
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['kind']}")
+        for key, value in sorted(metric["values"], key=lambda item: list(item[0])):
+            if metric["kind"] != "histogram":
+                lines.append(f"{name}{_labels(metric['labels'], key)} {_number(value)}")
+                continue
+            *counts, total, count = value
+            cumulative = 0
+            for bound, inBucket in zip(metric["buckets"], counts):
+                cumulative += inBucket
+                le = f'le="{_number(float(bound))}"'
+                lines.append(
+                    f"{name}_bucket{_labels(metric['labels'], key, le)} {cumulative}"
+                )
+            le = 'le="+Inf"'
+            lines.append(f"{name}_bucket{_labels(metric['labels'], key, le)} {count}")
+            lines.append(f"{name}_sum{_labels(metric['labels'], key)} {_number(total)}")
+            lines.append(f"{name}_count{_labels(metric['labels'], key)} {count}")
+    return "\n".join(lines) + "\n"
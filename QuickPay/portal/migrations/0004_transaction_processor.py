@@ -0,0 +1,19 @@
+# Generated by Django 5.1.7 on 2026-10-17 18:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("portal", "0003_transaction_resultnumber_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="transaction",
+            name="processor",
+            field=models.CharField(default="A", max_length=1),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.1.7 on 2026-10-17 18:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("portal", "0005_idempotencykey"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                fields=["created_at", "id"], name="portal_tx_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                fields=["salesperson", "created_at", "id"],
+                name="portal_tx_salesperson_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                fields=["result", "created_at", "id"], name="portal_tx_result_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(fields=["transId"], name="portal_tx_transid_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(fields=["invoiceID"], name="portal_tx_invoice_idx"),
+        ),
+    ]
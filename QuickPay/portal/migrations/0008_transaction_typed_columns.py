@@ -0,0 +1,50 @@
+# Generated by Django 5.1.7 on 2026-10-17 19:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("portal", "0007_outboxevent"),
+    ]
+
+    # Typed copies of the text columns; 0009 fills them and 0010 swaps them in.
+    # The text columns become nullable so 0010 can re-add them when reversed.
+    operations = [
+        migrations.AlterField(
+            model_name="transaction",
+            name="amount",
+            field=models.CharField(max_length=64, null=True),
+        ),
+        migrations.AlterField(
+            model_name="transaction",
+            name="invoiceID",
+            field=models.CharField(max_length=16, null=True),
+        ),
+        migrations.AddField(
+            model_name="transaction",
+            name="typedAmount",
+            field=models.DecimalField(decimal_places=2, max_digits=12, null=True),
+        ),
+        migrations.AddField(
+            model_name="transaction",
+            name="typedResult",
+            field=models.PositiveSmallIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name="transaction",
+            name="typedInvoiceID",
+            field=models.UUIDField(null=True),
+        ),
+        migrations.AddField(
+            model_name="transaction",
+            name="typedResponseCode",
+            field=models.PositiveSmallIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name="transaction",
+            name="typedAccountType",
+            field=models.PositiveSmallIntegerField(null=True),
+        ),
+    ]
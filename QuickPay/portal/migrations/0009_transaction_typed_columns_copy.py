@@ -0,0 +1,151 @@
+# Generated by Django 5.1.7 on 2026-10-17 19:20
+
+import logging
+import uuid
+from decimal import Decimal, InvalidOperation
+
+from django.db import migrations, transaction
+
+logger = logging.getLogger(__name__)
+
+BATCH = 2000
+
+RESULTS = {"Not Submitted": 0, "Success": 1, "Failed": 2, "Error": 3}
+ACCOUNT_TYPES = {
+    "Visa": 1,
+    "MasterCard": 2,
+    "AmericanExpress": 3,
+    "Discover": 4,
+    "JCB": 5,
+    "DinersClub": 6,
+    "eCheck": 7,
+}
+RESULT_LABELS = {value: label for label, value in RESULTS.items()}
+ACCOUNT_TYPE_LABELS = {value: label for label, value in ACCOUNT_TYPES.items()}
+COPIES = (
+    ("amount", "typedAmount"),
+    ("result", "typedResult"),
+    ("invoiceID", "typedInvoiceID"),
+    ("responseCode", "typedResponseCode"),
+    ("accountType", "typedAccountType"),
+)
+
+
+def toAmount(text):
+    """The amount to store, and whether it differs from ``text``'s value."""
+    try:
+        value = Decimal(text)
+    except (InvalidOperation, TypeError):
+        return Decimal("0.00"), True  # never a valid charge; the gateway rejected it
+    if not value.is_finite() or value.adjusted() >= 10:  # won't fit max_digits
+        return Decimal("0.00"), True
+    stored = value.quantize(Decimal("0.01"))
+    return stored, stored != value
+
+
+def toInvoiceID(text):
+    digits = (text or "").replace("-", "").lower()
+    try:
+        return uuid.UUID(digits.ljust(32, "0"))
+    except ValueError:
+        return uuid.uuid5(uuid.NAMESPACE_OID, text or "")
+
+
+def forwards(row) -> bool:
+    """Converts ``row``; True if its amount could not be kept as it was."""
+    row.typedAmount, coerced = toAmount(row.amount)
+    if coerced:
+        # The text column is dropped by 0010: this is the only record left
+        logger.warning(
+            "Amount %r of transaction %s stored as %s",
+            row.amount,
+            row.pk,
+            row.typedAmount,
+            extra={"transaction": row.pk, "amount": row.amount},
+        )
+    row.typedResult = RESULTS.get(row.result, RESULTS["Error"])
+    row.typedInvoiceID = toInvoiceID(row.invoiceID)
+    row.typedResponseCode = (
+        int(row.responseCode) if row.responseCode in ("1", "2", "3", "4") else None
+    )
+    row.typedAccountType = (
+        ACCOUNT_TYPES.get(row.accountType, 0) if row.accountType else None
+    )
+    return coerced
+
+
+def backwards(row):
+    row.amount = str(row.typedAmount)
+    row.result = RESULT_LABELS[row.typedResult]
+    digits = row.typedInvoiceID.hex  # back to the dashed 16-character form
+    row.invoiceID = f"{digits[:8]}-{digits[8:12]}-{digits[12:14]}"
+    row.responseCode = (
+        None if row.typedResponseCode is None else str(row.typedResponseCode)
+    )
+    row.accountType = (
+        None
+        if row.typedAccountType is None
+        else ACCOUNT_TYPE_LABELS.get(row.typedAccountType, "Other")
+    )
+
+
+def copier(convert, fields):
+    def copy(apps, schema_editor):
+        """
+        Converts rows in primary-key batches, one transaction per batch, with
+        a single parametrized UPDATE per batch (bulk_update's CASE chains are
+        quadratic in the batch size). ``convert`` returns True for rows whose
+        values had to be changed; they are logged one by one and counted.
+        """
+        Transaction = apps.get_model("portal", "Transaction")
+        connection = schema_editor.connection
+        columns = [Transaction._meta.get_field(name) for name in fields]
+        quote = connection.ops.quote_name
+        sql = "UPDATE {} SET {} WHERE {} = %s".format(
+            quote(Transaction._meta.db_table),
+            ", ".join(f"{quote(field.column)} = %s" for field in columns),
+            quote(Transaction._meta.pk.column),
+        )
+        rows = Transaction.objects.using(connection.alias).order_by("pk")
+        last = coerced = 0
+        while True:
+            with transaction.atomic(using=connection.alias):
+                batch = list(rows.filter(pk__gt=last)[:BATCH])
+                if not batch:
+                    break
+                params = []
+                for row in batch:
+                    coerced += bool(convert(row))
+                    params.append(
+                        [
+                            field.get_db_prep_save(
+                                getattr(row, field.attname), connection
+                            )
+                            for field in columns
+                        ]
+                        + [row.pk]
+                    )
+                with connection.cursor() as cursor:
+                    cursor.executemany(sql, params)
+            last = batch[-1].pk
+        if coerced:
+            logger.warning(
+                "%s transactions had amounts changed to fit the column", coerced
+            )
+
+    return copy
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("portal", "0008_transaction_typed_columns"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            copier(forwards, [typed for _, typed in COPIES]),
+            copier(backwards, [text for text, _ in COPIES]),
+        ),
+    ]
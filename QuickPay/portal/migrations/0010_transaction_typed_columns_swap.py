@@ -0,0 +1,102 @@
+# Generated by Django 5.1.7 on 2026-10-17 19:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("portal", "0009_transaction_typed_columns_copy"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(model_name="transaction", name="portal_tx_result_idx"),
+        migrations.RemoveIndex(model_name="transaction", name="portal_tx_invoice_idx"),
+        migrations.RemoveField(model_name="transaction", name="amount"),
+        migrations.RemoveField(model_name="transaction", name="result"),
+        migrations.RemoveField(model_name="transaction", name="invoiceID"),
+        migrations.RemoveField(model_name="transaction", name="responseCode"),
+        migrations.RemoveField(model_name="transaction", name="accountType"),
+        migrations.RenameField(
+            model_name="transaction", old_name="typedAmount", new_name="amount"
+        ),
+        migrations.AlterField(
+            model_name="transaction",
+            name="amount",
+            field=models.DecimalField(decimal_places=2, max_digits=12),
+        ),
+        migrations.RenameField(
+            model_name="transaction", old_name="typedResult", new_name="result"
+        ),
+        migrations.AlterField(
+            model_name="transaction",
+            name="result",
+            field=models.PositiveSmallIntegerField(
+                choices=[
+                    (0, "Not Submitted"),
+                    (1, "Success"),
+                    (2, "Failed"),
+                    (3, "Error"),
+                ],
+                default=0,
+            ),
+        ),
+        migrations.RenameField(
+            model_name="transaction", old_name="typedInvoiceID", new_name="invoiceID"
+        ),
+        migrations.AlterField(
+            model_name="transaction", name="invoiceID", field=models.UUIDField()
+        ),
+        migrations.RenameField(
+            model_name="transaction",
+            old_name="typedResponseCode",
+            new_name="responseCode",
+        ),
+        migrations.AlterField(
+            model_name="transaction",
+            name="responseCode",
+            field=models.PositiveSmallIntegerField(
+                blank=True,
+                choices=[
+                    (1, "Approved"),
+                    (2, "Declined"),
+                    (3, "Error"),
+                    (4, "Held for Review"),
+                ],
+                null=True,
+            ),
+        ),
+        migrations.RenameField(
+            model_name="transaction",
+            old_name="typedAccountType",
+            new_name="accountType",
+        ),
+        migrations.AlterField(
+            model_name="transaction",
+            name="accountType",
+            field=models.PositiveSmallIntegerField(
+                blank=True,
+                choices=[
+                    (0, "Other"),
+                    (1, "Visa"),
+                    (2, "MasterCard"),
+                    (3, "AmericanExpress"),
+                    (4, "Discover"),
+                    (5, "JCB"),
+                    (6, "DinersClub"),
+                    (7, "eCheck"),
+                ],
+                null=True,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                fields=["result", "created_at", "id"], name="portal_tx_result_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(fields=["invoiceID"], name="portal_tx_invoice_idx"),
+        ),
+    ]
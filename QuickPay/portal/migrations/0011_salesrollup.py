@@ -0,0 +1,44 @@
+# Generated by Django 5.1.7 on 2026-10-17 19:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("portal", "0010_transaction_typed_columns_swap"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SalesRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("salesperson", models.CharField(max_length=254)),
+                ("day", models.DateField()),
+                ("approved", models.PositiveIntegerField(default=0)),
+                (
+                    "approvedAmount",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=16),
+                ),
+                ("failed", models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                "indexes": [models.Index(fields=["day"], name="portal_rollup_day_idx")],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("salesperson", "day"),
+                        name="portal_rollup_salesperson_day",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.7 on 2026-10-17 20:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("portal", "0011_salesrollup"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(fields=["refID"], name="portal_tx_refid_idx"),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.1.7 on 2026-10-17 20:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("portal", "0012_transaction_refid_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ArchivePartition",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("month", models.CharField(max_length=7, unique=True)),
+                ("members", models.JSONField(default=list)),
+                ("rows", models.PositiveIntegerField(default=0)),
+                ("bytes", models.PositiveBigIntegerField(default=0)),
+                ("first", models.DateTimeField()),
+                ("last", models.DateTimeField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name="ArchivedTransaction",
+            fields=[
+                ("id", models.BigIntegerField(primary_key=True, serialize=False)),
+                ("offset", models.PositiveBigIntegerField()),
+                ("transId", models.CharField(blank=True, max_length=254, null=True)),
+                ("invoiceID", models.UUIDField()),
+                ("refID", models.CharField(max_length=64)),
+                (
+                    "partition",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="portal.archivepartition",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["transId"], name="portal_archived_transid_idx"
+                    ),
+                    models.Index(
+                        fields=["invoiceID"], name="portal_archived_invoice_idx"
+                    ),
+                    models.Index(fields=["refID"], name="portal_archived_refid_idx"),
+                ],
+            },
+        ),
+    ]
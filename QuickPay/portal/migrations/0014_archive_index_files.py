@@ -0,0 +1,37 @@
+from django.db import migrations
+
+
+def writeIndexFiles(apps, schema_editor):
+    """Moves the per-row manifest into each month's index file."""
+    from QuickPay.portal import archive
+
+    ArchivePartition = apps.get_model("portal", "ArchivePartition")
+    ArchivedTransaction = apps.get_model("portal", "ArchivedTransaction")
+    for partition in ArchivePartition.objects.all():
+        entries = [
+            (archive._digest(name, value), offset, pk)
+            for pk, offset, *values in ArchivedTransaction.objects.filter(
+                partition=partition
+            ).values_list("id", "offset", *archive.INDEXED)
+            for name, value in zip(archive.INDEXED, values)
+            if value
+        ]
+        archive._writeIndex(
+            partition.month,
+            entries,
+            keep={member["offset"] for member in partition.members},
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("portal", "0013_transaction_archive"),
+    ]
+
+    operations = [
+        migrations.RunPython(writeIndexFiles, migrations.RunPython.noop),
+        migrations.DeleteModel(
+            name="ArchivedTransaction",
+        ),
+    ]
@@ -1,27 +1,80 @@
-from datetime import datetime
 import os
+import time
 import uuid
-from django.db import models
+from decimal import Decimal, InvalidOperation
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, models, transaction
+from django.utils import timezone
 from authorizenet import apicontractsv1 as authApi
 from authorizenet.apicontrollers import createTransactionController
-from dotenv import load_dotenv
-from rich import print
-import json
+from authorizenet.constants import constants as authConstants
+from lxml import objectify
+import requests
+import logging
+from asgiref.sync import sync_to_async
 
-load_dotenv()
+from . import circuit, codec, gateway, metrics, processors, profiling, validation
+
+logger = logging.getLogger(__name__)
+
+
+class Choices(models.IntegerChoices):
+    @classmethod
+    def fromLabel(cls, label: str | None, default=None):
+        """Value for a label as the gateway or an API client spells it."""
+        for member in cls:
+            if member.label == label:
+                return member
+        return default
+
+
+class Result(Choices):
+    NOT_SUBMITTED = 0, "Not Submitted"
+    SUCCESS = 1, "Success"
+    FAILED = 2, "Failed"
+    ERROR = 3, "Error"
+
+
+class ResponseCode(Choices):
+    APPROVED = 1, "Approved"
+    DECLINED = 2, "Declined"
+    ERROR = 3, "Error"
+    HELD = 4, "Held for Review"
+
+    @classmethod
+    def parse(cls, code: str | None):
+        return cls(int(code)) if code in ("1", "2", "3", "4") else None
+
+
+class AccountType(Choices):
+    OTHER = 0, "Other"
+    VISA = 1, "Visa"
+    MASTERCARD = 2, "MasterCard"
+    AMERICAN_EXPRESS = 3, "AmericanExpress"
+    DISCOVER = 4, "Discover"
+    JCB = 5, "JCB"
+    DINERS_CLUB = 6, "DinersClub"
+    ECHECK = 7, "eCheck"
+
+    @classmethod
+    def parse(cls, label: str | None):
+        return cls.fromLabel(label, cls.OTHER) if label else None
 
 
 # Create your models here.
 class Transaction(models.Model):
     processor = models.CharField(max_length=1)
-    result = models.CharField(max_length=64, default="Not Submitted")
+    result = models.PositiveSmallIntegerField(
+        choices=Result, default=Result.NOT_SUBMITTED
+    )
     created_at = models.DateTimeField(auto_now_add=True)
-    invoiceID = models.CharField(max_length=16)
+    invoiceID = models.UUIDField()  # sent as invoiceNumber, see below
     refID = models.CharField(max_length=64)
     transId = models.CharField(max_length=254, null=True, blank=True)
-    amount = models.CharField(max_length=64)
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
     salesperson = models.CharField(max_length=254)
-    submitted = models.BooleanField(default=False)  # type:ignore
+    submitted = models.BooleanField(default=False)  # type: ignore
     resultStatus = models.CharField(
         max_length=8, null=True, blank=True
     )  # messages.resultCode
@@ -34,8 +87,8 @@ class Transaction(models.Model):
     resultText = models.CharField(
         max_length=254, null=True, blank=True
     )  # messages.message[0].text or transactionResponse.messages.message[0].description
-    responseCode = models.CharField(
-        max_length=32, null=True, blank=True
+    responseCode = models.PositiveSmallIntegerField(
+        choices=ResponseCode, null=True, blank=True
     )  # transactionResponse.responseCode
     authCode = models.CharField(
         max_length=6, null=True, blank=True
@@ -55,8 +108,8 @@ class Transaction(models.Model):
     accountNumber = models.CharField(
         max_length=254, null=True, blank=True
     )  # transactionResponse.accountNumber
-    accountType = models.CharField(
-        max_length=254, null=True, blank=True
+    accountType = models.PositiveSmallIntegerField(
+        choices=AccountType, null=True, blank=True
     )  # transactionResponse.accountType
     error = models.CharField(
         max_length=254, null=True, blank=True
@@ -65,12 +118,63 @@ class Transaction(models.Model):
         max_length=254, null=True, blank=True
     )  # transactionResponse.errors.error[0].errorText
 
+    class Meta:
+        indexes = [
+            # Reporting filters, each ending in the (created_at, id) keyset
+            models.Index(fields=["created_at", "id"], name="portal_tx_created_idx"),
+            models.Index(
+                fields=["salesperson", "created_at", "id"],
+                name="portal_tx_salesperson_idx",
+            ),
+            models.Index(
+                fields=["result", "created_at", "id"], name="portal_tx_result_idx"
+            ),
+            models.Index(fields=["transId"], name="portal_tx_transid_idx"),
+            models.Index(fields=["invoiceID"], name="portal_tx_invoice_idx"),
+            models.Index(fields=["refID"], name="portal_tx_refid_idx"),
+        ]
+
+    @staticmethod
+    def newInvoiceID() -> uuid.UUID:
+        # 80 random bits: all of them fit in the 20-character invoiceNumber
+        return uuid.UUID(bytes=os.urandom(10) + bytes(6))
+
+    @staticmethod
+    def parseInvoice(text) -> uuid.UUID:
+        """
+        ``invoiceID`` for an invoice number as sent to the gateway, a full
+        UUID, or a legacy dashed 16-character ID.
+        """
+        digits = str(text).replace("-", "").lower()
+        if len(digits) > 32:
+            raise ValueError(f"Invalid invoice number {text!r}")
+        return uuid.UUID(digits.ljust(32, "0"))
+
+    @property
+    def invoiceNumber(self) -> str:
+        return self.invoiceID.hex[:20]
+
+    @staticmethod
+    def parseAmount(amount) -> Decimal:
+        try:
+            value = Decimal(str(amount).strip())
+        except InvalidOperation:
+            raise ValueError(f"Invalid amount {amount!r}")
+        if (
+            not value.is_finite()
+            or value <= 0
+            or value != round(value, 2)
+            or value.adjusted() >= 10  # max_digits=12, decimal_places=2
+        ):
+            raise ValueError(f"Invalid amount {amount!r}")
+        return value.quantize(Decimal("0.01"))
+
     def getResults(self):
         result = {
             "processor": str(self.processor),
-            "result": str(self.result),
+            "result": self.get_result_display(),
             "created_at": str(self.created_at),
-            "invoiceID": str(self.invoiceID),
+            "invoiceID": self.invoiceNumber,
             "refID": str(self.refID),
             "amount": str(self.amount),
             "salesperson": str(self.salesperson),
@@ -81,65 +185,281 @@ class Transaction(models.Model):
             "resultText": str(self.resultText),
             "responseCode": str(self.responseCode),
             "networkTransId": str(self.networkTransId),
-            "accountType": str(self.accountType),
+            "accountType": str(self.accountType and self.get_accountType_display()),
             "error": str(self.error),
             "errorText": str(self.errorText),
         }
-        print(result)
         return result
 
     @staticmethod
-    def process(
+    def strategy(
         processor: str, amount: float, salesperson: str, cardDetails: dict[str, str]
     ):
-        strategies = {
-            # Auth.net
-            "A": {
-                "keys": {"name": "SB_AUTH_NET_ID", "key": "SB_AUTH_NET_ID"},
-                "strategy": AuthNetStrategy,
+        entry = processors.registry.get(processor)
+        return entry.strategy(
+            amount=amount,
+            salesperson=salesperson,
+            processor=entry,
+            cardDetails=cardDetails,
+        )
+
+    @staticmethod
+    def paymentArgs(payload: dict):
+        """``Transaction.process`` arguments from a JSON or CSV payment payload."""
+        return (
+            "A",
+            payload.get("amount"),
+            payload.get("salesperson"),
+            {
+                "number": payload.get("number"),
+                "expiration": payload.get("expiration"),
+                "cvv": payload.get("cvv"),
             },
-            # Stripe
-            "S": {"strategy": AuthNetStrategy, "keys": {"key": ""}},
-        }
+        )
+
+    @staticmethod
+    def process(
+        processor: str, amount: float, salesperson: str, cardDetails: dict[str, str]
+    ):
         try:
-            (
-                strategies.get(processor, {})
-                .get("strategy", {})(
-                    amount=amount,
-                    salesperson=salesperson,
-                    keys=strategies.get(processor, {}).get("keys", {}),
-                    cardDetails=cardDetails,
-                )
-                .process()
-            )
+            args = validation.validate(processor, amount, salesperson, cardDetails)
+        except validation.PaymentRejected as e:
+            return PaymentResult(e.result(), submitted=False)
+        strategy = None
+        try:
+            strategy = Transaction.strategy(*args)
+            return PaymentResult(strategy.process(), strategy.tx.submitted)
         except Exception as e:
-            print(e)
-            return e
+            return Transaction.__failed(processor, strategy, e)
+
+    @staticmethod
+    async def aprocess(
+        processor: str, amount: float, salesperson: str, cardDetails: dict[str, str]
+    ):
+        try:
+            args = validation.validate(processor, amount, salesperson, cardDetails)
+        except validation.PaymentRejected as e:
+            return PaymentResult(e.result(), submitted=False)
+        strategy = None
+        try:
+            strategy = Transaction.strategy(*args)
+            return PaymentResult(await strategy.aprocess(), strategy.tx.submitted)
+        except Exception as e:
+            return Transaction.__failed(processor, strategy, e)
+
+    @staticmethod
+    def __failed(processor: str, strategy, error: Exception) -> "PaymentResult":
+        logger.exception("Payment failed", extra={"processor": processor})
+        metrics.PAYMENTS.inc(
+            processor=processor, result="Error", error="PROCESSING_ERROR"
+        )
+        return PaymentResult(
+            {"error": "PROCESSING_ERROR", "errorText": str(error)},
+            submitted=strategy is not None and strategy.tx.submitted,
+        )
+
+
+class PaymentResult(dict):
+    """
+    The client payload of a payment. ``submitted`` is False when the request
+    never reached the gateway (rejected by validation, short-circuited, or
+    failed before sending), so trying it again cannot charge the card twice.
+    """
+
+    def __init__(self, payload: dict, submitted: bool):
+        super().__init__(payload)
+        self.submitted = submitted
+
+
+class IdempotencyKey(models.Model):
+    key = models.CharField(max_length=255, unique=True)
+    fingerprint = models.CharField(max_length=64)  # sha256 of the request body
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed = models.BooleanField(default=False)  # type: ignore
+    status = models.PositiveSmallIntegerField(null=True, blank=True)
+    body = models.TextField(null=True, blank=True)
+
+
+class OutboxEvent(models.Model):
+    """
+    Post-payment side effect (receipt, audit record, analytics event) queued
+    in the same transaction as the payment and run by ``outboxworker``.
+
+    ``available_at`` is when the event may next be claimed: it is pushed out
+    by the retry backoff, and by the lease while a worker holds the event.
+    """
+
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+    kind = models.CharField(max_length=32)
+    payload = models.JSONField(encoder=DjangoJSONEncoder)
+    status = models.CharField(max_length=8, default=PENDING)
+    created_at = models.DateTimeField(auto_now_add=True)
+    available_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveSmallIntegerField(default=0)  # counted when claimed
+    lastError = models.TextField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["status", "available_at"], name="portal_outbox_due_idx"
+            ),
+        ]
+
+
+class SalesRollup(models.Model):
+    """
+    Per-salesperson daily totals, kept current by ``AuthNetStrategy.commit``
+    and rebuilt from ``Transaction`` by ``reconcilerollups``.
+    """
+
+    salesperson = models.CharField(max_length=254)
+    day = models.DateField()  # in TIME_ZONE
+    approved = models.PositiveIntegerField(default=0)
+    approvedAmount = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    failed = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["salesperson", "day"], name="portal_rollup_salesperson_day"
+            ),
+        ]
+        indexes = [models.Index(fields=["day"], name="portal_rollup_day_idx")]
+
+    @classmethod
+    def add(cls, tx: Transaction):
+        """Counts a settled payment; anything else leaves the totals alone."""
+        deltas = cls.deltas(tx)
+        if deltas:
+            cls.apply(tx.salesperson, timezone.localdate(tx.created_at), deltas)
 
+    @staticmethod
+    def deltas(tx: Transaction, sign: int = 1) -> dict:
+        """What ``tx`` adds to its day's totals (takes back, with ``sign=-1``)."""
+        if tx.result == Result.SUCCESS:
+            return {"approved": sign, "approvedAmount": sign * tx.amount}
+        if tx.result == Result.FAILED:
+            return {"failed": sign}
+        return {}
+
+    @classmethod
+    def apply(cls, salesperson: str, day, deltas: dict):
+        """
+        Adds ``deltas`` to the day's totals. A missing row is only created
+        for gains: there is nothing to take back from.
+        """
+        key = {"salesperson": salesperson, "day": day}
+        increments = {name: models.F(name) + value for name, value in deltas.items()}
+        if cls.objects.filter(**key).update(**increments):
+            return
+        if any(value < 0 for value in deltas.values()):
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(**key, **deltas)
+        except IntegrityError:
+            # Another payment created the day's row first
+            cls.objects.filter(**key).update(**increments)
+
+
+class ArchivePartition(models.Model):
+    """
+    One month of archived transactions: a gzip file in ``ARCHIVE["DIR"]``
+    that ``archivetransactions`` appends a member to per batch. ``members``
+    lists each batch as ``{"offset", "rows", "first", "last"}`` in time
+    order; readers only read listed members, so a batch that never committed
+    is ignored. Single rows are found through the month's index file.
+    """
+
+    month = models.CharField(max_length=7, unique=True)  # YYYY-MM in TIME_ZONE
+    members = models.JSONField(default=list)
+    rows = models.PositiveIntegerField(default=0)
+    bytes = models.PositiveBigIntegerField(default=0)
+    first = models.DateTimeField()
+    last = models.DateTimeField()
+
+
+class AuthNetController(createTransactionController):
+    """
+    ``createTransactionController`` that posts through the shared gateway
+    transport instead of a one-off ``requests.post``.
+
+    The SDK keeps its endpoint in a class attribute that every new controller
+    resets to the sandbox, so the endpoint is held per instance here.
+    """
+
+    def __init__(self, apiRequest, endpoint: str):
+        super().__init__(apiRequest)
+        self.endpoint = endpoint
+        self.readTimeout = None
+
+    def execute(self):
+        self.setClientId()
+        try:
+            httpResponse = gateway.transport().post(
+                self.endpoint,
+                self.buildrequest(),
+                authConstants.headers,
+                self.readTimeout,
+            )
+        except requests.RequestException as e:
+            logger.warning("Gateway request failed: %r", e)
+            return
+        if not httpResponse:
+            return
+
+        httpResponse.encoding = authConstants.response_encoding
+        self._httpResponse = httpResponse.text[3:]  # strip BOM
+        try:
+            self._response = authApi.CreateFromDocument(self._httpResponse)
+            xmlResponse = self._response.toxml(
+                encoding=authConstants.xml_encoding,
+                element_name=self.getrequesttype(),
+            )
+            xmlResponse = xmlResponse.replace(authConstants.nsNamespace1, b"")
+            xmlResponse = xmlResponse.replace(authConstants.nsNamespace2, b"")
+            self._mainObject = objectify.fromstring(xmlResponse)
+        except Exception:
+            # objectify rejects documents that declare their encoding
+            self._mainObject = objectify.fromstring(
+                self._httpResponse.replace('encoding="utf-8"', "")
+            )
 
+
+@processors.registry.register(
+    "A", keys={"name": "SB_AUTH_NET_ID", "key": "SB_AUTH_NET_KEY"}
+)
 class AuthNetStrategy:
+    DESCRIPTION = "Autocommunications through WholeSale Communications"
+
     def __init__(
         self,
         amount: float,
         salesperson: str,
-        keys: dict[str, str],
+        processor: processors.Processor,
         cardDetails: dict[str, str],
     ):
         self.tx: Transaction = Transaction(
-            processor="A",
-            amount=str(amount),
+            processor=processor.code,
+            amount=Transaction.parseAmount(amount),
             salesperson=salesperson,
-            invoiceID=str(uuid.uuid4())[:16],
-            refID=(str(datetime.now().timestamp())).split(".")[0],
+            invoiceID=Transaction.newInvoiceID(),
+            refID=uuid.uuid4().hex[:20],
         )
-        self.__keys: dict[str, str] = keys
+        profiling.tag(refID=self.tx.refID)
+        self.__processor = processor
         self.__cardDetails: dict[str, str] = cardDetails
+        self.__shortCircuited = False
 
-    @property
-    def __authType(self):
+    @staticmethod
+    def authenticate(credentials: dict[str, str]):
         authType = authApi.merchantAuthenticationType()
-        authType.name = os.getenv(self.__keys["name"])
-        authType.transactionKey = os.getenv(self.__keys["key"])
+        authType.name = credentials["name"]
+        authType.transactionKey = credentials["key"]
         return authType
 
     @property
@@ -153,8 +473,8 @@ class AuthNetStrategy:
     @property
     def __orderType(self):
         orderType = authApi.orderType()
-        orderType.invoiceNumber = self.tx.invoiceID
-        orderType.description = "Autocommunications through WholeSale Communications"
+        orderType.invoiceNumber = self.tx.invoiceNumber
+        orderType.description = AuthNetStrategy.DESCRIPTION
         return orderType
 
     @property
@@ -177,287 +497,322 @@ class AuthNetStrategy:
     def __transactionRequest(self):
         txRequest = authApi.createTransactionRequest()
         txRequest.refId = self.tx.refID
-        txRequest.merchantAuthentication = self.__authType
+        txRequest.merchantAuthentication = self.__processor.auth
         txRequest.transactionRequest = self.__transactionType
         return txRequest
 
     @property
     def __controller(self):
-        controller = createTransactionController(self.__transactionRequest)
-        return controller
+        return AuthNetController(self.__transactionRequest, settings.AUTH_NET_ENDPOINT)
+
+    @property
+    def __leanRequest(self):
+        return codec.encodeTransactionRequest(
+            refId=self.tx.refID,
+            name=self.__processor.credentials["name"],
+            transactionKey=self.__processor.credentials["key"],
+            amount=self.tx.amount,
+            cardNumber=self.__cardDetails["number"],
+            expirationDate=self.__cardDetails["expiration"],
+            cardCode=self.__cardDetails["cvv"],
+            invoiceNumber=self.tx.invoiceNumber,
+            description=AuthNetStrategy.DESCRIPTION,
+        )
+
+    def __sender(self):
+        """
+        Builds the request once and returns a callable that submits it with
+        the given read timeout and yields an ``AuthNetResponse`` (or None when
+        nothing came back).
+
+        ``AUTH_NET_CODEC = "lean"`` bypasses the SDK's pyxb bindings.
+        """
+        if settings.AUTH_NET_CODEC == "lean":
+            body = self.__leanRequest
+
+            def send(readTimeout):
+                try:
+                    httpResponse = gateway.transport().post(
+                        settings.AUTH_NET_ENDPOINT,
+                        body,
+                        authConstants.headers,
+                        readTimeout,
+                    )
+                except requests.RequestException as e:
+                    logger.warning("Gateway request failed: %r", e)
+                    return None
+                if not httpResponse:
+                    return None
+                return codec.decodeTransactionResponse(httpResponse.content)
+
+            return send
+
+        controller = self.__controller
+
+        def send(readTimeout):
+            controller.readTimeout = readTimeout
+            controller.execute()
+            response = controller.getresponse()
+            return None if response is None else codec.fromObjectify(response)
+
+        return send
+
+    def prepare(self):
+        """Builds the gateway request; ``submit`` sends it."""
+        with metrics.STAGE_SECONDS.time(processor=self.tx.processor, stage="build"):
+            self.__send = self.__sender()
+
+    def submit(self) -> codec.AuthNetResponse | None:
+        """
+        Sends the request through the processor's circuit breaker. While the
+        circuit is open nothing is sent and None comes back at once.
+        """
+        breaker = circuit.breaker(self.tx.processor)
+        if not breaker.allow():
+            self.__shortCircuited = True
+            return None
+        response = None
+        started = time.perf_counter()
+        try:
+            with metrics.GATEWAY_IN_FLIGHT.track(processor=self.tx.processor):
+                response = self.__send(breaker.timeout())
+        finally:
+            latency = time.perf_counter() - started
+            breaker.record(latency, response is not None)
+            metrics.STAGE_SECONDS.observe(
+                latency, processor=self.tx.processor, stage="gateway"
+            )
+        return response
 
     def process(self):
-        self.__controller.execute()
-        self.tx.submitted = True
-        self.tx.save()
-        response = self.__controller.getresponse()
-        if response is not None:
-            # REFACTOR COUNTER : 4
-            # auth.net sdk and api fucking suck
-            if hasattr(response, "messages"):
-                self.tx.resultStatus = getattr(response.messages, "resultCode", None)
-                print("\n=== AUTHORIZE.NET RESPONSE ===")
-                if self.tx.resultStatus == "Ok":
-                    AuthNetStrategy.printSuccessResponse(response)
-                else:
-                    AuthNetStrategy.printError(response)
-                print("===============================\n")
-
-                if (
-                    hasattr(response.messages, "message")
-                    and len(response.messages.message) > 0
-                ):
-                    msg = response.messages.message[0]
-                    self.tx.resultCode = getattr(msg, "code", None)
-                    self.tx.resultText = getattr(msg, "text", None)
-            if hasattr(response, "transactionResponse"):
-                tx_resp = response.transactionResponse
-                self.tx.responseCode = str(getattr(tx_resp, "responseCode", None))
-                self.tx.authCode = getattr(tx_resp, "authCode", None)
-                self.tx.avsResultCode = getattr(tx_resp, "avsResultCode", None)
-                self.tx.cvvResultCode = getattr(tx_resp, "cvvResultCode", None)
-                self.tx.cavvResultCode = getattr(tx_resp, "cavvResultCode", None)
-                self.tx.networkTransId = getattr(tx_resp, "networkTransId", None)
-                self.tx.accountNumber = getattr(tx_resp, "accountNumber", None)
-                self.tx.accountType = getattr(tx_resp, "accountType", None)
-                self.tx.transId = getattr(tx_resp, "transId", None)
+        with metrics.PAYMENTS_IN_FLIGHT.track(processor=self.tx.processor):
+            self.prepare()
+            self.tx.submitted = True
+            with metrics.STAGE_SECONDS.time(processor=self.tx.processor, stage="save"):
                 self.tx.save()
-                if hasattr(tx_resp, "messages") and hasattr(
-                    tx_resp.messages, "message"
-                ):
-                    if len(tx_resp.messages.message) > 0:
-                        tx_msg = tx_resp.messages.message[0]
-                        self.tx.resultNumber = getattr(tx_msg, "code", None)
-                        if not self.tx.resultText:
-                            self.tx.resultText = getattr(tx_msg, "description", None)
-                        self.tx.save()
-
-                if hasattr(tx_resp, "errors") and hasattr(tx_resp.errors, "error"):
-                    if len(tx_resp.errors.error) > 0:
-                        err = tx_resp.errors.error[0]
-                        self.tx.error = getattr(err, "errorCode", None)
-                        self.tx.errorText = getattr(err, "errorText", None)
-                        self.tx.save()
-
-            if self.tx.responseCode == "1":
-                self.tx.result = "Success"
-                self.tx.save()
-                return self.tx.getResults()
-
-            else:
-                self.tx.result = "Failed"
-
-                if hasattr(response, "transactionResponse") and hasattr(
-                    response.transactionResponse, "errors"
-                ):
-                    tx_resp = response.transactionResponse
-                    if hasattr(tx_resp.errors, "error"):
-                        if (
-                            isinstance(tx_resp.errors.error, list)
-                            and len(tx_resp.errors.error) > 0
-                        ):
-                            err = tx_resp.errors.error[0]
-                            self.tx.error = getattr(err, "errorCode", "UNKNOWN_ERROR")
-                            self.tx.errorText = getattr(
-                                err, "errorText", "Unknown error occurred"
-                            )
-                        elif not isinstance(tx_resp.errors.error, list):
-                            err = tx_resp.errors.error
-                            self.tx.error = getattr(err, "errorCode", "UNKNOWN_ERROR")
-                            self.tx.errorText = getattr(
-                                err, "errorText", "Unknown error occurred"
-                            )
-
-                if (
-                    not self.tx.error
-                    and hasattr(response, "messages")
-                    and hasattr(response.messages, "message")
-                ):
-                    if len(response.messages.message) > 0:
-                        msg = response.messages.message[0]
-                        self.tx.error = getattr(msg, "code", "UNKNOWN_ERROR")
-                        self.tx.errorText = getattr(
-                            msg, "text", "Unknown error occurred"
-                        )
-
-            self.tx.save()
+            response = self.submit()
+            results = self.record(response)
+            self.commit(response)
+            return results
+
+    async def aprocess(self):
+        """
+        Async counterpart of ``process``. The blocking gateway call runs on the
+        bounded gateway executor and the row is written with the async ORM.
+        """
+        with metrics.PAYMENTS_IN_FLIGHT.track(processor=self.tx.processor):
+            self.prepare()
+            self.tx.submitted = True
+            with metrics.STAGE_SECONDS.time(processor=self.tx.processor, stage="save"):
+                await self.tx.asave()
+            response = await gateway.run(self.submit)
+            results = self.record(response)
+            await sync_to_async(self.commit)(response)
+            return results
+
+    def commit(self, response: codec.AuthNetResponse | None):
+        """
+        Saves the recorded outcome, adds it to the sales rollup and queues its
+        side effects in one transaction, so the totals and events change
+        exactly when the payment row does.
+        """
+        tx = self.tx
+        with metrics.STAGE_SECONDS.time(processor=tx.processor, stage="save"):
+            with transaction.atomic():
+                tx.save()
+                SalesRollup.add(tx)
+                OutboxEvent.objects.bulk_create(self.events(response))
+        metrics.PAYMENTS.inc(
+            processor=tx.processor,
+            result=tx.get_result_display(),
+            responseCode=tx.responseCode,
+            error=tx.error,
+        )
+
+    def events(self, response: codec.AuthNetResponse | None) -> list[OutboxEvent]:
+        """Receipt (approved payments only), audit and analytics events."""
+        tx = self.tx
+        if response is None:
+            summary = None
+        elif tx.resultStatus == "Ok":
+            summary = AuthNetStrategy.successSummary(response)
+        else:
+            summary = AuthNetStrategy.errorSummary(response)
+
+        events = [
+            OutboxEvent(
+                kind="audit",
+                payload={"transaction": tx.pk, "refID": tx.refID, "response": summary},
+            ),
+            OutboxEvent(
+                kind="analytics",
+                payload={
+                    "transaction": tx.pk,
+                    "processor": tx.processor,
+                    "result": tx.get_result_display(),
+                    "salesperson": tx.salesperson,
+                    "amount": tx.amount,
+                    "responseCode": tx.responseCode,
+                    "error": tx.error,
+                    "created_at": tx.created_at,
+                },
+            ),
+        ]
+        if tx.result == Result.SUCCESS:
+            receipt = {
+                "transaction": tx.pk,
+                "invoiceNumber": tx.invoiceNumber,
+                "transId": tx.transId,
+                "authCode": tx.authCode,
+                "amount": tx.amount,
+                "accountNumber": tx.accountNumber,
+                "accountType": tx.accountType and tx.get_accountType_display(),
+                "salesperson": tx.salesperson,
+                "created_at": tx.created_at,
+            }
+            events.append(OutboxEvent(kind="receipt", payload=receipt))
+        return events
+
+    def record(self, response: codec.AuthNetResponse | None):
+        """
+        Maps a gateway response onto ``self.tx`` in memory and returns the
+        payload for the client. Nothing is written to the database here.
+        """
+        if self.__shortCircuited:
+            self.tx.submitted = False
+            self.tx.result = Result.ERROR
+            self.tx.error = "GATEWAY_UNAVAILABLE"
+            self.tx.errorText = "Payment gateway unavailable, try again shortly"
             return {
-                "error": str(self.tx.error) or "UNKNOWN_ERROR",
-                "errorText": str(self.tx.errorText) or "Transaction failed",
+                "error": "GATEWAY_UNAVAILABLE",
+                "errorText": "Payment gateway unavailable, try again shortly",
             }
-        else:
-            self.tx.result = "Error"
+
+        if response is None:
+            self.tx.result = Result.ERROR
             self.tx.error = "NO_RESPONSE"
             self.tx.errorText = "No response from payment gateway"
-            self.tx.save()
-
             return {
                 "error": "NO_RESPONSE",
                 "errorText": "No response from payment gateway",
             }
 
+        self.tx.resultStatus = response.resultCode
+        if response.messages:
+            self.tx.resultCode, self.tx.resultText = response.messages[0]
+
+        if response.hasTransactionResponse:
+            self.tx.responseCode = ResponseCode.parse(response.responseCode)
+            self.tx.authCode = response.authCode
+            self.tx.avsResultCode = response.avsResultCode
+            self.tx.cvvResultCode = response.cvvResultCode
+            self.tx.cavvResultCode = response.cavvResultCode
+            self.tx.networkTransId = response.networkTransId
+            self.tx.accountNumber = response.accountNumber
+            self.tx.accountType = AccountType.parse(response.accountType)
+            self.tx.transId = response.transId
+            if response.transactionMessages:
+                code, description = response.transactionMessages[0]
+                self.tx.resultNumber = code
+                if not self.tx.resultText:
+                    self.tx.resultText = description
+            if response.errors:
+                errorCode, errorText = response.errors[0]
+                self.tx.error = errorCode or "UNKNOWN_ERROR"
+                self.tx.errorText = errorText or "Unknown error occurred"
+
+        if self.tx.responseCode == ResponseCode.APPROVED:
+            self.tx.result = Result.SUCCESS
+            self.__log()
+            return self.tx.getResults()
+
+        self.tx.result = Result.FAILED
+        if not self.tx.error and response.messages:
+            code, text = response.messages[0]
+            self.tx.error = code or "UNKNOWN_ERROR"
+            self.tx.errorText = text or "Unknown error occurred"
+
+        self.__log()
+        return {
+            "error": str(self.tx.error or "UNKNOWN_ERROR"),
+            "errorText": str(self.tx.errorText or "Transaction failed"),
+        }
+
+    def __log(self):
+        logger.info(
+            "Payment %s",
+            self.tx.get_result_display(),
+            extra={
+                "refID": self.tx.refID,
+                "invoiceNumber": self.tx.invoiceNumber,
+                "transId": self.tx.transId,
+                "responseCode": self.tx.responseCode,
+                "error": self.tx.error,
+            },
+        )
+
+    @staticmethod
+    def __messages(response: codec.AuthNetResponse):
+        return {
+            "resultCode": response.resultCode,
+            "message": [
+                {"code": code, "text": text} for code, text in response.messages
+            ],
+        }
+
     @staticmethod
-    def printSuccessResponse(response):
+    def successSummary(response: codec.AuthNetResponse):
         """
-        Pretty-prints an Authorize.net response in a JSON-like format
-        that's easier to read than the recursive object dump.
+        Authorize.net response as a JSON-ready dict for the audit event;
+        easier to read than the recursive object dump.
         """
-
-        # Start with an empty dictionary
         result = {}
-
-        # Extract refId
-        if hasattr(response, "refId"):
+        if response.refId is not None:
             result["refId"] = response.refId
-
-        # Extract messages structure
-        if hasattr(response, "messages"):
-            messages = {"resultCode": response.messages.resultCode}
-
-            # Extract message array
-            if hasattr(response.messages, "message"):
-                msg_list = []
-                # Sometimes it's a single message, sometimes a list
-                if isinstance(response.messages.message, list):
-                    for msg in response.messages.message:
-                        msg_list.append(
-                            {
-                                "code": getattr(msg, "code", None),
-                                "text": getattr(msg, "text", None),
-                            }
-                        )
-                else:
-                    msg = response.messages.message
-                    msg_list.append(
-                        {
-                            "code": getattr(msg, "code", None),
-                            "text": getattr(msg, "text", None),
-                        }
-                    )
-                messages["message"] = msg_list
-
-            result["messages"] = messages
-
-        # Extract transaction response
-        if hasattr(response, "transactionResponse"):
-            tx_resp = response.transactionResponse
-            tx_data = {
-                "responseCode": getattr(tx_resp, "responseCode", None),
-                "authCode": getattr(tx_resp, "authCode", None),
-                "avsResultCode": getattr(tx_resp, "avsResultCode", None),
-                "cvvResultCode": getattr(tx_resp, "cvvResultCode", None),
-                "cavvResultCode": getattr(tx_resp, "cavvResultCode", None),
-                "transId": getattr(tx_resp, "transId", None),
-                "refTransID": getattr(tx_resp, "refTransID", None) or "",
-                "transHash": getattr(tx_resp, "transHash", None) or "",
-                "testRequest": getattr(tx_resp, "testRequest", None),
-                "accountNumber": getattr(tx_resp, "accountNumber", None),
-                "accountType": getattr(tx_resp, "accountType", None),
-                "transHashSha2": getattr(tx_resp, "transHashSha2", None) or "",
-                "networkTransId": getattr(tx_resp, "networkTransId", None) or "",
+        if response.resultCode is not None:
+            result["messages"] = AuthNetStrategy.__messages(response)
+
+        if response.hasTransactionResponse:
+            result["transactionResponse"] = {
+                "responseCode": response.responseCode,
+                "authCode": response.authCode,
+                "avsResultCode": response.avsResultCode,
+                "cvvResultCode": response.cvvResultCode,
+                "cavvResultCode": response.cavvResultCode,
+                "transId": response.transId,
+                "refTransID": response.refTransID or "",
+                "transHash": response.transHash or "",
+                "testRequest": response.testRequest,
+                "accountNumber": response.accountNumber,
+                "accountType": response.accountType,
+                "transHashSha2": response.transHashSha2 or "",
+                "networkTransId": response.networkTransId or "",
+                "messages": [
+                    {"code": code, "description": description}
+                    for code, description in response.transactionMessages
+                ],
             }
-
-            # Extract messages from transaction response
-            if hasattr(tx_resp, "messages"):
-                msg_list = []
-                if hasattr(tx_resp.messages, "message"):
-                    if isinstance(tx_resp.messages.message, list):
-                        for msg in tx_resp.messages.message:
-                            msg_list.append(
-                                {
-                                    "code": getattr(msg, "code", None),
-                                    "description": getattr(msg, "description", None),
-                                }
-                            )
-                    else:
-                        msg = tx_resp.messages.message
-                        msg_list.append(
-                            {
-                                "code": getattr(msg, "code", None),
-                                "description": getattr(msg, "description", None),
-                            }
-                        )
-                tx_data["messages"] = msg_list
-
-            result["transactionResponse"] = tx_data
-
-        # Print in a nicely formatted JSON structure
-        print(json.dumps(result, indent=2, default=str))
         return result
 
     @staticmethod
-    def printError(response):
+    def errorSummary(response: codec.AuthNetResponse):
         """
-        Pretty-prints an Authorize.net error response in a JSON-like format
-        that's easier to read than the recursive object dump.
+        Authorize.net error response as a JSON-ready dict for the audit event;
+        easier to read than the recursive object dump.
         """
-        # Start with an empty dictionary
         result = {}
-
-        # Extract refId
-        if hasattr(response, "refId"):
+        if response.refId is not None:
             result["refId"] = response.refId
-
-        # Extract messages structure
-        if hasattr(response, "messages"):
-            messages = {"resultCode": response.messages.resultCode}
-
-            # Extract message array
-            if hasattr(response.messages, "message"):
-                msg_list = []
-                # Sometimes it's a single message, sometimes a list
-                if isinstance(response.messages.message, list):
-                    for msg in response.messages.message:
-                        msg_list.append(
-                            {
-                                "code": getattr(msg, "code", None),
-                                "text": getattr(msg, "text", None),
-                            }
-                        )
-                else:
-                    msg = response.messages.message
-                    msg_list.append(
-                        {
-                            "code": getattr(msg, "code", None),
-                            "text": getattr(msg, "text", None),
-                        }
-                    )
-                messages["message"] = msg_list
-
-            result["messages"] = messages
-
-        # Extract transaction response errors
-        if hasattr(response, "transactionResponse"):
-            tx_resp = response.transactionResponse
-            tx_data = {
-                "responseCode": getattr(tx_resp, "responseCode", None),
-                "transId": getattr(tx_resp, "transId", None),
+        if response.resultCode is not None:
+            result["messages"] = AuthNetStrategy.__messages(response)
+
+        if response.hasTransactionResponse:
+            result["transactionResponse"] = {
+                "responseCode": response.responseCode,
+                "transId": response.transId,
+                "errors": [
+                    {"errorCode": errorCode, "errorText": errorText}
+                    for errorCode, errorText in response.errors
+                ],
             }
-
-            # Extract error information
-            if hasattr(tx_resp, "errors"):
-                error_list = []
-                if hasattr(tx_resp.errors, "error"):
-                    if isinstance(tx_resp.errors.error, list):
-                        for err in tx_resp.errors.error:
-                            error_list.append(
-                                {
-                                    "errorCode": getattr(err, "errorCode", None),
-                                    "errorText": getattr(err, "errorText", None),
-                                }
-                            )
-                    else:
-                        err = tx_resp.errors.error
-                        error_list.append(
-                            {
-                                "errorCode": getattr(err, "errorCode", None),
-                                "errorText": getattr(err, "errorText", None),
-                            }
-                        )
-                tx_data["errors"] = error_list
-
-            result["transactionResponse"] = tx_data
-
-        # Print in a nicely formatted JSON structure
-        print(json.dumps(result, indent=2, default=str))
         return result
@@ -0,0 +1,120 @@
+import logging
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+_handlers = {}
+
+
+def handler(kind: str):
+    """Registers the function that carries out events of ``kind``."""
+
+    def decorator(func):
+        _handlers[kind] = func
+        return func
+
+    return decorator
+
+
+def claim(batch: int | None = None) -> list[OutboxEvent]:
+    """
+    Leases up to ``batch`` due events to the caller, counting the attempt.
+
+    Pending events whose ``available_at`` has passed are due, as are running
+    events whose lease ran out (their worker died). Rows are locked with
+    SKIP LOCKED where the backend has it, so concurrent workers take disjoint
+    batches; SQLite's IMMEDIATE transactions serialize the claim instead.
+
+    Attempts are counted when an event is claimed, so one that keeps killing
+    its worker runs out of attempts too: it is failed instead of leased.
+    """
+    config = settings.OUTBOX
+    now = timezone.now()
+    with transaction.atomic():
+        events = list(
+            OutboxEvent.objects.select_for_update(skip_locked=True)
+            .filter(
+                status__in=(OutboxEvent.PENDING, OutboxEvent.RUNNING),
+                available_at__lte=now,
+            )
+            .order_by("available_at")[: batch or config["BATCH"]]
+        )
+        spent = [event for event in events if event.attempts >= config["ATTEMPTS"]]
+        if spent:
+            OutboxEvent.objects.filter(pk__in=[event.pk for event in spent]).update(
+                status=OutboxEvent.FAILED, lastError="Lease expired on the last attempt"
+            )
+            for event in spent:
+                logger.error(
+                    "Outbox %s abandoned", event.kind, extra={"event": event.pk}
+                )
+        events = [event for event in events if event.attempts < config["ATTEMPTS"]]
+        OutboxEvent.objects.filter(pk__in=[event.pk for event in events]).update(
+            status=OutboxEvent.RUNNING,
+            attempts=F("attempts") + 1,
+            available_at=now + timedelta(seconds=config["LEASE"]),
+        )
+    for event in events:
+        event.status = OutboxEvent.RUNNING
+        event.attempts += 1
+    return events
+
+
+def backoff(attempts: int) -> float:
+    """Seconds before retry ``attempts``: exponential, capped, full jitter."""
+    config = settings.OUTBOX
+    ceiling = min(config["MAX_BACKOFF"], config["BACKOFF"] * 2 ** (attempts - 1))
+    return random.uniform(0, ceiling)
+
+
+def dispatch(event: OutboxEvent) -> bool:
+    """Runs one claimed event and records the outcome; True on success."""
+    try:
+        func = _handlers[event.kind]
+    except KeyError:
+        return _finish(event, f"No handler for {event.kind!r}", final=True)
+    try:
+        func(event.payload)
+    except Exception as e:
+        logger.warning(
+            "Outbox %s failed", event.kind, exc_info=True, extra={"event": event.pk}
+        )
+        final = event.attempts >= settings.OUTBOX["ATTEMPTS"]
+        return _finish(event, repr(e), final)
+    return _finish(event, None)
+
+
+def _finish(event: OutboxEvent, error: str | None, final: bool = False) -> bool:
+    """Records the outcome of the attempt ``claim`` counted."""
+    if error is None:
+        OutboxEvent.objects.filter(pk=event.pk).update(status=OutboxEvent.DONE)
+        return True
+    OutboxEvent.objects.filter(pk=event.pk).update(
+        status=OutboxEvent.FAILED if final else OutboxEvent.PENDING,
+        available_at=timezone.now() + timedelta(seconds=backoff(event.attempts)),
+        lastError=error,
+    )
+    return False
+
+
+@handler("receipt")
+def sendReceipt(payload):
+    logger.info("Receipt", extra={"receipt": payload})
+
+
+@handler("audit")
+def writeAudit(payload):
+    logger.info("Audit", extra={"audit": payload})
+
+
+@handler("analytics")
+def trackPayment(payload):
+    logger.info("Payment event", extra={"analytics": payload})
@@ -0,0 +1,79 @@
+import os
+from dataclasses import dataclass, field
+
+from django.core import checks
+
+
+class ProcessorUnavailable(ValueError):
+    pass
+
+
+@dataclass
+class Processor:
+    code: str
+    strategy: type
+    keys: dict[str, str]  # credential name -> environment variable
+    credentials: dict[str, str] = field(default_factory=dict)
+    auth: object = None  # strategy-specific merchant auth, built once
+    error: str | None = None
+
+
+class ProcessorRegistry:
+    """
+    Payment processors by their one-letter ``Transaction.processor`` code.
+
+    Strategies register themselves when their module is imported; credentials
+    are read and validated once by ``load`` (called from ``PortalConfig.ready``)
+    and the strategy's merchant-auth object is cached on the entry.
+    """
+
+    def __init__(self):
+        self.__processors: dict[str, Processor] = {}
+
+    def register(self, code: str, keys: dict[str, str]):
+        def decorator(strategy):
+            self.__processors[code] = Processor(code, strategy, keys)
+            return strategy
+
+        return decorator
+
+    def load(self):
+        for processor in self.__processors.values():
+            missing = [var for var in processor.keys.values() if not os.getenv(var)]
+            if missing:
+                processor.error = f"missing {', '.join(missing)}"
+                processor.credentials, processor.auth = {}, None
+                continue
+            processor.credentials = {
+                name: os.environ[var] for name, var in processor.keys.items()
+            }
+            processor.auth = processor.strategy.authenticate(processor.credentials)
+            processor.error = None
+
+    def get(self, code: str) -> Processor:
+        processor = self.__processors.get(code)
+        if processor is None:
+            raise ProcessorUnavailable(f"Unknown processor {code!r}")
+        if processor.error:
+            raise ProcessorUnavailable(
+                f"Processor {code!r} is not configured: {processor.error}"
+            )
+        return processor
+
+    def __iter__(self):
+        return iter(self.__processors.values())
+
+
+registry = ProcessorRegistry()
+
+
+def checkCredentials(app_configs, **kwargs):
+    return [
+        checks.Warning(
+            f"Processor {processor.code!r} is not configured: {processor.error}",
+            hint="Set the variables in the environment or in .env.",
+            id="portal.W001",
+        )
+        for processor in registry
+        if processor.error
+    ]
@@ -0,0 +1,265 @@
+"""
+Opt-in request profiling for slow payments (``PROFILING`` in settings).
+
+Requests under ``PATHS`` are profiled in one of two ways. A ``RATE``
+fraction run under cProfile. Every other one is watched by a stack sampler
+that walks the request thread's stack each ``INTERVAL`` seconds, and that
+trace is kept only if the request took longer than ``THRESHOLD``. Either
+way the sample records the SQL statements the request ran, with timings,
+and the ``refID`` of each payment it made. Samples go to ``DIR`` as JSON,
+keeping the newest ``KEEP``. ``manage.py profilesummary`` aggregates them.
+"""
+
+import cProfile
+import contextvars
+import json
+import logging
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+CPROFILE = "cprofile"
+STACK = "stack"
+
+_sample: contextvars.ContextVar[dict | None] = contextvars.ContextVar(
+    "profilingSample", default=None
+)
+
+
+def tag(**fields):
+    """Attaches ``fields`` to the current request's sample, if it has one."""
+    sample = _sample.get()
+    if sample is not None:
+        for name, value in fields.items():
+            sample.setdefault(name + "s", []).append(value)
+
+
+class StackSampler:
+    """Samples the stacks of watched threads from one background thread."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.__watched: dict[int, Counter] = {}
+        self.__lock = threading.Lock()
+        self.__wake = threading.Event()
+        self.__thread = None
+
+    def watch(self, ident: int) -> Counter:
+        stacks = Counter()
+        with self.__lock:
+            self.__watched[ident] = stacks
+            if self.__thread is None:
+                self.__thread = threading.Thread(
+                    target=self.__run, name="profiling-sampler", daemon=True
+                )
+                self.__thread.start()
+        self.__wake.set()
+        return stacks
+
+    def unwatch(self, ident: int):
+        with self.__lock:
+            self.__watched.pop(ident, None)
+
+    def __run(self):
+        while True:
+            self.__wake.wait()
+            time.sleep(self.interval)
+            with self.__lock:
+                watched = dict(self.__watched)
+                if not watched:
+                    self.__wake.clear()
+                    continue
+            frames = sys._current_frames()
+            for ident, stacks in watched.items():
+                frame = frames.get(ident)
+                stack = []  # code objects, innermost first; labelled when kept
+                while frame is not None:
+                    stack.append(frame.f_code)
+                    frame = frame.f_back
+                if stack:
+                    stacks[tuple(stack)] += 1
+
+
+_samplers: dict[float, StackSampler] = {}
+_writer: ThreadPoolExecutor | None = None
+_lock = threading.Lock()
+
+
+def sampler(interval: float) -> StackSampler:
+    """Process-wide sampler, however many times the middleware is built."""
+    with _lock:
+        if interval not in _samplers:
+            _samplers[interval] = StackSampler(interval)
+        return _samplers[interval]
+
+
+def writer() -> ThreadPoolExecutor:
+    global _writer
+    with _lock:
+        if _writer is None:
+            _writer = ThreadPoolExecutor(1, thread_name_prefix="profiling-writer")
+        return _writer
+
+
+class ProfilingMiddleware:
+    """
+    Profiles a share of matching requests (see the module docstring). Not
+    loaded unless ``PROFILING["ENABLED"]``.
+    """
+
+    # Only one cProfile profiler can be active at a time on Python 3.12+
+    _cProfileLock = threading.Lock()
+
+    def __init__(self, get_response):
+        config = settings.PROFILING
+        if not config["ENABLED"]:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.paths = tuple(config["PATHS"])
+        self.rate = config["RATE"]
+        self.threshold = config["THRESHOLD"]
+        self.directory = Path(config["DIR"])
+        self.keep = config["KEEP"]
+        self.sampler = sampler(config["INTERVAL"])
+
+    def __call__(self, request):
+        if not request.path.startswith(self.paths):
+            return self.get_response(request)
+
+        profiler = None
+        if random.random() < self.rate and self._cProfileLock.acquire(blocking=False):
+            profiler = cProfile.Profile()
+        sample = {"path": request.path, "method": request.method, "sql": []}
+        token = _sample.set(sample)
+        ident = threading.get_ident()
+        stacks = None if profiler else self.sampler.watch(ident)
+        started = time.perf_counter()
+        try:
+            with self.__sql(sample["sql"]):
+                if profiler:
+                    profiler.enable()
+                try:
+                    response = self.get_response(request)
+                finally:
+                    if profiler:
+                        profiler.disable()
+                        self._cProfileLock.release()
+        finally:
+            elapsed = time.perf_counter() - started
+            _sample.reset(token)
+            if stacks is not None:
+                self.sampler.unwatch(ident)
+
+        if profiler or elapsed >= self.threshold:
+            sample.update(
+                started=datetime.now(timezone.utc).isoformat(),
+                status=response.status_code,
+                elapsed=elapsed,
+            )
+            if profiler:
+                sample["mode"] = CPROFILE
+                sample["functions"] = profileFunctions(profiler)
+            else:
+                sample["mode"] = STACK
+                sample["interval"] = self.sampler.interval
+                sample["functions"] = stackFunctions(stacks, self.sampler.interval)
+                sample["stacks"] = [
+                    [";".join(_label(code) for code in reversed(stack)), count]
+                    for stack, count in stacks.most_common()
+                ]
+            writer().submit(self.write, sample)
+        return response
+
+    def __sql(self, statements):
+        def record(execute, sql, params, many, context):
+            started = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                statements.append(
+                    {
+                        "sql": sql,
+                        "many": many,
+                        "seconds": time.perf_counter() - started,
+                        "database": context["connection"].alias,
+                    }
+                )
+
+        return _wrapAll(record)
+
+    def write(self, sample):
+        """Writes ``sample`` and drops the oldest files beyond ``keep``."""
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            refID = (sample.get("refIDs") or ["none"])[0]
+            stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+            name = f"{stamp}-{refID}-{sample['elapsed'] * 1000:.0f}ms.json"
+            partial = self.directory / (name + ".tmp")
+            partial.write_text(json.dumps(sample, default=str))
+            os.replace(partial, self.directory / name)
+            samples = sorted(self.directory.glob("*.json"))
+            for old in samples[: max(0, len(samples) - self.keep)]:
+                old.unlink(missing_ok=True)
+        except OSError:
+            logger.exception("Could not write profiling sample")
+
+
+@contextmanager
+def _wrapAll(wrapper):
+    """``execute_wrapper`` on every configured database connection."""
+    with ExitStack() as stack:
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(wrapper))
+        yield
+
+
+def profileFunctions(profiler: cProfile.Profile, limit: int = 500):
+    """``[function, self seconds, total seconds, calls]``, by total time."""
+    stats = pstats.Stats(profiler).stats
+    functions = [
+        [pstats.func_std_string(function), selfTime, totalTime, calls]
+        for function, (_, calls, selfTime, totalTime, _) in stats.items()
+    ]
+    functions.sort(key=lambda entry: entry[2], reverse=True)
+    return functions[:limit]
+
+
+def stackFunctions(stacks: Counter, interval: float, limit: int = 500):
+    """The same shape as ``profileFunctions``, estimated from stack samples."""
+    selfTime, totalTime = Counter(), Counter()
+    for stack, count in stacks.items():
+        selfTime[stack[0]] += count * interval
+        for code in set(stack):
+            totalTime[code] += count * interval
+    functions = [
+        [_label(code), selfTime[code], total, None] for code, total in totalTime.items()
+    ]
+    functions.sort(key=lambda entry: entry[2], reverse=True)
+    return functions[:limit]
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def _label(code) -> str:
+    """A code object named the way pstats names functions."""
+    return pstats.func_std_string((code.co_filename, code.co_firstlineno, code.co_name))
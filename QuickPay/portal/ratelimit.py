@@ -0,0 +1,262 @@
+import asyncio
+import functools
+import json
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    In-process token bucket: ``rate`` tokens per second, holding at most
+    ``burst``. Thread-safe.
+    """
+
+    def __init__(self, rate: float, burst: float | None = None):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(rate, 1.0)
+        self.__tokens = self.burst
+        self.__updated = time.monotonic()
+        self.__lock = threading.Lock()
+
+    def take(self, tokens: float = 1.0) -> float:
+        """
+        Takes ``tokens`` if available and returns 0, otherwise returns the
+        seconds to wait before they will be.
+        """
+        with self.__lock:
+            now = time.monotonic()
+            self.__tokens = min(
+                self.burst, self.__tokens + (now - self.__updated) * self.rate
+            )
+            self.__updated = now
+            if self.__tokens >= tokens:
+                self.__tokens -= tokens
+                return 0.0
+            return (tokens - self.__tokens) / self.rate
+
+    def acquire(self, tokens: float = 1.0):
+        """Blocks until ``tokens`` can be taken."""
+        while wait := self.take(tokens):
+            time.sleep(wait)
+
+
+class SharedTokenBuckets:
+    """
+    Token buckets in a SQLite file, so every worker process on the host
+    draws from the same buckets. Each ``take`` is one UPSERT, which SQLite
+    runs atomically. Times are wall-clock seconds, the only clock the
+    processes share. Buckets idle for longer than ``idle`` seconds are full
+    again and get pruned.
+    """
+
+    _TAKE = """
+        INSERT INTO buckets (key, tokens, updated, granted)
+        VALUES (:key, :burst - :cost, :now, 1)
+        ON CONFLICT (key) DO UPDATE SET
+            tokens = min(:burst, tokens + max(0, :now - updated) * :rate)
+                - iif(min(:burst, tokens + max(0, :now - updated) * :rate) >= :cost,
+                      :cost, 0),
+            granted = min(:burst, tokens + max(0, :now - updated) * :rate) >= :cost,
+            updated = max(updated, :now)
+        RETURNING tokens, granted
+    """
+    _GRANT = """
+        INSERT INTO buckets (key, tokens, updated, granted) VALUES (?, ?, ?, 1)
+        ON CONFLICT (key) DO UPDATE SET
+            tokens = excluded.tokens,
+            updated = max(updated, excluded.updated),
+            granted = 1
+    """
+    PRUNE_EVERY = 1000
+
+    def __init__(self, path, idle: float = 3600.0):
+        self.path = str(path)
+        self.idle = idle
+        self.__local = threading.local()
+
+    def __connection(self) -> sqlite3.Connection:
+        local = self.__local
+        if getattr(local, "pid", None) != os.getpid():
+            connection = sqlite3.connect(self.path, isolation_level=None, timeout=1.0)
+            connection.executescript("""
+                PRAGMA journal_mode=WAL;
+                PRAGMA synchronous=OFF;
+                CREATE TABLE IF NOT EXISTS buckets (
+                    key TEXT PRIMARY KEY,
+                    tokens REAL NOT NULL,
+                    updated REAL NOT NULL,
+                    granted INTEGER NOT NULL
+                ) WITHOUT ROWID;
+                """)
+            local.connection, local.pid, local.takes = connection, os.getpid(), 0
+        return local.connection
+
+    def take(self, key: str, rate: float, burst: float, tokens: float = 1.0) -> float:
+        """Like ``TokenBucket.take``, for the bucket named ``key``."""
+        connection = self.__connection()
+        now = time.time()
+        left, granted = connection.execute(
+            self._TAKE,
+            {"key": key, "rate": rate, "burst": burst, "cost": tokens, "now": now},
+        ).fetchone()
+        self.__taken(connection, now)
+        return 0.0 if granted else (tokens - left) / rate
+
+    def takeAll(self, buckets, tokens: float = 1.0) -> list[float]:
+        """
+        Takes ``tokens`` from every ``(key, rate, burst)`` bucket, or from
+        none of them if any is short, in one transaction. Returns each
+        bucket's wait as ``take`` would; all zeros means they were taken.
+        """
+        connection = self.__connection()
+        now = time.time()
+        connection.execute("BEGIN IMMEDIATE")  # one writer: no lost updates
+        try:
+            levels = []
+            for key, rate, burst in buckets:
+                row = connection.execute(
+                    "SELECT tokens, updated FROM buckets WHERE key = ?", (key,)
+                ).fetchone()
+                levels.append(
+                    burst
+                    if row is None
+                    else min(burst, row[0] + max(0, now - row[1]) * rate)
+                )
+            waits = [
+                max(0.0, (tokens - level) / rate)
+                for level, (_, rate, _) in zip(levels, buckets)
+            ]
+            if not any(waits):
+                connection.executemany(
+                    self._GRANT,
+                    [
+                        (key, level - tokens, now)
+                        for level, (key, _, _) in zip(levels, buckets)
+                    ],
+                )
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        self.__taken(connection, now)
+        return waits
+
+    def __taken(self, connection, now: float):
+        self.__local.takes += 1
+        if self.__local.takes % self.PRUNE_EVERY == 0:
+            connection.execute(
+                "DELETE FROM buckets WHERE updated < ?", (now - self.idle,)
+            )
+
+    def clear(self):
+        self.__connection().execute("DELETE FROM buckets")
+
+
+_stores: dict[str, SharedTokenBuckets] = {}
+_lock = threading.Lock()
+
+
+def store() -> SharedTokenBuckets:
+    """Process-wide store for ``RATE_LIMITS["DB"]``."""
+    config = settings.RATE_LIMITS
+    path = str(config["DB"])
+    with _lock:
+        if path not in _stores:
+            idle = max(
+                limit["BURST"] / limit["RATE"] for limit in config["LIMITS"].values()
+            )
+            _stores[path] = SharedTokenBuckets(path, idle)
+        return _stores[path]
+
+
+def clientAddress(request) -> str:
+    """
+    The client's IP: ``REMOTE_ADDR``, or the address ``FORWARDED_HOPS``
+    trusted proxies in front of us saw, from ``X-Forwarded-For``.
+    """
+    hops = settings.RATE_LIMITS["FORWARDED_HOPS"]
+    if hops:
+        forwarded = request.headers.get("X-Forwarded-For", "").split(",")
+        if len(forwarded) >= hops:
+            return forwarded[-hops].strip()
+    return request.META.get("REMOTE_ADDR", "")
+
+
+def _salesperson(request) -> str | None:
+    try:
+        salesperson = json.loads(request.body).get("salesperson")
+    except (ValueError, AttributeError):
+        return None
+    return salesperson if isinstance(salesperson, str) else None
+
+
+def check(request):
+    """
+    Takes a token from the client's bucket and the salesperson's, or from
+    neither if either is empty. Returns None, or a 429 ``JsonResponse`` with
+    ``Retry-After``. If the store is unavailable, requests are let through.
+    """
+    config = settings.RATE_LIMITS
+    if not config["ENABLED"] or request.method != "POST":
+        return None
+    keys = {"client": clientAddress(request)}
+    if "salesperson" in config["LIMITS"]:
+        keys["salesperson"] = _salesperson(request)
+    scopes, buckets = [], []
+    for scope, key in keys.items():
+        limit = config["LIMITS"].get(scope)
+        if limit is not None and key is not None:
+            scopes.append(scope)
+            buckets.append((f"{scope}:{key}", limit["RATE"], limit["BURST"]))
+    if not buckets:
+        return None
+    try:
+        waits = store().takeAll(buckets)
+    except sqlite3.Error:
+        logger.exception("Rate limit store unavailable; not limiting")
+        return None
+    if not any(waits):
+        return None
+    scope, wait = next((scope, wait) for scope, wait in zip(scopes, waits) if wait)
+    metrics.THROTTLED.inc(scope=scope)
+    response = JsonResponse(
+        {"error": "RATE_LIMITED", "errorText": "Too many requests"}, status=429
+    )
+    response["Retry-After"] = str(math.ceil(max(waits)))
+    # Nothing was charged: an Idempotency-Key retry must not replay this
+    response.submitted = False
+    return response
+
+
+def ratelimited(view):
+    """
+    Throttles POSTs to ``view`` per client and salesperson (``RATE_LIMITS``).
+    Goes inside ``idempotent``, so replays of stored responses are free.
+    """
+    if asyncio.iscoroutinefunction(view):
+
+        @functools.wraps(view)
+        async def asyncWrapper(request, *args, **kwargs):
+            # SQLite may wait on another worker's lock; keep it off the loop
+            throttled = await sync_to_async(check, thread_sensitive=False)(request)
+            return throttled or await view(request, *args, **kwargs)
+
+        return asyncWrapper
+
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        return check(request) or view(request, *args, **kwargs)
+
+    return wrapper
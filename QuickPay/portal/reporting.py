@@ -0,0 +1,139 @@
+import base64
+from datetime import datetime
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import AccountType, Result, Transaction
+
+LIST_FIELDS = (
+    "id",
+    "created_at",
+    "processor",
+    "result",
+    "salesperson",
+    "amount",
+    "invoiceID",
+    "refID",
+    "transId",
+    "responseCode",
+    "accountNumber",
+    "accountType",
+    "error",
+    "errorText",
+)
+FILTERS = ("salesperson", "result", "transId", "invoiceID")
+
+# Typed columns as the API spells them
+RESULT_LABELS = dict(Result.choices)
+ACCOUNT_TYPE_LABELS = dict(AccountType.choices)
+DISPLAY = {
+    "result": RESULT_LABELS.__getitem__,
+    "responseCode": lambda value: None if value is None else str(value),
+    "accountType": ACCOUNT_TYPE_LABELS.get,
+    "invoiceID": lambda value: value.hex[:20],
+}
+
+
+class InvalidQuery(ValueError):
+    pass
+
+
+def _bound(value: str, end: bool) -> datetime:
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise InvalidQuery(f"Invalid date {value!r}")
+        moment = datetime.combine(
+            day, datetime.max.time() if end else datetime.min.time()
+        )
+    return timezone.make_aware(moment) if timezone.is_naive(moment) else moment
+
+
+def parseFilters(params):
+    """
+    The reporting filters in ``params`` (a QueryDict or dict) as ``(lookups,
+    since, until)``: exact-match field values and the inclusive bounds on
+    ``created_at``, either of which may be None.
+    """
+    lookups = {name: params[name] for name in FILTERS if params.get(name)}
+    if "result" in lookups:
+        lookups["result"] = Result.fromLabel(lookups["result"])
+        if lookups["result"] is None:
+            raise InvalidQuery(f"Invalid result {params['result']!r}")
+    if "invoiceID" in lookups:
+        try:
+            lookups["invoiceID"] = Transaction.parseInvoice(lookups["invoiceID"])
+        except ValueError:
+            raise InvalidQuery(f"Invalid invoice number {params['invoiceID']!r}")
+    since = _bound(params["since"], end=False) if params.get("since") else None
+    until = _bound(params["until"], end=True) if params.get("until") else None
+    return lookups, since, until
+
+
+def filterTransactions(params):
+    """
+    Applies the reporting filters in ``params`` (see ``parseFilters``):
+    exact ``salesperson``/``result``/``transId``/``invoiceID`` matches and an
+    inclusive ``since``/``until`` range on ``created_at``. Every combination
+    is served by one of the ``Transaction`` indexes.
+
+    Reads from ``REPORTING_DATABASE`` (the replica, when one is configured).
+    Archived rows are not included; see ``archive``.
+    """
+    lookups, since, until = parseFilters(params)
+    queryset = Transaction.objects.using(settings.REPORTING_DATABASE).filter(**lookups)
+    if since:
+        queryset = queryset.filter(created_at__gte=since)
+    if until:
+        queryset = queryset.filter(created_at__lte=until)
+    return queryset
+
+
+def encodeCursor(row: Transaction) -> str:
+    raw = f"{row.created_at.isoformat()}|{row.pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decodeCursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        createdAt, pk = raw.split("|")
+        moment = parse_datetime(createdAt)
+        if moment is None:
+            raise ValueError
+        return moment, int(pk)
+    except ValueError:
+        raise InvalidQuery("Invalid cursor")
+
+
+def page(queryset, cursor: str | None, limit: int):
+    """
+    One page of ``queryset`` newest first, keyed on ``(created_at, id)``.
+
+    Each page seeks straight to the cursor through the index instead of
+    counting past an OFFSET, so deep pages cost the same as the first.
+    Returns the rows and the cursor for the next page (None on the last).
+    """
+    queryset = queryset.only(*LIST_FIELDS).order_by("-created_at", "-id")
+    if cursor:
+        createdAt, pk = decodeCursor(cursor)
+        # (created_at, id) < cursor, with a leading range the index can seek
+        queryset = queryset.filter(created_at__lte=createdAt).filter(
+            Q(created_at__lt=createdAt) | Q(id__lt=pk)
+        )
+    rows = list(queryset[: limit + 1])
+    nextCursor = encodeCursor(rows[limit - 1]) if len(rows) > limit else None
+    return rows[:limit], nextCursor
+
+
+def serialize(row: Transaction) -> dict:
+    result = {name: getattr(row, name) for name in LIST_FIELDS}
+    for name, display in DISPLAY.items():
+        result[name] = display(result[name])
+    result["amount"] = str(row.amount)
+    result["created_at"] = row.created_at.isoformat()
+    return result
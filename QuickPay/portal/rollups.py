@@ -0,0 +1,98 @@
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, DecimalField, Q, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from . import archive
+from .models import Result, SalesRollup, Transaction
+
+TOTALS = ("approved", "approvedAmount", "failed")
+
+
+def _zero():
+    return {"approved": 0, "approvedAmount": Decimal("0.00"), "failed": 0}
+
+
+def rebuild(since: date | None = None) -> dict[str, int]:
+    """
+    Recomputes the rollup from ``Transaction`` for every day from ``since``
+    (all of history by default) and reports how many rows had drifted.
+    Days with archived payments are left as they are.
+    """
+    settled = Transaction.objects.filter(result__in=(Result.SUCCESS, Result.FAILED))
+    existing = SalesRollup.objects.all()
+    archived = archive.horizon()
+    if archived:
+        since = max(since or date.min, timezone.localdate(archived) + timedelta(days=1))
+    if since:
+        start = timezone.make_aware(datetime.combine(since, time.min))
+        settled = settled.filter(created_at__gte=start)
+        existing = existing.filter(day__gte=since)
+    approved = Q(result=Result.SUCCESS)
+    with transaction.atomic():
+        # Lock the rollup rows first: payments committing meanwhile wait, so
+        # the totals below match what is written
+        current = {
+            (row["salesperson"], row["day"]): {name: row[name] for name in TOTALS}
+            for row in existing.select_for_update().values(
+                "salesperson", "day", *TOTALS
+            )
+        }
+        expected = {
+            (row["salesperson"], row["day"]): {name: row[name] for name in TOTALS}
+            for row in settled.annotate(day=TruncDate("created_at"))
+            .values("salesperson", "day")
+            .annotate(
+                approved=Count("id", filter=approved),
+                approvedAmount=Coalesce(
+                    Sum("amount", filter=approved),
+                    Value(Decimal("0.00")),
+                    output_field=DecimalField(max_digits=16, decimal_places=2),
+                ),
+                failed=Count("id", filter=Q(result=Result.FAILED)),
+            )
+            .order_by()
+        }
+        drifted = sum(
+            current.get(key) != expected.get(key) for key in current.keys() | expected
+        )
+        existing.delete()
+        SalesRollup.objects.bulk_create(
+            (
+                SalesRollup(salesperson=salesperson, day=day, **totals)
+                for (salesperson, day), totals in expected.items()
+            ),
+            batch_size=1000,
+        )
+    return {"rows": len(expected), "drifted": drifted}
+
+
+def totals(day: date, salesperson: str | None = None) -> dict:
+    """
+    Day and month-to-date totals per salesperson. Reads at most one rollup
+    row per salesperson per day of the month, whatever the payment volume.
+    """
+    rows = SalesRollup.objects.using(settings.REPORTING_DATABASE).filter(
+        day__gte=day.replace(day=1), day__lte=day
+    )
+    if salesperson:
+        rows = rows.filter(salesperson=salesperson)
+    people = {}
+    for row in rows.values("salesperson", "day", *TOTALS):
+        entry = people.setdefault(
+            row["salesperson"], {"day": _zero(), "month": _zero()}
+        )
+        for period in ("month", "day") if row["day"] == day else ("month",):
+            for name in TOTALS:
+                entry[period][name] += row[name]
+    return {
+        "day": day.isoformat(),
+        "month": day.strftime("%Y-%m"),
+        "salespeople": [
+            {"salesperson": name, **periods} for name, periods in sorted(people.items())
+        ],
+    }
@@ -0,0 +1,32 @@
+from django.conf import settings
+
+PRIMARY = "default"
+
+
+class PrimaryReplicaRouter:
+    """
+    Sends every write, and every read that doesn't ask otherwise, to the
+    primary so a payment always reads back its own rows.
+
+    Reporting queries opt in to the replica explicitly with
+    ``.using(settings.REPORTING_DATABASE)`` (see ``reporting.filterTransactions``).
+    A queryset keeps its alias however late it is evaluated, which a
+    request-scoped switch would not survive for streamed exports.
+    """
+
+    def db_for_read(self, model, **hints):
+        return PRIMARY
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as the primary
+        return {obj1._state.db, obj2._state.db} <= {
+            PRIMARY,
+            settings.REPORTING_DATABASE,
+        }
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema through replication
+        return db == PRIMARY
@@ -0,0 +1,154 @@
+"""Fixtures shared by the portal tests and the bench commands."""
+
+import os
+import random
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+
+from authorizenet import apicontractsv1 as authApi
+from django.utils import timezone
+from lxml import objectify
+
+from QuickPay.portal import codec
+from QuickPay.portal.models import (
+    AccountType,
+    AuthNetController,
+    AuthNetStrategy,
+    ResponseCode,
+    Result,
+    Transaction,
+)
+from QuickPay.portal.processors import registry
+
+CARD = {"number": "4111111111111111", "expiration": "2030-12", "cvv": "123"}
+
+
+def stubCredentials():
+    """Gives unconfigured processors placeholder credentials for stub runs."""
+    for processor in registry:
+        for var in processor.keys.values():
+            os.environ.setdefault(var, "bench")
+    registry.load()
+
+
+def seedTransactions(count: int, days: int = 365, batchSize: int = 5000, seed=1):
+    """
+    Bulk-inserts ``count`` settled-looking transactions spread over the last
+    ``days`` days across 50 salespeople.
+    """
+    rng = random.Random(seed)
+    salespeople = [f"sales{i:02d}" for i in range(50)]
+    start = timezone.now() - timedelta(days=days)
+    step = timedelta(days=days) / max(count, 1)
+    createdAt = Transaction._meta.get_field("created_at")
+    createdAt.auto_now_add = False  # keep the spread-out timestamps
+    try:
+        for offset in range(0, count, batchSize):
+            rows = []
+            for i in range(offset, min(offset + batchSize, count)):
+                approved = rng.random() < 0.9
+                rows.append(
+                    Transaction(
+                        processor="A",
+                        created_at=start + step * i,
+                        result=Result.SUCCESS if approved else Result.FAILED,
+                        invoiceID=uuid.UUID(int=rng.getrandbits(80) << 48),
+                        refID=f"{rng.getrandbits(80):020x}",
+                        transId=str(60000000000 + i),
+                        amount=Decimal(rng.randrange(100, 100000)) / 100,
+                        salesperson=rng.choice(salespeople),
+                        submitted=True,
+                        resultStatus="Ok" if approved else "Error",
+                        responseCode=(
+                            ResponseCode.APPROVED if approved else ResponseCode.DECLINED
+                        ),
+                        accountNumber=f"XXXX{rng.randrange(10000):04d}",
+                        accountType=AccountType.VISA,
+                        error=None if approved else "2",
+                        errorText=(
+                            None if approved else "This transaction has been declined."
+                        ),
+                    )
+                )
+            Transaction.objects.bulk_create(rows)
+    finally:
+        createdAt.auto_now_add = True
+
+
+DECLINED = (
+    b"\xef\xbb\xbf"
+    b'<?xml version="1.0" encoding="utf-8"?>'
+    b'<createTransactionResponse xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" '
+    b'xmlns:xsd="http://www.w3.org/2001/XMLSchema" '
+    b'xmlns="AnetApi/xml/v1/schema/AnetApiSchema.xsd">'
+    b"<refId>1700000000</refId>"
+    b"<messages><resultCode>Error</resultCode>"
+    b"<message><code>E00027</code><text>The transaction was unsuccessful.</text>"
+    b"</message></messages>"
+    b"<transactionResponse><responseCode>2</responseCode><authCode />"
+    b"<avsResultCode>P</avsResultCode><cvvResultCode /><cavvResultCode />"
+    b"<transId>0</transId><refTransID /><transHash /><testRequest>0</testRequest>"
+    b"<accountNumber>XXXX0027</accountNumber><accountType>Visa</accountType>"
+    b"<errors><error><errorCode>2</errorCode>"
+    b"<errorText>This transaction has been declined.</errorText></error></errors>"
+    b"<transHashSha2 /></transactionResponse></createTransactionResponse>"
+)
+
+
+def sdkRequest(fields):
+    merchant = authApi.merchantAuthenticationType()
+    merchant.name = fields["name"]
+    merchant.transactionKey = fields["transactionKey"]
+    card = authApi.creditCardType()
+    card.cardNumber = fields["cardNumber"]
+    card.expirationDate = fields["expirationDate"]
+    card.cardCode = fields["cardCode"]
+    payment = authApi.paymentType()
+    payment.creditCard = card
+    order = authApi.orderType()
+    order.invoiceNumber = fields["invoiceNumber"]
+    order.description = fields["description"]
+    txType = authApi.transactionRequestType()
+    txType.transactionType = "authCaptureTransaction"
+    txType.amount = fields["amount"]
+    txType.currencyCode = "USD"
+    txType.payment = payment
+    txType.order = order
+    request = authApi.createTransactionRequest()
+    request.refId = fields["refId"]
+    request.merchantAuthentication = merchant
+    request.transactionRequest = txType
+    controller = AuthNetController(request, "")
+    controller.setClientId()
+    return controller.buildrequest()
+
+
+def sdkResponse(body):
+    controller = AuthNetController(authApi.createTransactionRequest(), "")
+    document = authApi.CreateFromDocument(body.decode("ISO-8859-1")[3:])
+    xml = document.toxml(encoding="utf-8", element_name=controller.getrequesttype())
+    return codec.fromObjectify(
+        objectify.fromstring(xml.replace(b"ns1:", b"").replace(b":ns1", b""))
+    )
+
+
+def codecFields(rng) -> dict:
+    """Random ``encodeTransactionRequest`` arguments, awkward ones included."""
+    return {
+        "refId": str(rng.randrange(10**9, 10**10)),
+        "name": rng.choice(["5KP3u95bQpv", "a&b<c>\"d'e", None]),
+        "transactionKey": rng.choice(["346HZ32z3fP4hTG2", None]),
+        "amount": (
+            rng.choice(["10.00", "0.5", "1999", "00012.3400", "1E2", "-1.50", "0.0"])
+            if rng.random() < 0.5
+            else f"{rng.randrange(1, 10**6) / 100:.2f}"
+        ),
+        "cardNumber": rng.choice(
+            ["4111111111111111", "5424000000000015", "370000000000002"]
+        ),
+        "expirationDate": rng.choice(["2030-12", "12/30", "1230"]),
+        "cardCode": rng.choice(["123", "9999"]),
+        "invoiceNumber": rng.choice(["c3d6a5bc-e80e-46", "INV&<1>"]),
+        "description": AuthNetStrategy.DESCRIPTION,
+    }
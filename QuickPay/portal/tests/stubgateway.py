@@ -0,0 +1,360 @@
+import random
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BOM = b"\xef\xbb\xbf"
+
+_ROOT = (
+    '<?xml version="1.0" encoding="utf-8"?>'
+    '<{root} xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" '
+    'xmlns:xsd="http://www.w3.org/2001/XMLSchema" '
+    'xmlns="AnetApi/xml/v1/schema/AnetApiSchema.xsd">'
+)
+
+APPROVED = (
+    _ROOT.format(root="createTransactionResponse") + "<refId>{refId}</refId>"
+    "<messages><resultCode>Ok</resultCode>"
+    "<message><code>I00001</code><text>Successful.</text></message></messages>"
+    "<transactionResponse>"
+    "<responseCode>1</responseCode><authCode>{authCode}</authCode>"
+    "<avsResultCode>Y</avsResultCode><cvvResultCode>P</cvvResultCode>"
+    "<cavvResultCode>2</cavvResultCode><transId>{transId}</transId>"
+    "<refTransID /><transHash /><testRequest>0</testRequest>"
+    "<accountNumber>XXXX{last4}</accountNumber><accountType>Visa</accountType>"
+    "<messages><message><code>1</code>"
+    "<description>This transaction has been approved.</description>"
+    "</message></messages>"
+    "<transHashSha2 /><networkTransId>{networkTransId}</networkTransId>"
+    "</transactionResponse></createTransactionResponse>"
+)
+
+# Processed but not approved: transactionResponse carries the errors.
+UNSUCCESSFUL = (
+    _ROOT.format(root="createTransactionResponse") + "<refId>{refId}</refId>"
+    "<messages><resultCode>Error</resultCode>"
+    "<message><code>E00027</code><text>The transaction was unsuccessful.</text>"
+    "</message></messages>"
+    "<transactionResponse>"
+    "<responseCode>{responseCode}</responseCode><authCode />"
+    "<avsResultCode>{avsResultCode}</avsResultCode><cvvResultCode />"
+    "<cavvResultCode /><transId>{transId}</transId>"
+    "<refTransID /><transHash /><testRequest>0</testRequest>"
+    "<accountNumber>XXXX{last4}</accountNumber><accountType>Visa</accountType>"
+    "<errors><error><errorCode>{errorCode}</errorCode>"
+    "<errorText>{errorText}</errorText></error></errors>"
+    "<transHashSha2 />"
+    "</transactionResponse></createTransactionResponse>"
+)
+
+UNSUCCESSFUL_FIELDS = {
+    "declined": {
+        "responseCode": "2",
+        "avsResultCode": "N",
+        "errorCode": "2",
+        "errorText": "This transaction has been declined.",
+    },
+    "invalid": {
+        "responseCode": "3",
+        "avsResultCode": "P",
+        "errorCode": "6",
+        "errorText": "The credit card number is invalid.",
+    },
+}
+
+# Rejected before processing (bad credentials, malformed request): no
+# transactionResponse, only the top-level message.
+REJECTED = (
+    _ROOT.format(root="ErrorResponse") + "<messages><resultCode>Error</resultCode>"
+    "<message><code>E00007</code>"
+    "<text>User authentication failed due to invalid authentication values.</text>"
+    "</message></messages></ErrorResponse>"
+)
+
+# Outcomes the stub can serve, by name. ``http500`` answers with a server
+# error and ``drop`` closes the connection without answering; both surface
+# as NO_RESPONSE, though the card was charged (see ``StubGateway.ledger``).
+SHAPES = ("approved", "declined", "invalid", "rejected", "http500", "drop")
+
+# Status each outcome leaves in the ledger; rejected requests leave nothing
+LEDGER_STATUSES = {
+    "approved": "settledSuccessfully",
+    "declined": "declined",
+    "invalid": "generalError",
+    "http500": "settledSuccessfully",
+    "drop": "settledSuccessfully",
+}
+
+REPORT = (
+    _ROOT.format(root="{root}") + "<messages><resultCode>Ok</resultCode>"
+    "<message><code>I00001</code><text>Successful.</text></message></messages>"
+    "{body}</{root}>"
+)
+
+BATCH = (
+    "<batch><batchId>{batchId}</batchId>"
+    "<settlementTimeUTC>{settlementTime}</settlementTimeUTC>"
+    "<settlementState>settledSuccessfully</settlementState>"
+    "<paymentMethod>creditCard</paymentMethod></batch>"
+)
+
+LISTED_TRANSACTION = (
+    "<transaction><transId>{transId}</transId>"
+    "<submitTimeUTC>{submitTime}</submitTimeUTC>"
+    "<transactionStatus>{status}</transactionStatus>"
+    "<invoiceNumber>{invoiceNumber}</invoiceNumber>"
+    "<accountType>Visa</accountType><accountNumber>{accountNumber}</accountNumber>"
+    "<settleAmount>{amount}</settleAmount></transaction>"
+)
+
+
+def parseMix(text: str) -> dict[str, float]:
+    """Parses ``"declined=0.1,http500=0.01"`` into an outcome mix."""
+    mix = {}
+    for item in filter(None, (part.strip() for part in text.split(","))):
+        shape, _, rate = item.partition("=")
+        if shape not in SHAPES:
+            raise ValueError(f"Unknown outcome {shape!r}; expected one of {SHAPES}")
+        mix[shape] = float(rate)
+    return mix
+
+
+class StubGateway:
+    """
+    Local stand-in for the Authorize.net XML API.
+
+    Serves canned ``createTransactionResponse`` documents from a background
+    thread so the payment path can be exercised without the sandbox.
+
+    ``mix`` maps outcome names from ``SHAPES`` to the fraction of requests
+    that get them; whatever is left over is approved. ``jitter`` adds up to
+    that many seconds of uniform random delay on top of ``latency``.
+
+    Every processed charge goes into ``ledger`` (``record`` adds more), and
+    ``settle`` closes the ledger into batches that ``getSettledBatchList``
+    and ``getTransactionList`` report.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        mix: dict[str, float] | None = None,
+        seed=None,
+    ):
+        mix = {shape: rate for shape, rate in (mix or {}).items() if rate}
+        unknown = set(mix) - set(SHAPES)
+        if unknown:
+            raise ValueError(f"Unknown outcome(s): {', '.join(sorted(unknown))}")
+        if sum(mix.values()) > 1:
+            raise ValueError("Outcome rates add up to more than 1")
+        self.latency = latency
+        self.jitter = jitter
+        self.mix = mix
+        self.requests = 0
+        self.__transIds = 0
+        self.served = dict.fromkeys(SHAPES, 0)
+        self.ledger: list[dict] = []
+        self.batches: dict[str, dict] = {}
+        self.__random = random.Random(seed)
+        self.__lock = threading.Lock()
+        self.__server = ThreadingHTTPServer((host, port), self.__handler())
+        self.__server.daemon_threads = True
+        self.__thread = None
+
+    @property
+    def url(self):
+        host, port = self.__server.server_address[:2]
+        return f"http://{host}:{port}/xml/v1/request.api"
+
+    def outcome(self) -> tuple[str, float]:
+        """Picks the next outcome and its delay, and counts it as served."""
+        with self.__lock:
+            self.requests += 1
+            roll = self.__random.random()
+            delay = self.latency + self.jitter * self.__random.random()
+            shape = "approved"
+            for name, rate in self.mix.items():
+                if roll < rate:
+                    shape = name
+                    break
+                roll -= rate
+            self.served[shape] += 1
+        return shape, delay
+
+    def charge(self, body: bytes, shape: str = "approved") -> dict:
+        """Assigns the request a transId and enters it in the ledger."""
+        fields = {
+            name.decode(): value.decode()
+            for name, value in re.findall(
+                rb"<(refId|cardNumber|invoiceNumber|amount)>([^<]*)<", body
+            )
+        }
+        with self.__lock:
+            self.__transIds += 1
+            fields["transId"] = str(40000000000 + self.__transIds)
+        if shape in LEDGER_STATUSES:
+            self.record(
+                fields["transId"],
+                fields.get("invoiceNumber", ""),
+                fields.get("amount", "0.00"),
+                LEDGER_STATUSES[shape],
+                accountNumber="XXXX" + fields.get("cardNumber", "0000")[-4:],
+            )
+        return fields
+
+    def record(
+        self,
+        transId: str,
+        invoiceNumber: str,
+        amount,
+        status: str = "settledSuccessfully",
+        submitTime: datetime | None = None,
+        accountNumber: str = "XXXX1111",
+    ):
+        entry = {
+            "transId": transId,
+            "invoiceNumber": invoiceNumber,
+            "amount": amount,
+            "status": status,
+            "submitTime": (submitTime or datetime.now(timezone.utc))
+            .astimezone(timezone.utc)
+            .strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
+            "accountNumber": accountNumber,
+        }
+        with self.__lock:
+            self.ledger.append(entry)
+
+    def settle(self, batchSize: int | None = None, at: datetime | None = None):
+        """Moves the ledger into settled batches; returns their ids."""
+        settlementTime = (at or datetime.now(timezone.utc)).strftime(
+            "%Y-%m-%dT%H:%M:%SZ"
+        )
+        with self.__lock:
+            entries, self.ledger = self.ledger, []
+            size = batchSize or len(entries) or 1
+            ids = []
+            for start in range(0, len(entries), size):
+                batchId = str(10000000 + len(self.batches))
+                self.batches[batchId] = {
+                    "batchId": batchId,
+                    "settlementTime": settlementTime,
+                    "transactions": entries[start : start + size],
+                }
+                ids.append(batchId)
+        return ids
+
+    def report(self, body: bytes) -> bytes | None:
+        """Answers the reporting calls; None for anything else."""
+        head = body[:200]
+        if b"getSettledBatchListRequest" in head:
+            first, last = re.findall(rb"<(?:first|last)SettlementDate>([^<]*)<", body)
+            first, last = first.decode().rstrip("Z"), last.decode().rstrip("Z")
+            items = "".join(
+                BATCH.format(**batch)
+                for batch in self.batches.values()
+                if first <= batch["settlementTime"].rstrip("Z") <= last
+            )
+            document = REPORT.format(
+                root="getSettledBatchListResponse",
+                body=f"<batchList>{items}</batchList>" if items else "",
+            )
+        elif b"getTransactionListRequest" in head:
+            fields = dict(re.findall(rb"<(batchId|limit|offset)>([^<]*)<", body))
+            batch = self.batches.get(fields[b"batchId"].decode())
+            entries = batch["transactions"] if batch else []
+            limit, page = int(fields[b"limit"]), int(fields[b"offset"])
+            items = "".join(
+                LISTED_TRANSACTION.format(**entry)
+                for entry in entries[(page - 1) * limit : page * limit]
+            )
+            document = REPORT.format(
+                root="getTransactionListResponse",
+                body=f"<transactions>{items}</transactions>"
+                f"<totalNumInResults>{len(entries)}</totalNumInResults>",
+            )
+        else:
+            return None
+        return BOM + document.encode()
+
+    def respond(self, body: bytes, shape: str = "approved") -> bytes:
+        fields = self.charge(body, shape)
+        transId = int(fields["transId"])
+        values = {
+            "refId": fields.get("refId", ""),
+            "transId": transId,
+            "last4": fields.get("cardNumber", "0000")[-4:],
+        }
+        if shape == "rejected":
+            document = REJECTED
+        elif shape in UNSUCCESSFUL_FIELDS:
+            document = UNSUCCESSFUL.format(**values, **UNSUCCESSFUL_FIELDS[shape])
+        else:
+            document = APPROVED.format(
+                **values,
+                authCode=f"{transId % 1000000:06d}",
+                networkTransId=f"STUB{transId}",
+            )
+        return BOM + document.encode()
+
+    def start(self):
+        self.__thread = threading.Thread(
+            target=self.__server.serve_forever, name="stub-gateway", daemon=True
+        )
+        self.__thread.start()
+        return self
+
+    def stop(self):
+        self.__server.shutdown()
+        self.__server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def __handler(self):
+        gateway = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                report = gateway.report(body)
+                if report is not None:
+                    if gateway.latency:
+                        time.sleep(gateway.latency)
+                    return self.reply(report)
+                shape, delay = gateway.outcome()
+                if delay:
+                    time.sleep(delay)
+                if shape == "drop":
+                    gateway.charge(body, shape)
+                    self.close_connection = True
+                    return
+                if shape == "http500":
+                    gateway.charge(body, shape)
+                    self.send_response(500)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                self.reply(gateway.respond(body, shape))
+
+            def reply(self, payload: bytes):
+                self.send_response(200)
+                self.send_header("Content-Type", "application/xml; charset=utf-8")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
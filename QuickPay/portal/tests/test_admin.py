@@ -0,0 +1,60 @@
+"""The Transaction admin's estimated counts (admin.py)."""
+
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+
+from QuickPay.portal import archive
+from QuickPay.portal.admin import EstimatedCountPaginator, TransactionAdmin
+from QuickPay.portal.models import Result, Transaction
+from QuickPay.portal.tests.helpers import seedTransactions
+
+URL = "/admin/portal/transaction/"
+
+
+class AdminCountTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        config = override_settings(ARCHIVE={**settings.ARCHIVE, "DIR": directory.name})
+        config.enable()
+        self.addCleanup(config.disable)
+        limit = mock.patch.object(EstimatedCountPaginator, "countLimit", 50)
+        limit.start()
+        self.addCleanup(limit.stop)
+
+        self.client.force_login(
+            User.objects.create_superuser("admin", "admin@example.com", "admin")
+        )
+        seedTransactions(400, days=120)
+        # Rows left behind by the archive keep the lowest ids in place
+        Transaction.objects.filter(id__in=range(1, 400, 40)).update(
+            result=Result.ERROR, error="NO_RESPONSE"
+        )
+
+    def changelist(self, page=None):
+        response = self.client.get(URL, {"p": page} if page else {})
+        self.assertEqual(response.status_code, 200)
+        return response.context["cl"]
+
+    def lastPage(self):
+        first = self.changelist()
+        last = self.changelist(first.paginator.num_pages)
+        self.assertTrue(last.result_list)
+        return first.result_count
+
+    def testIdSpanBeforeArchiving(self):
+        self.assertEqual(self.lastPage(), 400)
+
+    def testArchivedTablesAreCounted(self):
+        archived = sum(count for _, count in archive.archive(archive.cutoff(30)))
+        self.assertGreater(archived, 200)
+        count = self.lastPage()
+        self.assertEqual(count, min(Transaction.objects.count(), 50))
+        self.assertEqual(
+            self.changelist().paginator.num_pages,
+            -(-count // TransactionAdmin.list_per_page),
+        )
@@ -0,0 +1,113 @@
+"""Cold storage of old transactions (archive.py)."""
+
+import sys
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.test import TestCase, override_settings
+
+from QuickPay.portal import archive, export, reporting
+from QuickPay.portal.models import ArchivePartition, Result, Transaction
+from QuickPay.portal.tests.helpers import seedTransactions
+
+
+def listing(params=None, limit=70):
+    """Every row id in a full walk of the listing, newest first."""
+    ids, cursor = [], None
+    while True:
+        found, cursor = archive.page(params or {}, cursor, limit)
+        ids += [row.pk for row in found]
+        if cursor is None:
+            return ids
+
+
+def exported():
+    return b"".join(
+        export.export(
+            reporting.filterTransactions({}), archived=archive.exportValues({})
+        )
+    )
+
+
+class ArchiveTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        config = override_settings(ARCHIVE={**settings.ARCHIVE, "DIR": directory.name})
+        config.enable()
+        self.addCleanup(config.disable)
+
+        seedTransactions(1200, days=120)
+        self.unsettled = list(range(5, 1200, 40))
+        Transaction.objects.filter(id__in=self.unsettled).update(
+            result=Result.ERROR, error="NO_RESPONSE"
+        )
+        self.before = archive.cutoff(30)
+        self.listed, self.exported = listing(), exported()
+
+    def archive(self):
+        return sum(count for _, count in archive.archive(self.before, batchSize=100))
+
+    def testOnlyFinalRowsAreArchived(self):
+        old = Transaction.objects.filter(created_at__lt=self.before)
+        final = old.filter(result__in=archive.FINAL).count()
+        unsettled = set(old.filter(result=Result.ERROR).values_list("id", flat=True))
+        self.assertEqual(self.archive(), final)
+        self.assertEqual(set(old.values_list("id", flat=True)), unsettled)
+        self.assertEqual(listing(), self.listed)
+        self.assertEqual(exported(), self.exported)
+
+    def testLookups(self):
+        archived = Transaction.objects.filter(
+            created_at__lt=self.before, result=Result.SUCCESS
+        ).first()
+        self.archive()
+        self.assertEqual(archive.find(transId=archived.transId).pk, archived.pk)
+        self.assertEqual(archive.find(invoiceID=archived.invoiceID).pk, archived.pk)
+        self.assertIsNone(archive.find(transId="1"))
+        found, _ = archive.page({"transId": archived.transId}, None, 10)
+        self.assertEqual([row.pk for row in found], [archived.pk])
+
+    def testRowsSettledLateAreMergedIn(self):
+        self.archive()
+        late = Transaction.objects.filter(created_at__lt=self.before).first()
+        late.result, late.error = Result.SUCCESS, None
+        late.save()
+        self.listed, self.exported = listing(), exported()
+
+        self.assertEqual(self.archive(), 1)
+        self.assertFalse(Transaction.objects.filter(pk=late.pk).exists())
+        self.assertEqual(archive.find(transId=late.transId).pk, late.pk)
+        self.assertEqual(listing(), self.listed)
+        self.assertEqual(exported(), self.exported)
+        for partition in ArchivePartition.objects.all():
+            bounds = [(member["first"], member["last"]) for member in partition.members]
+            for (_, last), (first, _) in zip(bounds, bounds[1:]):
+                self.assertLess(last, first)
+            self.assertEqual(
+                partition.rows, sum(member["rows"] for member in partition.members)
+            )
+
+    def testFilteredListing(self):
+        self.archive()
+        since = archive.cutoff(60)
+        params = {"salesperson": "sales03", "since": since.date().isoformat()}
+        live = Transaction.objects.filter(salesperson="sales03", created_at__gte=since)
+        found = listing(params, limit=3)
+        self.assertTrue(set(live.values_list("id", flat=True)) < set(found))
+        self.assertEqual(found, [pk for pk in self.listed if pk in set(found)])
+
+    def testConcurrentRunsAreRefused(self):
+        with archive._lock():
+            with self.assertRaises(archive.ArchiveBusy):
+                self.archive()
+
+    def testLockFileWithoutFlock(self):
+        with mock.patch.dict(sys.modules, {"fcntl": None}):
+            with archive._lock():
+                with self.assertRaises(archive.ArchiveBusy):
+                    with archive._lock():
+                        pass
+            with archive._lock():
+                pass
@@ -0,0 +1,58 @@
+"""Content negotiation for static files and cached pages (assets.py)."""
+
+import tempfile
+from pathlib import Path
+
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from QuickPay.portal import assets
+
+
+class AcceptEncodingTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        directory = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(directory.cleanup)
+        root = Path(directory.name)
+        for name in ("app.js", "app.js.br", "app.js.gz"):
+            (root / name).write_bytes(name.encode())
+        cls.enterClassContext(override_settings(STATIC_ROOT=root))
+
+    def served(self, accept: str | None) -> tuple[bytes, str | None]:
+        headers = {} if accept is None else {"Accept-Encoding": accept}
+        response = assets.serve(RequestFactory().get("/", headers=headers), "app.js")
+        body = b"".join(response.streaming_content)
+        response.close()
+        return body, response.get("Content-Encoding")
+
+    def testEncodingChoice(self):
+        cases = {
+            None: None,
+            "": None,
+            "gzip, deflate, br": "br",
+            "gzip;q=0": None,
+            "br;q=0, gzip": "gzip",
+            "br;q=0.5, gzip": "gzip",
+            "br; q=1.0, gzip; q=1.0": "br",
+            " GZIP ;Q=0.8 ": "gzip",
+            "*": "br",
+            "*;q=0": None,
+            "gzip, *;q=0": "gzip",
+            "br;q=zero, gzip": "gzip",
+            "identity": None,
+        }
+        for accept, encoding in cases.items():
+            with self.subTest(accept=accept):
+                body, served = self.served(accept)
+                self.assertEqual(served, encoding)
+                suffix = {"br": ".br", "gzip": ".gz", None: ""}[encoding]
+                self.assertEqual(body, f"app.js{suffix}".encode())
+
+    def testPageHonoursQZero(self):
+        page = assets.Page(body=b"<p>", gzipped=b"gz", etag='W/"x"', modified=0)
+        for accept, encoding in (("gzip", "gzip"), ("gzip;q=0, br", None)):
+            with self.subTest(accept=accept):
+                request = RequestFactory().get("/", headers={"Accept-Encoding": accept})
+                response = page.respond(request)
+                self.assertEqual(response.get("Content-Encoding"), encoding)
@@ -0,0 +1,111 @@
+"""Batch submission (batch.py, /process/batch/ and processbatch)."""
+
+import json
+import os
+import tempfile
+import threading
+from io import StringIO
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+
+from QuickPay.portal import batch
+from QuickPay.portal.models import AuthNetStrategy, Transaction
+from QuickPay.portal.processors import registry
+from QuickPay.portal.tests.helpers import CARD, stubCredentials
+from QuickPay.portal.tests.stubgateway import StubGateway
+
+CHARGE = {**CARD, "amount": "10.00", "salesperson": "bench"}
+
+
+class BatchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        environ = mock.patch.dict(os.environ)
+        environ.start()
+        cls.addClassCleanup(registry.load)
+        cls.addClassCleanup(environ.stop)
+        stubCredentials()
+
+        cls.stub = StubGateway().start()
+        cls.addClassCleanup(cls.stub.stop)
+        endpoint = override_settings(
+            AUTH_NET_ENDPOINT=cls.stub.url, BATCH_RATE_LIMITS={}
+        )
+        endpoint.enable()
+        cls.addClassCleanup(endpoint.disable)
+
+    def setUp(self):
+        self.stub.latency = 0.0
+        self.addCleanup(setattr, self.stub, "latency", 0.0)
+
+    def testRejectedChargesGetNoRowOrGatewayCall(self):
+        served = self.stub.requests
+        charges = [CHARGE, {**CHARGE, "number": "4111111111111112"}, CHARGE]
+        results = dict(batch.processBatch(charges))
+        self.assertEqual(sorted(results), [0, 1, 2])
+        self.assertEqual(results[0]["result"], "Success")
+        self.assertEqual(results[2]["result"], "Success")
+        self.assertIn("error", results[1])
+        self.assertEqual(Transaction.objects.count(), 2)
+        self.assertEqual(self.stub.requests, served + 2)
+
+    def testChargesMustBeObjects(self):
+        for body in ([1], [None], ["x"], [CHARGE, []]):
+            with self.subTest(body=body):
+                response = self.client.post(
+                    "/process/batch/", json.dumps(body), content_type="application/json"
+                )
+                self.assertEqual(response.status_code, 400)
+                self.assertFalse(response.streaming)
+
+                with tempfile.NamedTemporaryFile("w", suffix=".json") as file:
+                    json.dump(body, file)
+                    file.flush()
+                    with self.assertRaisesMessage(CommandError, "not a JSON object"):
+                        call_command("processbatch", file.name, stdout=StringIO())
+        self.assertFalse(Transaction.objects.exists())
+
+    def testClosingTheStreamLeavesUnsentChargesUnsubmitted(self):
+        self.stub.latency = 0.05
+        served = self.stub.requests
+        results = batch.processBatch([CHARGE] * 5, concurrency=1)
+        _, first = next(results)
+        self.assertEqual(first["result"], "Success")
+        results.close()
+
+        sent = self.stub.requests - served
+        self.assertLess(sent, 5)
+        rows = Transaction.objects.all()
+        self.assertEqual(rows.count(), 5)
+        # Whatever reached the gateway was recorded; the rest never went out
+        self.assertEqual(rows.filter(submitted=True).count(), sent)
+        self.assertEqual(
+            rows.filter(submitted=True, transId__isnull=False).count(), sent
+        )
+        self.assertEqual(rows.filter(submitted=False).count(), 5 - sent)
+
+    @override_settings(BATCH_MAX_CONCURRENCY=2)
+    def testConcurrencyIsCapped(self):
+        self.stub.latency = 0.05
+        submit = AuthNetStrategy.submit
+        lock = threading.Lock()
+        inFlight = peak = 0
+
+        def counted(strategy):
+            nonlocal inFlight, peak
+            with lock:
+                inFlight += 1
+                peak = max(peak, inFlight)
+            try:
+                return submit(strategy)
+            finally:
+                with lock:
+                    inFlight -= 1
+
+        with mock.patch.object(AuthNetStrategy, "submit", counted):
+            results = list(batch.processBatch([CHARGE] * 6, concurrency=8))
+        self.assertEqual(len(results), 6)
+        self.assertEqual(peak, 2)
@@ -0,0 +1,104 @@
+"""The per-processor circuit breaker (circuit.py)."""
+
+from django.test import SimpleTestCase
+
+from QuickPay.portal import circuit
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def setUp(self):
+        self.clock = Clock()
+        self.breaker = circuit.CircuitBreaker(
+            "test",
+            window=30.0,
+            minCalls=4,
+            errorRate=0.5,
+            cooldown=15.0,
+            probes=1,
+            minTimeout=2.0,
+            maxTimeout=30.0,
+            clock=self.clock,
+        )
+
+    def trip(self):
+        for ok in (True, True, False, False):
+            self.assertTrue(self.breaker.allow())
+            self.breaker.record(0.1, ok)
+        self.assertEqual(self.breaker.state, circuit.OPEN)
+
+    def testOpensOnceEnoughCallsFail(self):
+        for ok in (False, True, False):
+            self.breaker.record(0.1, ok)
+        self.assertEqual(self.breaker.state, circuit.CLOSED)  # under minCalls
+        self.breaker.record(0.1, True)
+        self.assertEqual(self.breaker.state, circuit.CLOSED)  # ok calls never open
+        self.breaker.record(0.1, False)
+        self.assertEqual(self.breaker.state, circuit.OPEN)
+        self.assertEqual(self.breaker.opened, 1)
+
+    def testOldFailuresExpire(self):
+        for _ in range(3):
+            self.breaker.record(0.1, False)
+        self.clock.now += 31
+        self.breaker.record(0.1, False)
+        self.assertEqual(self.breaker.state, circuit.CLOSED)
+
+    def testFailsFastWhileOpen(self):
+        self.trip()
+        for _ in range(5):
+            self.assertFalse(self.breaker.allow())
+        self.clock.now += 14.9
+        self.assertFalse(self.breaker.allow())
+        self.assertEqual(self.breaker.rejected, 6)
+
+    def testOneProbeThenClose(self):
+        self.trip()
+        self.clock.now += 15
+        self.assertTrue(self.breaker.allow())
+        self.assertEqual(self.breaker.state, circuit.HALF_OPEN)
+        self.assertFalse(self.breaker.allow())  # the probe is still out
+        self.breaker.record(0.1, True)
+        self.assertEqual(self.breaker.state, circuit.CLOSED)
+        self.assertTrue(self.breaker.allow())
+        self.assertTrue(self.breaker.allow())
+
+    def testFailedProbeReopens(self):
+        self.trip()
+        self.clock.now += 15
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record(2.0, False)
+        self.assertEqual(self.breaker.state, circuit.OPEN)
+        self.assertEqual(self.breaker.opened, 2)
+        self.clock.now += 14.9  # the cooldown starts over
+        self.assertFalse(self.breaker.allow())
+        self.clock.now += 0.1
+        self.assertTrue(self.breaker.allow())
+
+    def testTimeoutFollowsLatencyWithinBounds(self):
+        self.assertEqual(self.breaker.timeout(), 30.0)  # no samples yet
+        for _ in range(4):
+            self.breaker.record(0.1, True)
+        self.assertEqual(self.breaker.timeout(), 2.0)  # 3 x 0.1, raised to the floor
+        for _ in range(4):
+            self.breaker.record(1.5, True)
+        self.assertAlmostEqual(self.breaker.timeout(), 4.5)
+        for _ in range(4):
+            self.breaker.record(20.0, True)
+        self.assertEqual(self.breaker.timeout(), 30.0)  # 60, capped
+
+        # Too few samples left in the window: the last value stands
+        self.breaker.record(20.0, False)
+        self.clock.now += 31
+        for _ in range(3):
+            self.breaker.record(0.1, True)
+        self.assertEqual(self.breaker.timeout(), 30.0)
+        self.breaker.record(0.1, True)
+        self.assertEqual(self.breaker.timeout(), 2.0)
@@ -0,0 +1,37 @@
+"""The lean codec (codec.py) against the authorizenet SDK it replaces."""
+
+import random
+
+from django.test import SimpleTestCase
+
+from QuickPay.portal import codec
+from QuickPay.portal.tests.helpers import (
+    DECLINED,
+    codecFields,
+    sdkRequest,
+    sdkResponse,
+)
+from QuickPay.portal.tests.stubgateway import StubGateway
+
+
+class CodecTests(SimpleTestCase):
+    def setUp(self):
+        rng = random.Random(7)
+        self.cases = [codecFields(rng) for _ in range(200)]
+
+    def testRequestsAreByteIdentical(self):
+        for fields in self.cases:
+            with self.subTest(fields=fields):
+                self.assertEqual(
+                    codec.encodeTransactionRequest(**fields), sdkRequest(fields)
+                )
+
+    def testResponsesDecodeLikeTheSdk(self):
+        approved = StubGateway().respond(
+            codec.encodeTransactionRequest(**self.cases[0])
+        )
+        for body in (approved, DECLINED):
+            with self.subTest(body=body[:80]):
+                self.assertEqual(
+                    codec.decodeTransactionResponse(body), sdkResponse(body)
+                )
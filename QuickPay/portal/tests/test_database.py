@@ -0,0 +1,145 @@
+"""Database settings (settings/base.py) and the primary/replica router."""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from copy import deepcopy
+from pathlib import Path
+
+from django.conf import settings
+from django.db import OperationalError, connections
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import SimpleTestCase, override_settings
+
+from QuickPay.portal import reporting
+from QuickPay.portal.models import Transaction
+from QuickPay.portal.routers import PrimaryReplicaRouter
+
+
+def loadSettings(**env) -> dict:
+    """The settings a fresh process builds with ``env`` (and no other DB_*)."""
+    environ = {
+        name: value for name, value in os.environ.items() if not name.startswith("DB_")
+    }
+    script = (
+        "import json, QuickPay.settings as s; print(json.dumps("
+        "{'DATABASES': s.DATABASES, 'REPORTING_DATABASE': s.REPORTING_DATABASE},"
+        " default=str))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=settings.BASE_DIR,
+        env={**environ, "QUICKPAY_PROFILE": "bench", **env},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout)
+
+
+class DatabaseSettingsTests(SimpleTestCase):
+    def testSqliteByDefault(self):
+        loaded = loadSettings()
+        default = loaded["DATABASES"]["default"]
+        self.assertEqual(default["ENGINE"], "django.db.backends.sqlite3")
+        self.assertEqual(default["OPTIONS"]["transaction_mode"], "IMMEDIATE")
+        self.assertIn("PRAGMA journal_mode=WAL", default["OPTIONS"]["init_command"])
+        self.assertEqual(list(loaded["DATABASES"]), ["default"])
+        self.assertEqual(loaded["REPORTING_DATABASE"], "default")
+
+    def testServerDatabaseWithReplica(self):
+        loaded = loadSettings(
+            DB_ENGINE="postgresql",
+            DB_NAME="quickpay",
+            DB_HOST="primary.internal",
+            DB_PORT="5432",
+            DB_REPLICA_HOST="replica.internal",
+        )
+        default, replica = (
+            loaded["DATABASES"][alias] for alias in ("default", "replica")
+        )
+        self.assertEqual(default["ENGINE"], "django.db.backends.postgresql")
+        self.assertEqual(default["HOST"], "primary.internal")
+        self.assertEqual(default["CONN_MAX_AGE"], 300)
+        self.assertTrue(default["CONN_HEALTH_CHECKS"])
+        self.assertEqual(replica["HOST"], "replica.internal")
+        self.assertEqual(replica["PORT"], "5432")
+        self.assertEqual(replica["TEST"], {"MIRROR": "default"})
+        self.assertEqual(loaded["REPORTING_DATABASE"], "replica")
+
+    def testPostgresPoolReplacesPersistentConnections(self):
+        default = loadSettings(DB_ENGINE="postgresql", DB_POOL="8")["DATABASES"][
+            "default"
+        ]
+        self.assertEqual(default["CONN_MAX_AGE"], 0)
+        self.assertEqual(default["OPTIONS"]["pool"], {"min_size": 2, "max_size": 8})
+
+    def testMysqlOptions(self):
+        default = loadSettings(DB_ENGINE="mysql")["DATABASES"]["default"]
+        self.assertEqual(default["OPTIONS"]["isolation_level"], "read committed")
+
+
+class SqliteFileTests(SimpleTestCase):
+    """The SQLite options on a file database (tests otherwise run in memory)."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.config = deepcopy(connections["default"].settings_dict)
+        self.config["NAME"] = str(Path(directory.name) / "db.sqlite3")
+
+    def connect(self, alias):
+        wrapper = DatabaseWrapper(deepcopy(self.config), alias)
+        self.addCleanup(wrapper.close)
+        wrapper.ensure_connection()
+        return wrapper
+
+    def testPragmas(self):
+        with self.connect("pragmas").cursor() as cursor:
+            cursor.execute("PRAGMA journal_mode")
+            self.assertEqual(cursor.fetchone()[0], "wal")
+            cursor.execute("PRAGMA synchronous")
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+            cursor.execute("PRAGMA busy_timeout")
+            self.assertEqual(cursor.fetchone()[0], 5000)
+
+    def testTransactionsTakeTheWriteLockUpFront(self):
+        first = self.connect("first")
+        with first.cursor() as cursor:
+            cursor.execute("CREATE TABLE t (x)")
+        second = self.connect("second")
+        with second.cursor() as cursor:
+            cursor.execute("PRAGMA busy_timeout=0")
+
+        # What atomic() runs on entry; it has not written anything yet
+        first._start_transaction_under_autocommit()
+        try:
+            with self.assertRaisesMessage(OperationalError, "locked"):
+                second._start_transaction_under_autocommit()
+            # Readers are never blocked in WAL mode
+            with second.cursor() as cursor:
+                cursor.execute("SELECT count(*) FROM t")
+        finally:
+            first.connection.rollback()
+
+
+class RouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+
+    def testEverythingDefaultsToThePrimary(self):
+        self.assertEqual(self.router.db_for_read(Transaction), "default")
+        self.assertEqual(self.router.db_for_write(Transaction), "default")
+        self.assertTrue(self.router.allow_migrate("default", "portal"))
+        self.assertFalse(self.router.allow_migrate("replica", "portal"))
+
+    @override_settings(REPORTING_DATABASE="replica")
+    def testReportingReadsOptInToTheReplica(self):
+        self.assertEqual(reporting.filterTransactions({}).db, "replica")
+        primary, replica = Transaction(), Transaction()
+        primary._state.db, replica._state.db = "default", "replica"
+        self.assertTrue(self.router.allow_relation(primary, replica))
+        replica._state.db = "other"
+        self.assertFalse(self.router.allow_relation(primary, replica))
@@ -0,0 +1,94 @@
+"""Streaming transaction exports (export.py and /transactions/export/)."""
+
+import csv
+import gzip
+import io
+import json
+import tracemalloc
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from QuickPay.portal import export
+from QuickPay.portal.models import Transaction
+from QuickPay.portal.tests.helpers import seedTransactions
+
+
+def exportPeak(format: str, compress: bool) -> tuple[int, int]:
+    """``(lines, peak traced bytes)`` of exporting every transaction."""
+    decompressor = gzip.zlib.decompressobj(31) if compress else None
+    lines = 0
+    tracemalloc.start()
+    try:
+        for chunk in export.export(Transaction.objects.all(), format, compress):
+            lines += (decompressor.decompress(chunk) if compress else chunk).count(
+                b"\n"
+            )
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return lines, peak
+
+
+class ExportMemoryTests(TestCase):
+    def testPeakMemoryStaysFlatAsTheTableGrows(self):
+        peaks = {}
+        seeded = 0
+        for count in (2_000, 20_000):
+            seedTransactions(count - seeded, seed=count)
+            seeded = count
+            for format in export.FORMATS:
+                for compress in (False, True):
+                    lines, peak = exportPeak(format, compress)
+                    self.assertEqual(lines, count + (format == "csv"))
+                    peaks.setdefault((format, compress), []).append(peak)
+        for key, (small, large) in peaks.items():
+            with self.subTest(format=key[0], gzip=key[1]):
+                # Ten times the rows, well under twice the memory
+                self.assertLess(large, small * 2)
+
+
+class ExportViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seedTransactions(500, days=10)
+
+    def get(self, **params):
+        response = self.client.get("/transactions/export/", params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content)
+
+    def testCsvWithFilters(self):
+        since = (timezone.now() - timedelta(days=3)).date()
+        body = self.get(salesperson="sales07", since=since.isoformat())
+        rows = list(csv.reader(io.StringIO(body.decode())))
+        self.assertEqual(rows[0], export.exportFields())
+        expected = Transaction.objects.filter(
+            salesperson="sales07",
+            created_at__gte=timezone.make_aware(
+                timezone.datetime.combine(since, timezone.datetime.min.time())
+            ),
+        )
+        self.assertEqual(
+            [row[0] for row in rows[1:]],
+            [
+                str(pk)
+                for pk in expected.order_by("created_at", "id").values_list(
+                    "id", flat=True
+                )
+            ],
+        )
+
+    def testGzippedNdjson(self):
+        body = gzip.decompress(self.get(format="ndjson", gzip="1"))
+        records = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual(len(records), 500)
+        self.assertEqual(
+            records[0]["id"], Transaction.objects.earliest("created_at").id
+        )
+
+    def testUnknownFormat(self):
+        response = self.client.get("/transactions/export/", {"format": "xml"})
+        self.assertEqual(response.status_code, 400)
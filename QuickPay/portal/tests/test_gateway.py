@@ -0,0 +1,71 @@
+"""The keep-alive gateway transport (gateway.py)."""
+
+import time
+
+import requests
+from django.test import SimpleTestCase
+
+from QuickPay.portal import codec, metrics
+from QuickPay.portal.gateway import Transport
+from QuickPay.portal.tests.stubgateway import StubGateway
+
+REQUEST = codec.encodeTransactionRequest(
+    refId="1",
+    name="name",
+    transactionKey="key",
+    amount="10.00",
+    cardNumber="4111111111111111",
+    expirationDate="2030-12",
+    cardCode="123",
+    invoiceNumber="1",
+    description="test",
+)
+
+
+class TransportTests(SimpleTestCase):
+    def setUp(self):
+        self.stub = StubGateway().start()
+        self.addCleanup(self.stub.stop)
+
+    def post(self, transport):
+        response = transport.post(self.stub.url, REQUEST)
+        self.assertEqual(response.status_code, 200)
+
+    def testConnectionsAreReused(self):
+        transport = Transport(poolSize=2)
+        for _ in range(5):
+            self.post(transport)
+        self.assertEqual(
+            transport.stats(),
+            {"requests": 5, "hits": 4, "misses": 1, "pools": 1, "evictions": 0},
+        )
+
+    def testIdleConnectionsReconnectOnCheckout(self):
+        before = metrics.GATEWAY_CONNECTIONS.values()
+        transport = Transport(poolSize=2, idleTimeout=0.05)
+        self.post(transport)
+        self.post(transport)
+        time.sleep(0.1)
+        self.post(transport)
+        self.assertEqual(
+            transport.stats(),
+            {"requests": 3, "hits": 1, "misses": 2, "pools": 1, "evictions": 1},
+        )
+
+        after = metrics.GATEWAY_CONNECTIONS.values()
+        for outcome in ("reused", "opened", "evicted"):
+            key = ("127.0.0.1", outcome)
+            self.assertEqual(after[key] - before.get(key, 0), 1)
+        self.assertIn(
+            'quickpay_gateway_connections_total{host="127.0.0.1",outcome="evicted"}',
+            metrics.exposition(),
+        )
+
+    def testFailedConnectionsAreReplaced(self):
+        transport = Transport(poolSize=2)
+        self.post(transport)
+        self.stub.mix = {"drop": 1}
+        with self.assertRaises(requests.ConnectionError):
+            transport.post(self.stub.url, REQUEST)
+        self.stub.mix = {}
+        self.post(transport)
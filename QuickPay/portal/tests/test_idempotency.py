@@ -0,0 +1,77 @@
+"""Idempotency-Key handling on /process/ (idempotency.py)."""
+
+import json
+import os
+import uuid
+from unittest import mock
+
+from django.conf import settings
+from django.test import TestCase, override_settings
+
+from QuickPay.portal.models import IdempotencyKey, Transaction
+from QuickPay.portal.processors import registry
+from QuickPay.portal.tests.helpers import CARD, stubCredentials
+from QuickPay.portal.tests.stubgateway import StubGateway
+
+PAYMENT = {**CARD, "amount": "10.00", "salesperson": "bench"}
+
+
+class IdempotencyTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        environ = mock.patch.dict(os.environ)
+        environ.start()
+        cls.addClassCleanup(registry.load)
+        cls.addClassCleanup(environ.stop)
+        stubCredentials()
+
+        cls.stub = StubGateway().start()
+        cls.addClassCleanup(cls.stub.stop)
+        endpoint = override_settings(
+            AUTH_NET_ENDPOINT=cls.stub.url,
+            RATE_LIMITS={**settings.RATE_LIMITS, "ENABLED": False},
+        )
+        endpoint.enable()
+        cls.addClassCleanup(endpoint.disable)
+
+    def setUp(self):
+        self.key = uuid.uuid4().hex
+
+    def post(self, payment=PAYMENT):
+        return self.client.post(
+            "/process/",
+            json.dumps(payment),
+            content_type="application/json",
+            headers={"Idempotency-Key": self.key},
+        )
+
+    def testGatewayOutcomesAreReplayed(self):
+        served = self.stub.requests
+        first = self.post()
+        self.assertEqual(first.json()["result"], "Success")
+        second = self.post()
+        self.assertEqual(second["Idempotent-Replayed"], "true")
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(Transaction.objects.count(), 1)
+        self.assertEqual(self.stub.requests, served + 1)
+
+    def testDifferentPayloadIsRefused(self):
+        self.post()
+        self.assertEqual(self.post({**PAYMENT, "amount": "11.00"}).status_code, 422)
+
+    def testRejectedPaymentsReleaseTheKey(self):
+        response = self.post({**PAYMENT, "number": "4111111111111112"})
+        self.assertIn("error", response.json())
+        self.assertFalse(IdempotencyKey.objects.filter(key=self.key).exists())
+        self.assertEqual(self.post().json()["result"], "Success")
+
+    def testShortCircuitedPaymentsReleaseTheKey(self):
+        with mock.patch("QuickPay.portal.circuit.CircuitBreaker.allow") as allow:
+            allow.return_value = False
+            response = self.post()
+        self.assertEqual(response.json()["error"], "GATEWAY_UNAVAILABLE")
+        self.assertFalse(IdempotencyKey.objects.filter(key=self.key).exists())
+        retried = self.post()
+        self.assertNotIn("Idempotent-Replayed", retried)
+        self.assertEqual(retried.json()["result"], "Success")
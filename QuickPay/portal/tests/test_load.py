@@ -0,0 +1,79 @@
+"""
+/process/ end to end against the stub gateway, held to the DB write budget
+``benchload`` reports. Latency budgets are left to ``benchload --max-p95``.
+"""
+
+import json
+import os
+from unittest import mock
+
+from django.conf import settings
+from django.db import connection
+from django.test import TestCase, override_settings
+
+from QuickPay.portal.models import Result, Transaction
+from QuickPay.portal.processors import registry
+from QuickPay.portal.tests.helpers import CARD, stubCredentials
+from QuickPay.portal.tests.stubgateway import StubGateway
+
+PAYLOAD = json.dumps({**CARD, "amount": "10.00", "salesperson": "bench"})
+
+# Writes for one payment once the day's sales rollup exists
+MAX_WRITES = 4
+
+
+class ProcessLoadTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        environ = mock.patch.dict(os.environ)
+        environ.start()
+        cls.addClassCleanup(registry.load)
+        cls.addClassCleanup(environ.stop)
+        stubCredentials()
+
+        cls.stub = StubGateway().start()
+        cls.addClassCleanup(cls.stub.stop)
+        endpoint = override_settings(
+            AUTH_NET_ENDPOINT=cls.stub.url,
+            RATE_LIMITS={**settings.RATE_LIMITS, "ENABLED": False},
+        )
+        endpoint.enable()
+        cls.addClassCleanup(endpoint.disable)
+
+    def setUp(self):
+        self.pay()  # creates the rollup row and warms up the connections
+
+    def pay(self, shape="approved"):
+        """Posts one payment the stub answers with ``shape``."""
+        self.stub.mix = {shape: 1}
+        served = self.stub.served[shape]
+        writes = 0
+
+        def count(execute, sql, params, many, context):
+            nonlocal writes
+            writes += sql.startswith(("INSERT", "UPDATE"))
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count):
+            response = self.client.post(
+                "/process/", PAYLOAD, content_type="application/json"
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.stub.served[shape], served + 1)
+        return writes
+
+    def testEveryOutcomeWithinTheWriteBudget(self):
+        for shape, result, error in (
+            ("approved", Result.SUCCESS, None),
+            ("declined", Result.FAILED, "2"),
+            ("invalid", Result.FAILED, "6"),
+            ("rejected", Result.FAILED, "E00007"),
+            ("http500", Result.ERROR, "NO_RESPONSE"),
+            ("drop", Result.ERROR, "NO_RESPONSE"),
+        ):
+            with self.subTest(shape=shape):
+                writes = self.pay(shape)
+                tx = Transaction.objects.latest("id")
+                self.assertEqual((tx.result, tx.error), (result, error))
+                self.assertLessEqual(writes, MAX_WRITES)
@@ -0,0 +1,62 @@
+"""The asynchronous JSON lines handler (logs.py)."""
+
+import json
+import logging
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from QuickPay.portal import metrics
+from QuickPay.portal.logs import AsyncHandler
+
+
+class AsyncHandlerTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = Path(directory.name) / "log.jsonl"
+        self.handler = AsyncHandler(filename=self.path)
+        self.addCleanup(self.handler.close)
+        self.logger = logging.Logger("test")
+        self.logger.addHandler(self.handler)
+
+    def lines(self):
+        return [json.loads(line) for line in self.path.read_text().splitlines()]
+
+    def testRecordsAreWrittenAsJson(self):
+        self.logger.warning("paid %s", "10.00", extra={"refID": "abc"})
+        self.handler.close()
+        [entry] = self.lines()
+        self.assertEqual(entry["msg"], "paid 10.00")
+        self.assertEqual(entry["refID"], "abc")
+        self.assertEqual(entry["level"], "WARNING")
+
+    @unittest.skipUnless(hasattr(os, "fork"), "needs fork")
+    def testForkedChildrenStartTheirOwnListener(self):
+        self.logger.warning("parent")
+        pid = os.fork()
+        if pid == 0:
+            try:
+                self.logger.warning("child")
+                self.handler.close()
+            finally:
+                os._exit(0)
+        os.waitpid(pid, 0)
+        self.handler.close()
+        self.assertCountEqual(
+            [entry["msg"] for entry in self.lines()], ["parent", "child"]
+        )
+
+    def testDroppedRecordsAreCounted(self):
+        handler = AsyncHandler(filename=self.path, maxsize=1)
+        self.addCleanup(handler.close)
+        before = metrics.LOG_RECORDS_DROPPED.values().get((), 0)
+        with mock.patch.object(handler, "_AsyncHandler__start"):  # nothing drains
+            for _ in range(3):
+                handler.handle(logging.makeLogRecord({"msg": "x"}))
+        self.assertEqual(handler.dropped, 2)
+        self.assertEqual(metrics.LOG_RECORDS_DROPPED.values()[()], before + 2)
@@ -0,0 +1,34 @@
+"""Per-thread metric tables (metrics.py)."""
+
+import threading
+
+from django.test import SimpleTestCase
+
+from QuickPay.portal import metrics
+
+
+def inThreads(count, target):
+    for _ in range(count):
+        thread = threading.Thread(target=target)
+        thread.start()
+        thread.join()
+
+
+class MetricTests(SimpleTestCase):
+    def testExitedThreadsAreFoldedIntoOneTable(self):
+        counter = metrics.Counter("test_total", "", ("kind",), register=False)
+        inThreads(50, lambda: counter.inc(kind="a"))
+        counter.inc(2, kind="b")
+        self.assertEqual(counter.values(), {("a",): 50, ("b",): 2})
+        self.assertEqual(len(counter._Metric__tables), 1)  # this thread's
+
+        inThreads(10, lambda: counter.inc(kind="a"))
+        self.assertEqual(counter.values(), {("a",): 60, ("b",): 2})
+
+    def testHistogramsKeepTheirBuckets(self):
+        histogram = metrics.Histogram(
+            "test_seconds", "", buckets=(1, 2), register=False
+        )
+        inThreads(3, lambda: histogram.observe(1.5))
+        histogram.observe(5)
+        self.assertEqual(histogram.values(), {(): [0, 3, 9.5, 4]})
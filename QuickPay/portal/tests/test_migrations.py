@@ -0,0 +1,47 @@
+"""Data migrations (portal/migrations)."""
+
+import importlib
+from decimal import Decimal
+from types import SimpleNamespace
+
+from django.test import SimpleTestCase
+
+typedColumnsCopy = importlib.import_module(
+    "QuickPay.portal.migrations.0009_transaction_typed_columns_copy"
+)
+
+
+def legacyRow(amount):
+    return SimpleNamespace(
+        pk=7,
+        amount=amount,
+        result="Success",
+        invoiceID="c3d6a5bc-e80e-46",
+        responseCode="1",
+        accountType="Visa",
+    )
+
+
+class TypedColumnsCopyTests(SimpleTestCase):
+    def testAmountsThatFitAreCopiedSilently(self):
+        for amount in ("10", "10.5", "0012.30", "99999999.99"):
+            with self.subTest(amount=amount):
+                row = legacyRow(amount)
+                with self.assertNoLogs(typedColumnsCopy.logger):
+                    self.assertFalse(typedColumnsCopy.forwards(row))
+                self.assertEqual(row.typedAmount, Decimal(amount))
+
+    def testCoercedAmountsAreLogged(self):
+        for amount, stored in (
+            ("10.005", "10.00"),
+            ("ten", "0.00"),
+            (None, "0.00"),
+            ("NaN", "0.00"),
+            ("1E10", "0.00"),
+        ):
+            with self.subTest(amount=amount):
+                row = legacyRow(amount)
+                with self.assertLogs(typedColumnsCopy.logger, "WARNING") as logs:
+                    self.assertTrue(typedColumnsCopy.forwards(row))
+                self.assertEqual(row.typedAmount, Decimal(stored))
+                self.assertIn(f"{amount!r} of transaction 7", logs.output[0])
@@ -0,0 +1,65 @@
+"""Post-payment side effects (outbox.py)."""
+
+from datetime import timedelta
+from unittest import mock
+
+from django.conf import settings
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from QuickPay.portal import outbox
+from QuickPay.portal.models import OutboxEvent
+
+OUTBOX = {**settings.OUTBOX, "ATTEMPTS": 3, "BACKOFF": 2.0, "MAX_BACKOFF": 600.0}
+
+
+@override_settings(OUTBOX=OUTBOX)
+class OutboxTests(TestCase):
+    def setUp(self):
+        self.event = OutboxEvent.objects.create(kind="audit", payload={})
+
+    def expire(self):
+        """Makes the event due again, as when a lease or backoff runs out."""
+        OutboxEvent.objects.update(available_at=timezone.now() - timedelta(seconds=1))
+
+    def testClaimingCountsTheAttempt(self):
+        [event] = outbox.claim()
+        self.assertEqual(event.attempts, 1)
+        self.event.refresh_from_db()
+        self.assertEqual(
+            (self.event.status, self.event.attempts), (OutboxEvent.RUNNING, 1)
+        )
+        self.assertEqual(outbox.claim(), [])  # leased
+        self.assertTrue(outbox.dispatch(event))
+        self.event.refresh_from_db()
+        self.assertEqual(
+            (self.event.status, self.event.attempts), (OutboxEvent.DONE, 1)
+        )
+
+    def testFailuresAreRetriedUpToTheLimit(self):
+        with mock.patch.dict(outbox._handlers, audit=mock.Mock(side_effect=OSError)):
+            for attempt in range(1, 4):
+                self.expire()
+                [event] = outbox.claim()
+                self.assertFalse(outbox.dispatch(event))
+                self.event.refresh_from_db()
+                self.assertEqual(self.event.attempts, attempt)
+        self.assertEqual(self.event.status, OutboxEvent.FAILED)
+        self.assertEqual(self.event.lastError, "OSError()")
+
+    def testEventsThatKillTheirWorkerAreAbandoned(self):
+        for _ in range(3):
+            self.expire()
+            self.assertEqual(len(outbox.claim()), 1)  # and the worker dies
+        self.expire()
+        self.assertEqual(outbox.claim(), [])
+        self.event.refresh_from_db()
+        self.assertEqual(
+            (self.event.status, self.event.attempts), (OutboxEvent.FAILED, 3)
+        )
+
+    def testBackoffIsFullJitter(self):
+        for attempts, ceiling in ((1, 2.0), (4, 16.0), (20, 600.0)):
+            delays = [outbox.backoff(attempts) for _ in range(200)]
+            self.assertTrue(all(0 <= delay <= ceiling for delay in delays))
+            self.assertLess(min(delays), ceiling / 4)
@@ -0,0 +1,76 @@
+"""Settings profiles (settings/__init__.py)."""
+
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+PRINT_HOSTS = "print(s.DEBUG, ','.join(s.ALLOWED_HOSTS))"
+PRINT_MIDDLEWARE = "print(*s.MIDDLEWARE, sep='\\n')"
+
+
+def loadProfile(
+    profile: str, show: str = PRINT_HOSTS, **env
+) -> subprocess.CompletedProcess:
+    """Imports the settings in a fresh process and runs ``show`` on them."""
+    environ = {
+        name: value
+        for name, value in os.environ.items()
+        if not name.startswith("DJANGO_")
+    }
+    script = f"import QuickPay.settings as s; {show}"
+    return subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=settings.BASE_DIR,
+        env={**environ, "QUICKPAY_PROFILE": profile, **env},
+        capture_output=True,
+        text=True,
+    )
+
+
+class ProdProfileTests(SimpleTestCase):
+    def testConfigured(self):
+        result = loadProfile(
+            "prod",
+            DJANGO_SECRET_KEY="secret",
+            DJANGO_ALLOWED_HOSTS="pay.example.com, admin.example.com,",
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(
+            result.stdout.strip(), "False pay.example.com,admin.example.com"
+        )
+
+    def testLeanMiddleware(self):
+        env = {"DJANGO_SECRET_KEY": "secret", "DJANGO_ALLOWED_HOSTS": "pay.example.com"}
+        result = loadProfile("prod", PRINT_MIDDLEWARE, QUICKPAY_PROFILING="0", **env)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        middleware = result.stdout.split()
+        self.assertEqual(
+            [path.rsplit(".", 1)[1] for path in middleware],
+            [
+                "SecurityMiddleware",
+                "SessionMiddleware",
+                "AuthenticationMiddleware",
+                "MessageMiddleware",
+                "XFrameOptionsMiddleware",
+            ],
+        )
+        profiled = loadProfile("prod", PRINT_MIDDLEWARE, QUICKPAY_PROFILING="1", **env)
+        self.assertEqual(
+            profiled.stdout.split(),
+            ["QuickPay.portal.profiling.ProfilingMiddleware", *middleware],
+        )
+
+    def testSecretKeyIsRequired(self):
+        result = loadProfile("prod", DJANGO_ALLOWED_HOSTS="pay.example.com")
+        self.assertIn("requires DJANGO_SECRET_KEY", result.stderr)
+
+    def testAllowedHostsAreRequired(self):
+        for hosts in ("", " , "):
+            with self.subTest(hosts=hosts):
+                result = loadProfile(
+                    "prod", DJANGO_SECRET_KEY="secret", DJANGO_ALLOWED_HOSTS=hosts
+                )
+                self.assertIn("requires DJANGO_ALLOWED_HOSTS", result.stderr)
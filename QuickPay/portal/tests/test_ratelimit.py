@@ -0,0 +1,161 @@
+"""Rate limits on /process/ (ratelimit.py)."""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import uuid
+from pathlib import Path
+from unittest import mock
+
+from django.conf import settings
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+
+from QuickPay.portal import metrics, ratelimit
+from QuickPay.portal.processors import registry
+from QuickPay.portal.tests.helpers import CARD, stubCredentials
+from QuickPay.portal.tests.stubgateway import StubGateway
+
+# Turned away by validation: no gateway call, but a full trip through the view
+REJECTED = {**CARD, "number": "4111111111111112", "amount": "10.00"}
+
+
+def limits(client=(0.001, 3), salesperson=(0.001, 1), **config):
+    return {
+        **settings.RATE_LIMITS,
+        "ENABLED": True,
+        "LIMITS": {
+            "client": {"RATE": client[0], "BURST": client[1]},
+            "salesperson": {"RATE": salesperson[0], "BURST": salesperson[1]},
+        },
+        **config,
+    }
+
+
+class SharedBucketTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = Path(directory.name) / "ratelimit.sqlite3"
+        self.buckets = ratelimit.SharedTokenBuckets(self.path)
+
+    def testBucketsAreSharedAcrossProcesses(self):
+        self.assertEqual(self.buckets.take("k", 0.001, 5), 0)
+        script = (
+            "import sys; from QuickPay.portal.ratelimit import SharedTokenBuckets; "
+            "b = SharedTokenBuckets(sys.argv[1]); "
+            "print(sum(not b.take('k', 0.001, 5) for _ in range(3)))"
+        )
+        child = subprocess.run(
+            [sys.executable, "-c", script, str(self.path)],
+            cwd=settings.BASE_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        self.assertEqual(child.stdout.strip(), "3")
+        self.assertEqual(self.buckets.take("k", 0.001, 5), 0)
+        self.assertGreater(self.buckets.take("k", 0.001, 5), 0)
+
+    def testTakeAllTakesFromEveryBucketOrNone(self):
+        both = [("a", 0.001, 2), ("b", 0.001, 1)]
+        self.assertEqual(self.buckets.takeAll(both), [0, 0])
+        waits = self.buckets.takeAll(both)
+        self.assertEqual(waits[0], 0)
+        self.assertGreater(waits[1], 0)
+        # "a" kept the token "b" refused
+        self.assertEqual(self.buckets.take("a", 0.001, 2), 0)
+        self.assertGreater(self.buckets.take("a", 0.001, 2), 0)
+
+
+class ClientAddressTests(SimpleTestCase):
+    def testForwardedHops(self):
+        request = RequestFactory().post(
+            "/process/",
+            headers={"X-Forwarded-For": "6.6.6.6, 1.1.1.1 ,2.2.2.2"},
+            REMOTE_ADDR="10.0.0.1",
+        )
+        for hops, address in ((0, "10.0.0.1"), (1, "2.2.2.2"), (2, "1.1.1.1")):
+            with self.subTest(hops=hops):
+                with override_settings(RATE_LIMITS=limits(FORWARDED_HOPS=hops)):
+                    self.assertEqual(ratelimit.clientAddress(request), address)
+        # Fewer entries than trusted proxies: the header is not to be believed
+        with override_settings(RATE_LIMITS=limits(FORWARDED_HOPS=4)):
+            self.assertEqual(ratelimit.clientAddress(request), "10.0.0.1")
+
+
+class ThrottleTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        environ = mock.patch.dict(os.environ)
+        environ.start()
+        cls.addClassCleanup(registry.load)
+        cls.addClassCleanup(environ.stop)
+        stubCredentials()
+
+        cls.stub = StubGateway().start()
+        cls.addClassCleanup(cls.stub.stop)
+        directory = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(directory.cleanup)
+        config = override_settings(
+            AUTH_NET_ENDPOINT=cls.stub.url,
+            RATE_LIMITS=limits(DB=Path(directory.name) / "ratelimit.sqlite3"),
+        )
+        config.enable()
+        cls.addClassCleanup(config.disable)
+
+    def setUp(self):
+        ratelimit.store().clear()
+
+    def post(self, salesperson, path="/process/", key=None, payment=REJECTED):
+        headers = {"Idempotency-Key": key} if key else {}
+        return self.client.post(
+            path,
+            json.dumps({**payment, "salesperson": salesperson}),
+            content_type="application/json",
+            headers=headers,
+        )
+
+    def testTooManyRequests(self):
+        throttled = metrics.THROTTLED.values().get(("salesperson",), 0)
+        self.assertEqual(self.post("a").status_code, 200)
+        response = self.post("a")
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.json()["error"], "RATE_LIMITED")
+        self.assertEqual(response["Retry-After"], "1000")  # a token per 1000 s
+        self.assertEqual(metrics.THROTTLED.values()[("salesperson",)], throttled + 1)
+
+    def testRefusedRequestsDoNotSpendTheClientsTokens(self):
+        self.post("a")
+        self.assertEqual(self.post("a").status_code, 429)
+        self.assertEqual(self.post("b").status_code, 200)
+        self.assertEqual(self.post("c").status_code, 200)
+        self.assertEqual(self.post("d").status_code, 429)
+
+    async def testAsyncView(self):
+        headers = {"content_type": "application/json"}
+        body = json.dumps({**REJECTED, "salesperson": "a"})
+        first = await self.async_client.post("/process/async/", body, **headers)
+        self.assertEqual(first.status_code, 200)
+        second = await self.async_client.post("/process/async/", body, **headers)
+        self.assertEqual(second.status_code, 429)
+        self.assertIn("Retry-After", second)
+
+    def testReplaysAreFree(self):
+        payment = {**CARD, "amount": "10.00"}
+        key = uuid.uuid4().hex
+        self.assertEqual(self.post("a", key=key, payment=payment).status_code, 200)
+        for _ in range(3):
+            replayed = self.post("a", key=key, payment=payment)
+            self.assertEqual(replayed.status_code, 200)
+            self.assertEqual(replayed["Idempotent-Replayed"], "true")
+
+        # A throttled request is not stored: its retry is processed afresh
+        key = uuid.uuid4().hex
+        self.assertEqual(self.post("a", key=key, payment=payment).status_code, 429)
+        ratelimit.store().clear()
+        retried = self.post("a", key=key, payment=payment)
+        self.assertEqual(retried.status_code, 200)
+        self.assertNotIn("Idempotent-Replayed", retried)
@@ -0,0 +1,85 @@
+"""Settlement reconciliation (reconcile.py) against the stub gateway."""
+
+import os
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from QuickPay.portal import reconcile
+from QuickPay.portal.models import Result, Transaction
+from QuickPay.portal.processors import registry
+from QuickPay.portal.tests.helpers import stubCredentials
+from QuickPay.portal.tests.stubgateway import StubGateway
+
+
+class ReconcileTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        environ = mock.patch.dict(os.environ)
+        environ.start()
+        cls.addClassCleanup(registry.load)
+        cls.addClassCleanup(environ.stop)
+        stubCredentials()
+
+    def setUp(self):
+        self.stub = StubGateway().start()
+        self.addCleanup(self.stub.stop)
+        endpoint = override_settings(AUTH_NET_ENDPOINT=self.stub.url)
+        endpoint.enable()
+        self.addCleanup(endpoint.disable)
+
+    def lost(self, invoiceID, sentAs):
+        """A NO_RESPONSE row whose charge the gateway settled."""
+        tx = Transaction.objects.create(
+            processor="A",
+            invoiceID=invoiceID,
+            refID=uuid.uuid4().hex[:20],
+            amount=Decimal("25.00"),
+            salesperson="sales01",
+            submitted=True,
+            result=Result.ERROR,
+            error="NO_RESPONSE",
+        )
+        transId = str(50000000000 + tx.pk)
+        self.stub.record(transId, sentAs, "25.00")
+        return tx, transId
+
+    def testNoResponseRowsAreCorrected(self):
+        invoiceID = Transaction.newInvoiceID()
+        current = self.lost(invoiceID, invoiceID.hex[:20])
+        # Migration 0009 zero-padded dashed IDs and hashed anything else
+        legacy = self.lost(
+            Transaction.parseInvoice("c3d6a5bc-e80e-46"), "c3d6a5bc-e80e-46"
+        )
+        named = self.lost(uuid.uuid5(uuid.NAMESPACE_OID, "INV-0042"), "INV-0042")
+        self.stub.record("59999999999", "ffffffffffffffffffff", "1.00")
+        self.stub.settle()
+
+        stats = reconcile.reconcile("A")
+
+        self.assertEqual(
+            {name: stats[name] for name in ("matched", "unmatched", "corrected")},
+            {"matched": 3, "unmatched": 1, "corrected": 3},
+        )
+        for tx, transId in (current, legacy, named):
+            tx.refresh_from_db()
+            self.assertEqual((tx.result, tx.transId), (Result.SUCCESS, transId))
+        self.assertEqual(reconcile.reconcile("A")["corrected"], 0)
+
+
+class SubmitTimeTests(SimpleTestCase):
+    def testGatewayTimestamps(self):
+        expected = datetime(2024, 5, 1, 16, 52, 42, 220000, tzinfo=timezone.utc)
+        for text in (
+            "2024-05-01T16:52:42.22Z",
+            "2024-05-01T16:52:42.220+00:00",
+            "2024-05-01T16:52:42.22",
+        ):
+            with self.subTest(text=text):
+                self.assertEqual(
+                    reconcile._submitTime({"submitTimeUTC": text}), expected
+                )
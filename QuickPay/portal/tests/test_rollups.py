@@ -0,0 +1,28 @@
+"""Sales rollups (rollups.py)."""
+
+from django.db.models import Sum
+from django.test import TestCase
+
+from QuickPay.portal import rollups
+from QuickPay.portal.models import Result, SalesRollup, Transaction
+from QuickPay.portal.tests.helpers import seedTransactions
+
+
+class RebuildTests(TestCase):
+    def testRebuildMatchesTheTransactions(self):
+        seedTransactions(300, days=3)
+        SalesRollup.objects.create(salesperson="gone", day="2000-01-01", failed=1)
+
+        stats = rollups.rebuild()
+
+        self.assertFalse(SalesRollup.objects.filter(salesperson="gone").exists())
+        self.assertEqual(stats["rows"], SalesRollup.objects.count())
+        totals = SalesRollup.objects.aggregate(
+            approved=Sum("approved"), failed=Sum("failed"), amount=Sum("approvedAmount")
+        )
+        approved = Transaction.objects.filter(result=Result.SUCCESS)
+        self.assertEqual(totals["approved"], approved.count())
+        self.assertEqual(
+            totals["failed"], Transaction.objects.filter(result=Result.FAILED).count()
+        )
+        self.assertEqual(totals["amount"], approved.aggregate(sum=Sum("amount"))["sum"])
@@ -0,0 +1,126 @@
+"""Payment validation before any strategy runs (validation.py)."""
+
+from datetime import date
+from decimal import Decimal
+
+from django.test import SimpleTestCase, override_settings
+
+from QuickPay.portal import metrics, validation
+from QuickPay.portal.tests.helpers import CARD
+
+TODAY = date(2026, 6, 15)
+
+
+def withCheckDigit(digits: str) -> str:
+    """``digits`` plus the Luhn check digit that makes them valid."""
+    return next(
+        digits + check for check in "0123456789" if validation.luhn(digits + check)
+    )
+
+
+class ValidationTests(SimpleTestCase):
+    def setUp(self):
+        self.validator = validation.Validator(today=TODAY)
+
+    def check(self, amount="10.00", salesperson="bench", **card):
+        return self.validator.validate("A", amount, salesperson, {**CARD, **card})
+
+    def assertRejected(self, code, **kwargs):
+        with self.assertRaises(validation.PaymentRejected) as caught:
+            self.check(**kwargs)
+        self.assertEqual(caught.exception.code, code)
+
+    def testLuhn(self):
+        for number in ("4111111111111111", "378282246310005", "6011000990139424"):
+            with self.subTest(number=number):
+                self.assertTrue(validation.luhn(number))
+                last = str((int(number[-1]) + 1) % 10)
+                self.assertFalse(validation.luhn(number[:-1] + last))
+
+    def testBrandsAndLengths(self):
+        cases = {
+            "Visa": ("4", (13, 16, 19), 15),
+            "MasterCard": ("2221", (16,), 15),
+            "AmericanExpress": ("37", (15,), 16),
+            "Discover": ("622126", (16, 19), 15),
+            "JCB": ("3589", (16, 19), 15),
+            "DinersClub": ("36", (14, 19), 13),
+        }
+        for name, (prefix, lengths, wrong) in cases.items():
+            cvv = "1234" if name == "AmericanExpress" else "123"
+            for length in lengths:
+                number = withCheckDigit(prefix.ljust(length - 1, "0"))
+                with self.subTest(number=number):
+                    self.assertEqual(validation.brand(number).name, name)
+                    self.assertEqual(
+                        self.check(number=number, cvv=cvv)[3]["number"], number
+                    )
+            number = withCheckDigit(prefix.ljust(wrong - 1, "0"))
+            with self.subTest(number=number):
+                self.assertRejected("INVALID_CARD_NUMBER", number=number, cvv=cvv)
+
+        self.assertEqual(validation.brand("9999").name, "Other")
+        self.assertRejected("INVALID_CARD_NUMBER", number="4111111111111112")
+        self.assertRejected("INVALID_CARD_NUMBER", number="4111-1111-1111-111x")
+        self.assertRejected("INVALID_CARD_NUMBER", number=None)
+        spaced = self.check(number="4111 1111-1111 1111")
+        self.assertEqual(spaced[3]["number"], "4111111111111111")
+
+    def testExpirationFormats(self):
+        for text in ("2030-12", "12/30", "1230", "12-30", "12/2030", "122030"):
+            with self.subTest(text=text):
+                self.assertEqual(validation.expiration(text), (2030, 12))
+        for text in ("2030-13", "00/30", "2030-1", "12/3", "soon", ""):
+            with self.subTest(text=text):
+                with self.assertRaises(validation.PaymentRejected):
+                    validation.expiration(text)
+
+    def testExpirationWindow(self):
+        self.check(expiration="2026-06")  # expires at the end of this month
+        self.assertRejected("CARD_EXPIRED", expiration="2026-05")
+        self.assertRejected("CARD_EXPIRED", expiration="12/25")
+        self.check(expiration="2046-12")
+        self.assertRejected("INVALID_EXPIRATION", expiration="2047-01")
+
+    def testCvvLengthFollowsTheBrand(self):
+        amex = "378282246310005"
+        self.check(cvv="123")
+        self.assertRejected("INVALID_CVV", cvv="1234")
+        self.check(number=amex, cvv="1234")
+        self.assertRejected("INVALID_CVV", number=amex, cvv="123")
+        self.assertRejected("INVALID_CVV", cvv="12a")
+        self.assertRejected("INVALID_CVV", cvv=None)
+        unknown = withCheckDigit("9" * 15)
+        self.check(number=unknown, cvv="123")
+        self.check(number=unknown, cvv="1234")
+
+    def testAmounts(self):
+        for amount, parsed in (("10", "10.00"), (" 10.5 ", "10.50"), (0.1, "0.10")):
+            with self.subTest(amount=amount):
+                self.assertEqual(self.check(amount=amount)[1], Decimal(parsed))
+        for amount in ("0", "-1", "1.001", "ten", "NaN", "Infinity", None, "1E20"):
+            with self.subTest(amount=amount):
+                self.assertRejected("INVALID_AMOUNT", amount=amount)
+        self.assertRejected("INVALID_SALESPERSON", salesperson=" ")
+
+    def testMaxAmount(self):
+        self.assertRejected("INVALID_AMOUNT", amount="100000.00")
+        with override_settings(PAYMENT_MAX_AMOUNT="100.00"):
+            validator = validation.Validator(today=TODAY)
+            validator.validate("A", "100.00", "bench", CARD)
+            with self.assertRaisesMessage(validation.PaymentRejected, "100.00 limit"):
+                validator.validate("A", "100.01", "bench", CARD)
+
+    def testRejectionsAreCounted(self):
+        key = ("A", "INVALID_CVV")
+        before = metrics.REJECTED.values().get(key, 0)
+        checked = validation.validateMany(
+            [
+                ("A", "10.00", "bench", CARD),
+                ("A", "10.00", "bench", {**CARD, "cvv": "1"}),
+                ("A", "10.00", "bench", {**CARD, "cvv": "12"}),
+            ]
+        )
+        self.assertIsInstance(checked[0], tuple)
+        self.assertEqual([e.code for e in checked[1:]], ["INVALID_CVV", "INVALID_CVV"])
+        self.assertEqual(metrics.REJECTED.values()[key], before + 2)
@@ -4,4 +4,11 @@ from . import views
 urlpatterns = [
     path('', views.portal, name='portal'),
     path('process/', views.process, name='process_payment'),
+    path('process/async/', views.processAsync, name='process_payment_async'),
+    path('process/batch/', views.processBatch, name='process_payment_batch'),
+    path('transactions/', views.transactions, name='transactions'),
+    path('transactions/export/', views.exportTransactions, name='export_transactions'),
+    path('dashboard/', views.dashboard, name='dashboard'),
+    path('gateway/status/', views.gatewayStatus, name='gateway_status'),
+    path('metrics', views.metricsView, name='metrics'),
 ]
\ No newline at end of file
@@ -0,0 +1,173 @@
+"""
+Checks a payment before any strategy sees it, so malformed input is turned
+away without a gateway round trip or a ``Transaction`` row.
+"""
+
+import re
+from dataclasses import dataclass
+from datetime import date
+from decimal import Decimal
+
+from django.conf import settings
+from django.utils import timezone
+
+from . import metrics, models
+
+
+class PaymentRejected(ValueError):
+    def __init__(self, code: str, text: str):
+        super().__init__(text)
+        self.code = code
+
+    def result(self) -> dict[str, str]:
+        """The client payload, shaped like every other payment error."""
+        return {"error": self.code, "errorText": str(self)}
+
+
+@dataclass(frozen=True)
+class Brand:
+    name: str
+    lengths: frozenset[int]
+    cvvLengths: frozenset[int]
+
+
+def _brand(name, lengths, cvvLengths=(3,)):
+    return Brand(name, frozenset(lengths), frozenset(cvvLengths))
+
+
+# IIN ranges per brand, as (first, last) prefixes of equal length
+BRANDS = {
+    _brand("Visa", (13, 16, 19)): [(4, 4)],
+    _brand("MasterCard", (16,)): [(51, 55), (2221, 2720)],
+    _brand("AmericanExpress", (15,), (4,)): [(34, 34), (37, 37)],
+    _brand("Discover", range(16, 20)): [
+        (6011, 6011),
+        (644, 649),
+        (65, 65),
+        (622126, 622925),
+    ],
+    _brand("JCB", range(16, 20)): [(3528, 3589)],
+    _brand("DinersClub", range(14, 20)): [(300, 305), (3095, 3095), (36, 36), (38, 39)],
+}
+# Cards outside the table are left for the gateway to judge
+UNKNOWN = _brand("Other", range(12, 20), (3, 4))
+
+# Every prefix spelled out, so a lookup is a few dict probes
+PREFIXES: dict[str, Brand] = {
+    str(prefix): brand
+    for brand, ranges in BRANDS.items()
+    for first, last in ranges
+    for prefix in range(first, last + 1)
+}
+PREFIX_LENGTHS = sorted({len(prefix) for prefix in PREFIXES}, reverse=True)
+
+_DOUBLED = (0, 2, 4, 6, 8, 1, 3, 5, 7, 9)  # Luhn: 2d, minus 9 past 9
+_SEPARATORS = str.maketrans("", "", " -")
+_DIGITS = re.compile(r"[0-9]+")
+_EXPIRATION = (
+    re.compile(r"(?P<year>\d{4})-(?P<month>\d{2})"),  # the portal's YYYY-MM
+    re.compile(r"(?P<month>\d{2})[/-]?(?P<year>\d{2}|\d{4})"),  # MMYY, MM/YYYY...
+)
+
+
+def brand(number: str) -> Brand:
+    for length in PREFIX_LENGTHS:
+        found = PREFIXES.get(number[:length])
+        if found is not None:
+            return found
+    return UNKNOWN
+
+
+def luhn(number: str) -> bool:
+    total = 0
+    for position, digit in enumerate(reversed(number)):
+        digit = ord(digit) - 48
+        total += _DOUBLED[digit] if position & 1 else digit
+    return total % 10 == 0
+
+
+def expiration(text: str) -> tuple[int, int]:
+    """``(year, month)`` from any expiration format the gateway accepts."""
+    for pattern in _EXPIRATION:
+        match = pattern.fullmatch(text)
+        if match:
+            year, month = int(match["year"]), int(match["month"])
+            if year < 100:
+                year += 2000
+            if 1 <= month <= 12:
+                return year, month
+    raise PaymentRejected("INVALID_EXPIRATION", "Invalid expiration date")
+
+
+class Validator:
+    """
+    Validates ``Transaction.process`` arguments and returns them normalized.
+    Settings and the current month are read once per validator, so a batch
+    shares one.
+    """
+
+    def __init__(self, today: date | None = None):
+        today = today or timezone.localdate()
+        self.month = (today.year, today.month)
+        self.maxAmount = Decimal(settings.PAYMENT_MAX_AMOUNT)
+
+    def __call__(self, processor, amount, salesperson, cardDetails):
+        try:
+            return self.validate(processor, amount, salesperson, cardDetails)
+        except PaymentRejected as e:
+            metrics.REJECTED.inc(processor=processor, error=e.code)
+            raise
+
+    def validate(self, processor, amount, salesperson, cardDetails):
+        number = str(cardDetails.get("number") or "").translate(_SEPARATORS)
+        if not _DIGITS.fullmatch(number):
+            raise PaymentRejected("INVALID_CARD_NUMBER", "Invalid card number")
+        cardBrand = brand(number)
+        if len(number) not in cardBrand.lengths or not luhn(number):
+            raise PaymentRejected("INVALID_CARD_NUMBER", "Invalid card number")
+
+        expires = str(cardDetails.get("expiration") or "").strip()
+        year, month = expiration(expires)
+        if (year, month) < self.month:
+            raise PaymentRejected("CARD_EXPIRED", "The card has expired")
+        if year > self.month[0] + 20:
+            raise PaymentRejected("INVALID_EXPIRATION", "Invalid expiration date")
+
+        cvv = str(cardDetails.get("cvv") or "").strip()
+        if not _DIGITS.fullmatch(cvv) or len(cvv) not in cardBrand.cvvLengths:
+            raise PaymentRejected("INVALID_CVV", "Invalid security code")
+
+        try:
+            amount = models.Transaction.parseAmount(amount)
+        except ValueError:
+            raise PaymentRejected("INVALID_AMOUNT", "Invalid amount")
+        if amount > self.maxAmount:
+            raise PaymentRejected(
+                "INVALID_AMOUNT", f"Amount exceeds the {self.maxAmount} limit"
+            )
+
+        if not isinstance(salesperson, str) or not 0 < len(salesperson.strip()) <= 254:
+            raise PaymentRejected("INVALID_SALESPERSON", "Invalid salesperson")
+
+        card = {"number": number, "expiration": expires, "cvv": cvv}
+        return processor, amount, salesperson, card
+
+
+def validate(processor, amount, salesperson, cardDetails):
+    """Normalized arguments, or ``PaymentRejected``."""
+    return Validator()(processor, amount, salesperson, cardDetails)
+
+
+def validateMany(payments) -> list:
+    """
+    ``validate`` for a batch of argument tuples: each entry is the normalized
+    arguments or the ``PaymentRejected`` for that payment.
+    """
+    validator = Validator()
+    checked = []
+    for args in payments:
+        try:
+            checked.append(validator(*args))
+        except PaymentRejected as e:
+            checked.append(e)
+    return checked
@@ -1,42 +1,174 @@
-from django.shortcuts import render
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
 from django.views.decorators.csrf import csrf_exempt
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 import json
+import logging
+import time
+from . import archive, assets, batch, circuit, export, metrics, reporting, rollups
+from .idempotency import idempotent
+from .ratelimit import ratelimited
 from .models import Transaction
-from rich import print
+
+logger = logging.getLogger(__name__)
+
+def parsePayment(request):
+    started = time.perf_counter()
+    args = Transaction.paymentArgs(json.loads(request.body))
+    metrics.STAGE_SECONDS.observe(
+        time.perf_counter() - started, processor=args[0], stage='parse'
+    )
+    return args
+
 
 def portal(request):
-    print(f"Request Captured: {request}")
-    return render(request, 'index.html')
+    return assets.page('index.html').respond(request)
 
 
 @csrf_exempt  # Consider using proper CSRF protection in production
+@idempotent
+@ratelimited
 def process(request):
     if request.method == "POST":
         try:
-            payload = json.loads(request.body)
-            # Parse JSON data from request body
-            amount = payload.get("amount")
-            number = payload.get("number")
-            expiration = payload.get("expiration")
-            cvv = payload.get("cvv")
-            salesperson = payload.get("salesperson")
-            response = Transaction.processTransaction(
-                amount, number, expiration, cvv, salesperson
-            )
-            print(f"Response: {response}")
-            return JsonResponse(response)
+            args = parsePayment(request)
+            result = Transaction.process(*args)
+            logger.debug("Response: %s", result)
+            response = JsonResponse(result)
+            response.submitted = result.submitted
+            return response
 
         except json.JSONDecodeError as e:
-            print(f"Error: {e}")
+            logger.warning("Invalid JSON: %s", e)
             return JsonResponse({"error": "Invalid JSON"}, status=400)
         except Exception as e:
-            print(f"Error: {e}")
+            logger.exception("Payment request failed")
             return JsonResponse({"error": str(e)}, status=500)
 
     # For GET requests, render the payment form
     if request.method == "GET":
-        return render(request, 'portal/index.html')
+        return assets.page('index.html').respond(request)
 
     # Only accept POST or GET requests
     return JsonResponse({"error": "Method not allowed"}, status=405)
+
+
+@csrf_exempt
+@idempotent
+@ratelimited
+async def processAsync(request):
+    if request.method != "POST":
+        return JsonResponse({"error": "Method not allowed"}, status=405)
+    try:
+        args = parsePayment(request)
+        result = await Transaction.aprocess(*args)
+        logger.debug("Response: %s", result)
+        response = JsonResponse(result)
+        response.submitted = result.submitted
+        return response
+
+    except json.JSONDecodeError as e:
+        logger.warning("Invalid JSON: %s", e)
+        return JsonResponse({"error": "Invalid JSON"}, status=400)
+    except Exception as e:
+        logger.exception("Payment request failed")
+        return JsonResponse({"error": str(e)}, status=500)
+
+
+@csrf_exempt
+def processBatch(request):
+    """
+    Charges a JSON array or CSV upload of payments and streams one NDJSON
+    result line per charge as each completes.
+    """
+    if request.method != "POST":
+        return JsonResponse({"error": "Method not allowed"}, status=405)
+    try:
+        if request.content_type == "text/csv":
+            charges = list(batch.readCSV(request))
+        else:
+            charges = batch.readJSON(request)
+        concurrency = int(request.GET.get("concurrency", 0)) or None
+        if concurrency is not None and concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+    except (ValueError, UnicodeDecodeError) as e:
+        logger.warning("Invalid batch: %s", e)
+        return JsonResponse({"error": f"Invalid batch: {e}"}, status=400)
+
+    lines = (
+        json.dumps({"index": index, **result}) + "\n"
+        for index, result in batch.processBatch(charges, concurrency)
+    )
+    return StreamingHttpResponse(lines, content_type="application/x-ndjson")
+
+
+@require_GET
+def transactions(request):
+    """
+    Read-only transaction listing for reporting, newest first, paginated
+    with the opaque ``next`` cursor. Archived transactions follow the live
+    ones.
+    """
+    try:
+        limit = min(int(request.GET.get("limit", 50)), 500)
+        rows, nextCursor = archive.page(
+            request.GET, request.GET.get("cursor"), max(limit, 1)
+        )
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    return JsonResponse(
+        {"results": [reporting.serialize(row) for row in rows], "next": nextCursor}
+    )
+
+
+@require_GET
+def exportTransactions(request):
+    """
+    Streams transactions as CSV or NDJSON (``format``), optionally gzipped
+    (``gzip=1``), filtered like the listing by date range and salesperson,
+    archived transactions included.
+    """
+    format = request.GET.get("format", "csv")
+    if format not in export.FORMATS:
+        return JsonResponse({"error": f"Unknown format {format!r}"}, status=400)
+    compress = request.GET.get("gzip") in ("1", "true")
+    try:
+        queryset = reporting.filterTransactions(request.GET)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    filename = f"transactions.{format}" + (".gz" if compress else "")
+    response = StreamingHttpResponse(
+        export.export(
+            queryset, format, compress, archived=archive.exportValues(request.GET)
+        ),
+        content_type="application/gzip" if compress else export.FORMATS[format],
+    )
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+@require_GET
+def dashboard(request):
+    """
+    Approved and failed counts and approved amount per salesperson for
+    ``day`` (default today) and its month to date, from the sales rollup.
+    """
+    try:
+        day = parse_date(request.GET.get("day", "")) or timezone.localdate()
+    except ValueError:
+        return JsonResponse({"error": "Invalid day"}, status=400)
+    return JsonResponse(rollups.totals(day, request.GET.get("salesperson")))
+
+
+@require_GET
+def gatewayStatus(request):
+    """Circuit breaker state per processor, as seen by this process."""
+    return JsonResponse({"breakers": circuit.snapshots()})
+
+
+@require_GET
+def metricsView(request):
+    """Payment-path metrics in the Prometheus text format."""
+    return HttpResponse(metrics.exposition(), content_type=metrics.CONTENT_TYPE)
@@ -0,0 +1,32 @@
+"""
+QuickPay settings, assembled from a profile chosen by QUICKPAY_PROFILE
+(in the environment or .env):
+
+- ``dev`` (default): DEBUG with django-debug-toolbar.
+- ``prod``: DEBUG off, no toolbar; requires DJANGO_SECRET_KEY and
+  DJANGO_ALLOWED_HOSTS.
+- ``bench``: the production stack with the development key and any host,
+  for measuring the app as it runs in production. Adds the ``bench*`` and
+  ``stubgateway`` commands.
+
+Every profile starts from ``base``.
+"""
+
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+from .base import *  # noqa: F401,F403  (loads .env)
+
+PROFILE = os.getenv("QUICKPAY_PROFILE", "dev")
+
+if PROFILE == "dev":
+    from .dev import *  # noqa: F401,F403
+elif PROFILE == "prod":
+    from .prod import *  # noqa: F401,F403
+elif PROFILE == "bench":
+    from .bench import *  # noqa: F401,F403
+else:
+    raise ImproperlyConfigured(
+        f"Unknown QUICKPAY_PROFILE {PROFILE!r}; expected dev, prod or bench"
+    )
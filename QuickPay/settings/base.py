@@ -0,0 +1,376 @@
+"""
+Django settings shared by every QuickPay profile (see __init__.py).
+
+Generated by 'django-admin startproject' using Django 5.1.7.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/5.1/topics/settings/
+
+For the full list of settings and their values, see
+https://docs.djangoproject.com/en/5.1/ref/settings/
+"""
+
+import os
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+# Build paths inside the project like this: BASE_DIR / 'subdir'.
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+
+load_dotenv(BASE_DIR / ".env")
+
+
+# Development key; the prod profile requires DJANGO_SECRET_KEY instead
+SECRET_KEY = "django-insecure-r6qrz#n_wg%mx=ppkzehe$$20_y-4-n$fij3q-u&7=ulznoovq"
+
+DEBUG = False
+
+ALLOWED_HOSTS = []
+
+
+# Application definition
+
+INSTALLED_APPS = [
+    "django.contrib.admin",
+    "django.contrib.auth",
+    "django.contrib.contenttypes",
+    "django.contrib.sessions",
+    "django.contrib.messages",
+    "django.contrib.staticfiles",
+    "QuickPay.portal",
+]
+
+MIDDLEWARE = [
+    "QuickPay.portal.profiling.ProfilingMiddleware",  # off unless PROFILING
+    "django.middleware.security.SecurityMiddleware",
+    "django.contrib.sessions.middleware.SessionMiddleware",
+    "django.middleware.common.CommonMiddleware",
+    "django.middleware.csrf.CsrfViewMiddleware",
+    "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "django.contrib.messages.middleware.MessageMiddleware",
+    "django.middleware.clickjacking.XFrameOptionsMiddleware",
+]
+
+ROOT_URLCONF = "QuickPay.urls"
+
+TEMPLATES = [
+    {
+        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        "DIRS": [],
+        "OPTIONS": {
+            "context_processors": [
+                "django.template.context_processors.request",
+                "django.contrib.auth.context_processors.auth",
+                "django.contrib.messages.context_processors.messages",
+            ],
+            # Compiled templates are kept per process; runserver's autoreloader
+            # still resets them when a template changes
+            "loaders": [
+                (
+                    "django.template.loaders.cached.Loader",
+                    [
+                        "django.template.loaders.filesystem.Loader",
+                        "django.template.loaders.app_directories.Loader",
+                    ],
+                ),
+            ],
+        },
+    },
+]
+
+WSGI_APPLICATION = "QuickPay.wsgi.application"
+
+
+# Database
+# https://docs.djangoproject.com/en/5.1/ref/settings/#databases
+
+# Single-node deployments use SQLite in WAL mode so readers never block the
+# writer; write transactions take the lock up front (IMMEDIATE) instead of
+# failing with "database is locked" when they upgrade from a read.
+#
+# Setting DB_ENGINE to "mysql" or "postgresql" switches to a server database
+# configured from DB_NAME, DB_USER, DB_PASSWORD, DB_HOST and DB_PORT, with
+# persistent, health-checked connections. DB_REPLICA_HOST (and optionally
+# DB_REPLICA_PORT) adds a read-only "replica" alias for reporting queries;
+# see REPORTING_DATABASE and portal/routers.py.
+
+DB_ENGINE = os.getenv("DB_ENGINE", "sqlite")
+
+
+def serverDatabase(host, port):
+    config = {
+        "ENGINE": f"django.db.backends.{DB_ENGINE}",
+        "NAME": os.getenv("DB_NAME"),
+        "USER": os.getenv("DB_USER"),
+        "PASSWORD": os.getenv("DB_PASSWORD"),
+        "HOST": host,
+        "PORT": port,
+        # Keep connections open across requests; check them before reuse
+        "CONN_MAX_AGE": int(os.getenv("DB_CONN_MAX_AGE", 300)),
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {},
+    }
+    if DB_ENGINE == "mysql":
+        config["OPTIONS"] = {
+            "init_command": "SET sql_mode='STRICT_TRANS_TABLES'",
+            "isolation_level": "read committed",
+        }
+    elif DB_ENGINE == "postgresql" and os.getenv("DB_POOL"):
+        # psycopg's pool replaces persistent connections
+        config["CONN_MAX_AGE"] = 0
+        config["OPTIONS"]["pool"] = {
+            "min_size": int(os.getenv("DB_POOL_MIN", 2)),
+            "max_size": int(os.getenv("DB_POOL", 16)),
+        }
+    return config
+
+
+if DB_ENGINE == "sqlite":
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": os.getenv("DB_NAME", BASE_DIR / "db.sqlite3"),
+            "OPTIONS": {
+                "init_command": (
+                    "PRAGMA journal_mode=WAL;"
+                    "PRAGMA synchronous=NORMAL;"
+                    "PRAGMA busy_timeout=5000"
+                ),
+                "transaction_mode": "IMMEDIATE",
+                "timeout": 20,
+            },
+        }
+    }
+else:
+    DATABASES = {
+        "default": serverDatabase(
+            os.getenv("DB_HOST", "localhost"), os.getenv("DB_PORT", "")
+        )
+    }
+    if os.getenv("DB_REPLICA_HOST"):
+        DATABASES["replica"] = serverDatabase(
+            os.getenv("DB_REPLICA_HOST"),
+            os.getenv("DB_REPLICA_PORT", os.getenv("DB_PORT", "")),
+        )
+        # Tests and benchmarks read from the primary's test database
+        DATABASES["replica"]["TEST"] = {"MIRROR": "default"}
+
+DATABASE_ROUTERS = ["QuickPay.portal.routers.PrimaryReplicaRouter"]
+
+# Alias the reporting listing and exports read from
+REPORTING_DATABASE = "replica" if "replica" in DATABASES else "default"
+
+
+# Only the admin uses sessions and messages; the JSON API never touches them.
+# Sessions are read through the cache, and messages ride in a signed cookie
+# so showing one costs no session write.
+SESSION_ENGINE = "django.contrib.sessions.backends.cached_db"
+MESSAGE_STORAGE = "django.contrib.messages.storage.cookie.CookieStorage"
+
+
+# Password validation
+# https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
+
+AUTH_PASSWORD_VALIDATORS = [
+    {
+        "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
+    },
+    {
+        "NAME": "django.contrib.auth.password_validation.MinimumLengthValidator",
+    },
+    {
+        "NAME": "django.contrib.auth.password_validation.CommonPasswordValidator",
+    },
+    {
+        "NAME": "django.contrib.auth.password_validation.NumericPasswordValidator",
+    },
+]
+
+
+# Internationalization
+# https://docs.djangoproject.com/en/5.1/topics/i18n/
+
+LANGUAGE_CODE = "en-us"
+
+TIME_ZONE = "UTC"
+
+USE_I18N = True
+
+USE_TZ = True
+
+
+# Static files (CSS, JavaScript, Images)
+# https://docs.djangoproject.com/en/5.1/howto/static-files/
+
+STATIC_URL = "static/"
+
+# Built by `manage.py buildstatic`: minified, content-hashed and pre-compressed
+STATIC_ROOT = BASE_DIR / "staticfiles"
+
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "QuickPay.portal.assets.BuildStorage"},
+}
+
+# Default primary key field type
+# https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
+
+DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+
+# Authorize.net XML API endpoint
+AUTH_NET_ENDPOINT = "https://apitest.authorize.net/xml/v1/request.api"
+
+# "sdk" builds requests through the authorizenet pyxb bindings; "lean" writes
+# and parses the XML directly (QuickPay/portal/codec.py)
+AUTH_NET_CODEC = "sdk"
+
+# Larger payments are rejected before they reach a processor
+PAYMENT_MAX_AMOUNT = os.getenv("PAYMENT_MAX_AMOUNT", "99999.99")
+
+# Upper bound on concurrent gateway calls issued from async views
+GATEWAY_MAX_WORKERS = 32
+
+# Batch submission: default and maximum gateway calls in flight per batch, and
+# per-processor submission rates (payments per second; missing = unlimited)
+BATCH_CONCURRENCY = 8
+BATCH_MAX_CONCURRENCY = 32
+BATCH_RATE_LIMITS = {"A": 20}
+
+# Token buckets in front of /process/ and /process/async/, shared by every
+# worker through the SQLite file DB: RATE requests per second with bursts of
+# BURST, per client IP and per salesperson. FORWARDED_HOPS is the number of
+# trusted proxies whose X-Forwarded-For entries name the client.
+RATE_LIMITS = {
+    "ENABLED": os.getenv("QUICKPAY_RATE_LIMITS", "1") == "1",
+    "DB": os.getenv("QUICKPAY_RATE_LIMITS_DB", BASE_DIR / "ratelimit.sqlite3"),
+    "LIMITS": {
+        "client": {"RATE": 5.0, "BURST": 50},
+        "salesperson": {"RATE": 1.0, "BURST": 20},
+    },
+    "FORWARDED_HOPS": int(os.getenv("QUICKPAY_FORWARDED_HOPS", 0)),
+}
+
+# Idempotency-Key handling on /process/: stored responses are cached for TTL
+# seconds; duplicates wait up to WAIT seconds for the first request to finish
+IDEMPOTENCY = {
+    "CACHE": "default",
+    "TTL": 24 * 60 * 60,
+    "WAIT": 30.0,
+    "POLL": 0.05,
+}
+
+# Post-payment side effects (portal/outbox.py): events are leased for LEASE
+# seconds per attempt and retried with exponential backoff from BACKOFF up to
+# MAX_BACKOFF seconds, giving up after ATTEMPTS tries
+OUTBOX = {
+    "BATCH": 100,
+    "LEASE": 60,
+    "ATTEMPTS": 8,
+    "BACKOFF": 2.0,
+    "MAX_BACKOFF": 600.0,
+}
+
+# Keep-alive connection pool shared by all processor strategies
+GATEWAY_TRANSPORT = {
+    "POOL_SIZE": 32,  # open connections per processor host
+    "CONNECT_TIMEOUT": 5.0,
+    "READ_TIMEOUT": 30.0,
+    "IDLE_TIMEOUT": 55.0,  # drop pooled connections idle longer than this
+}
+
+# Per-processor circuit breaker (portal/circuit.py): the circuit opens when
+# ERROR_RATE of at least MIN_CALLS calls in the last WINDOW seconds failed,
+# refuses payments for COOLDOWN seconds, then closes after PROBES successful
+# trial calls. The read timeout follows TIMEOUT_FACTOR x p99 latency, between
+# MIN_TIMEOUT and GATEWAY_TRANSPORT["READ_TIMEOUT"].
+GATEWAY_BREAKER = {
+    "WINDOW": 30.0,
+    "MIN_CALLS": 20,
+    "ERROR_RATE": 0.5,
+    "COOLDOWN": 15.0,
+    "PROBES": 3,
+    "TIMEOUT_FACTOR": 3.0,
+    "MIN_TIMEOUT": 2.0,
+}
+
+# /metrics (portal/metrics.py). Under a multi-process server DIR names a
+# directory each process writes its values to every FLUSH seconds; /metrics
+# adds them up. Unset, /metrics shows the serving process only.
+METRICS = {
+    "DIR": os.getenv("QUICKPAY_METRICS_DIR"),
+    "FLUSH": 5.0,
+}
+
+# Cold storage (portal/archive.py): `manage.py archivetransactions` moves
+# approved and declined transactions older than AGE_DAYS into monthly gzip
+# files and their index files in DIR, BATCH_SIZE rows at a time. Every
+# process serving reports or exports must see DIR.
+ARCHIVE = {
+    "DIR": os.getenv("QUICKPAY_ARCHIVE_DIR", BASE_DIR / "archive"),
+    "AGE_DAYS": int(os.getenv("QUICKPAY_ARCHIVE_AGE_DAYS", 180)),
+    "BATCH_SIZE": 1000,
+}
+
+# Settlement reconciliation (portal/reconcile.py): `manage.py
+# reconcilesettlements` reads the batches settled in the last LOOKBACK_DAYS,
+# CONCURRENCY reporting calls at a time and PAGE_SIZE transactions per page
+# (the gateway allows 1000), and matches them to rows created within SLACK
+# seconds of their submit time.
+RECONCILE = {
+    "CONCURRENCY": 8,
+    "PAGE_SIZE": 1000,
+    "LOOKBACK_DAYS": int(os.getenv("QUICKPAY_RECONCILE_LOOKBACK_DAYS", 2)),
+    "SLACK": 300,
+}
+
+# Opt-in profiling of slow payments (portal/profiling.py): RATE of requests
+# under PATHS run under cProfile; the rest are stack-sampled every INTERVAL
+# seconds and kept when slower than THRESHOLD seconds. The newest KEEP samples
+# stay in DIR; `manage.py profilesummary` reports on them.
+PROFILING = {
+    "ENABLED": os.getenv("QUICKPAY_PROFILING") == "1",
+    "PATHS": ["/process/"],
+    "RATE": float(os.getenv("QUICKPAY_PROFILING_RATE", 0.01)),
+    "THRESHOLD": float(os.getenv("QUICKPAY_PROFILING_THRESHOLD", 1.0)),
+    "INTERVAL": 0.02,
+    "DIR": BASE_DIR / "profiles",
+    "KEEP": 200,
+}
+
+# The middleware the prod and bench profiles run, each on purpose:
+# - Profiling only when PROFILING is enabled.
+# - Security: HSTS, nosniff and the HTTPS redirect settings.
+# - Sessions, Auth and Messages: the admin needs them (checks admin.E408 to
+#   E410). Sessions and users load lazily, so /process/ never reads a session.
+# - X-Frame-Options: keeps the card form out of other sites' frames.
+# Common and CSRF are left out: the POST endpoints are csrf_exempt, and the
+# admin wraps its views in csrf_protect and appends its own slashes.
+PRODUCTION_MIDDLEWARE = [
+    *(
+        ["QuickPay.portal.profiling.ProfilingMiddleware"]
+        if PROFILING["ENABLED"]
+        else []
+    ),
+    "django.middleware.security.SecurityMiddleware",
+    "django.contrib.sessions.middleware.SessionMiddleware",
+    "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "django.contrib.messages.middleware.MessageMiddleware",
+    "django.middleware.clickjacking.XFrameOptionsMiddleware",
+]
+
+# JSON-lines logging to stderr; records are queued and written off-thread
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "jsonl": {"class": "QuickPay.portal.logs.AsyncHandler"},
+    },
+    "loggers": {
+        "QuickPay": {
+            "handlers": ["jsonl"],
+            "level": os.getenv("QUICKPAY_LOG_LEVEL", "INFO"),
+            "propagate": False,
+        },
+    },
+}
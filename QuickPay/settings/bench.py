@@ -0,0 +1,11 @@
+from .base import *  # noqa: F401,F403
+from .base import INSTALLED_APPS, PRODUCTION_MIDDLEWARE
+
+DEBUG = False
+
+ALLOWED_HOSTS = ["*"]
+
+MIDDLEWARE = PRODUCTION_MIDDLEWARE
+
+# The bench* and stubgateway commands (QuickPay/bench)
+INSTALLED_APPS = [*INSTALLED_APPS, "QuickPay.bench"]
@@ -15,13 +15,27 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 
+from django.apps import apps
+from django.conf import settings
 from django.contrib import admin
-from django.urls import path, include
-from debug_toolbar.toolbar import debug_toolbar_urls
+from django.urls import path, include, re_path
+
+from QuickPay.portal import assets
 
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("", include("QuickPay.portal.urls")),
-] + debug_toolbar_urls()
+]
+
+if apps.is_installed("debug_toolbar"):
+    from debug_toolbar.toolbar import debug_toolbar_urls
+
+    urlpatterns += debug_toolbar_urls()
+
+if not settings.DEBUG:
+    # runserver serves static files itself under DEBUG
+    urlpatterns += [
+        re_path(rf"^{settings.STATIC_URL.lstrip('/')}(?P<path>.+)$", assets.serve),
+    ]
 
 